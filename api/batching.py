@@ -0,0 +1,141 @@
+import asyncio
+import time
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-comment predictions into small batches so the model
+    runs one vectorized predict call per batch instead of one per request.
+
+    A batch is flushed as soon as it holds max_batch_size items or max_wait_ms has
+    passed since its first item arrived, whichever happens first. The predict
+    function runs in the default executor so the event loop keeps accepting requests.
+    """
+
+    def __init__(self, predict_fn, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+
+        self._loop = None
+        self._pending = []  # list of (text, future) waiting for the next flush
+        self._timer = None
+        self._in_flight = 0  # items handed to predict_fn but not yet resolved
+        self._tasks = set()  # running batches, referenced so they are not garbage-collected
+
+        # histogram buckets are powers of two up to max_batch_size
+        self._bucket_bounds = []
+        bound = 1
+        while bound < max_batch_size:
+            self._bucket_bounds.append(bound)
+            bound *= 2
+        self._bucket_bounds.append(max_batch_size)
+        self._bucket_counts = [0] * len(self._bucket_bounds)
+        self._batches = 0
+        self._items = 0
+        self._max_queue_depth = 0
+        self._predict_seconds = 0.0
+
+    def _bind(self, loop):
+        """
+        Attach to the running event loop, dropping state left over from a closed one
+        """
+        if self._loop is not loop:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._loop = loop
+            self._pending = []
+            self._timer = None
+            self._in_flight = 0
+            self._tasks = set()
+
+    async def submit(self, text: str):
+        """
+        Queue one comment and wait for its row of the batched model output
+        """
+        loop = asyncio.get_running_loop()
+        self._bind(loop)
+
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self._max_queue_depth = max(self._max_queue_depth, self.queue_depth)
+
+        if len(self._pending) >= self.max_batch_size or self.max_wait == 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch = self._pending[:self.max_batch_size]
+        self._pending = self._pending[self.max_batch_size:]
+        task = self._loop.create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        # anything left over starts its own wait window
+        if self._pending:
+            self._timer = self._loop.call_later(self.max_wait, self._flush)
+
+    async def _run_batch(self, batch):
+        texts = [text for text, _ in batch]
+        self._in_flight += len(batch)
+        self._record_batch(len(batch))
+        start = time.perf_counter()
+        try:
+            predictions = await self._loop.run_in_executor(None, self.predict_fn, texts)
+            if len(predictions) != len(batch):
+                raise ValueError(f"predict_fn returned {len(predictions)} rows for a batch of {len(batch)}")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), prediction in zip(batch, predictions):
+                if not future.done():
+                    future.set_result(prediction)
+        finally:
+            self._in_flight -= len(batch)
+            self._predict_seconds += time.perf_counter() - start
+
+    def _record_batch(self, size: int):
+        self._batches += 1
+        self._items += size
+        for i, bound in enumerate(self._bucket_bounds):
+            if size <= bound:
+                self._bucket_counts[i] += 1
+                break
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Number of comments waiting for a batch or currently being predicted
+        """
+        return len(self._pending) + self._in_flight
+
+    def stats(self) -> dict:
+        """
+        Snapshot of queue depth and batch-size histogram for the /stats endpoint
+        """
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self._max_queue_depth,
+            "batches": self._batches,
+            "items": self._items,
+            "mean_batch_size": self._items / self._batches if self._batches else 0.0,
+            "predict_seconds_total": self._predict_seconds,
+            "batch_size_histogram": {
+                f"le_{bound}": count for bound, count in zip(self._bucket_bounds, self._bucket_counts)
+            },
+        }
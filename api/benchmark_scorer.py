@@ -0,0 +1,102 @@
+"""
+Compare per-comment inference latency of the sklearn Pipeline and the LinearScorer.
+
+    python benchmark_scorer.py                      # small synthetic LR model
+    python benchmark_scorer.py --model model.joblib # a downloaded artifact
+"""
+import argparse
+import random
+import time
+
+import joblib
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.pipeline import Pipeline
+
+from linear_scorer import LinearScorer
+
+LABELS = ["toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"]
+
+NEUTRAL_WORDS = ("article edit page source thanks please section history reference talk wiki "
+                 "discussion image link user policy review change add remove update good great help").split()
+LABEL_WORDS = {
+    "toxic": ["stupid", "idiot", "dumb", "pathetic"],
+    "severe_toxic": ["worthless", "scum"],
+    "obscene": ["crap", "damn", "hell"],
+    "threat": ["kill", "hurt", "destroy"],
+    "insult": ["moron", "loser", "fool"],
+    "identity_hate": ["bigot", "racist"],
+}
+
+
+def synthetic_corpus(n: int, seed: int = 1337):
+    """
+    Wikipedia-talk-like comments with label words mixed in at roughly Jigsaw rates
+    """
+    rng = random.Random(seed)
+    texts, labels = [], []
+    for _ in range(n):
+        words = rng.choices(NEUTRAL_WORDS, k=rng.randint(5, 60))
+        row = []
+        for label, vocab in LABEL_WORDS.items():
+            hit = rng.random() < 0.08
+            row.append(int(hit))
+            if hit:
+                words.insert(rng.randrange(len(words)), rng.choice(vocab))
+        texts.append(" ".join(words))
+        labels.append(row)
+    return texts, np.array(labels)
+
+
+def train_small_model(texts, labels):
+    pipeline = Pipeline([
+        ("tfidf", TfidfVectorizer(analyzer="word", ngram_range=(1, 2), min_df=3, strip_accents="unicode", sublinear_tf=True)),
+        ("clf", OneVsRestClassifier(LogisticRegression(solver="liblinear", max_iter=1000, class_weight="balanced"))),
+    ])
+    return pipeline.fit(texts, labels)
+
+
+def time_per_comment(predict, texts, batch_size: int, repeats: int) -> float:
+    """
+    Median wall time per comment in microseconds when predicting in batches of batch_size
+    """
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    runs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for batch in batches:
+            predict(batch)
+        runs.append((time.perf_counter() - start) / len(texts))
+    return float(np.median(runs)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="path to a fitted pipeline .joblib file")
+    parser.add_argument("--train-size", type=int, default=5000)
+    parser.add_argument("--comments", type=int, default=1000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 256])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.model:
+        pipeline = joblib.load(args.model)
+    else:
+        pipeline = train_small_model(*synthetic_corpus(args.train_size))
+    scorer = LinearScorer.from_pipeline(pipeline, LABELS)
+    texts, _ = synthetic_corpus(args.comments, seed=7)
+
+    mismatches = int((scorer.predict(texts) != pipeline.predict(texts)).sum())
+    print(f"label mismatches vs Pipeline.predict: {mismatches}")
+
+    print(f"{'batch':>6} {'sklearn us/comment':>20} {'linear us/comment':>18} {'speedup':>8}")
+    for batch_size in args.batch_sizes:
+        sklearn_us = time_per_comment(pipeline.predict, texts, batch_size, args.repeats)
+        linear_us = time_per_comment(scorer.predict, texts, batch_size, args.repeats)
+        print(f"{batch_size:>6} {sklearn_us:>20.1f} {linear_us:>18.1f} {sklearn_us / linear_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+def parse_env(pairs: list[str]) -> dict:
+    """
+    Environment settings given as repeated --env KEY=VALUE flags, as a dict
+    """
+    env = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise SystemExit(f"--env expects KEY=VALUE, got {pair!r}")
+        env[key] = value
+    return env
@@ -0,0 +1,99 @@
+# api/compact_model.py and models/compact_model.py are identical copies: the API serves compact models, training
+# writes them, and the two directories are deployed separately. models/tests/test_export_compact.py
+# fails when the copies differ, so change both.
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from linear_scorer import LinearScorer
+
+COMPACT_META_FILE = "compact_model.json"
+
+
+def term_hash(term: str) -> int:
+    """
+    Stable 64-bit hash of a vocabulary term, the key of the sorted vocabulary arrays
+    """
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def find_compact_model(path: str) -> str:
+    """
+    Return the directory holding compact_model.json at or directly under path
+    """
+    if os.path.isfile(os.path.join(path, COMPACT_META_FILE)):
+        return path
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            candidate = os.path.join(path, name)
+            if os.path.isfile(os.path.join(candidate, COMPACT_META_FILE)):
+                return candidate
+    raise FileNotFoundError(f"No compact model found in {path}")
+
+
+def save_compact_model(scorer: LinearScorer, out_dir: str) -> str:
+    """
+    Write a scorer in the compact layout; export_compact_model in models/model_training.py
+    calls this as well, so training and serving share one writer
+    """
+    terms = list(scorer.vocabulary)
+    hashes = np.fromiter((term_hash(t) for t in terms), dtype=np.uint64, count=len(terms))
+    columns = np.fromiter((scorer.vocabulary[t] for t in terms), dtype=np.int32, count=len(terms))
+    order = np.argsort(hashes)
+    if len(np.unique(hashes)) != len(hashes):
+        raise ValueError("Vocabulary hash collision, cannot save compact model")
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "vocab_hashes.npy"), hashes[order])
+    np.save(os.path.join(out_dir, "vocab_columns.npy"), columns[order])
+    np.save(os.path.join(out_dir, "weights.npy"), np.ascontiguousarray(scorer.weights, dtype=np.float32))
+    np.save(os.path.join(out_dir, "intercept.npy"), np.asarray(scorer.intercept, dtype=np.float32))
+    if scorer.idf is not None:
+        np.save(os.path.join(out_dir, "idf.npy"), np.asarray(scorer.idf, dtype=np.float32))
+    with open(os.path.join(out_dir, COMPACT_META_FILE), "w") as f:
+        json.dump(scorer.meta, f, indent=2)
+    return out_dir
+
+
+class CompactLinearModel(LinearScorer):
+    """
+    Serves a model exported by models/model_training.py export_compact_model.
+
+    The weights, idf and vocabulary hash arrays are opened with np.load(mmap_mode="r"),
+    so several uvicorn workers on one host share a single copy through the page cache
+    instead of each unpickling its own vocabulary dict. Scoring is inherited from
+    LinearScorer; only the vocabulary lookup differs.
+    """
+
+    def __init__(self, meta: dict, vocab_hashes, vocab_columns, weights, intercept, idf=None):
+        super().__init__(meta, weights, intercept, idf=idf)
+        self.vocab_hashes = vocab_hashes
+        self.vocab_columns = vocab_columns
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: str | None = "r"):
+        path = find_compact_model(path)
+        with open(os.path.join(path, COMPACT_META_FILE)) as f:
+            meta = json.load(f)
+
+        def _array(name):
+            return np.load(os.path.join(path, name), mmap_mode=mmap_mode)
+
+        idf_path = os.path.join(path, "idf.npy")
+        idf = np.load(idf_path, mmap_mode=mmap_mode) if meta["use_idf"] and os.path.exists(idf_path) else None
+        return cls(meta, _array("vocab_hashes.npy"), _array("vocab_columns.npy"),
+                   _array("weights.npy"), _array("intercept.npy"), idf=idf)
+
+    def _lookup(self, terms: list[str]) -> np.ndarray:
+        """
+        Map terms to feature columns by binary search over the sorted term hashes
+        """
+        if not terms:
+            return np.empty(0, dtype=np.int64)
+        hashes = np.fromiter((term_hash(t) for t in terms), dtype=np.uint64, count=len(terms))
+        idx = np.searchsorted(self.vocab_hashes, hashes)
+        idx[idx == len(self.vocab_hashes)] = 0
+        found = self.vocab_hashes[idx] == hashes
+        return np.where(found, self.vocab_columns[idx], -1).astype(np.int64)
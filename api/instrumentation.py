@@ -0,0 +1,204 @@
+import contextvars
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# latency buckets in seconds, from sub-millisecond model calls up to slow DynamoDB writes
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# perf_counter() when the current request entered the app, set by MetricsMiddleware
+request_started = contextvars.ContextVar("request_started", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class Histogram:
+    """
+    Prometheus-style histogram with cumulative buckets, a sum and a count per label set
+    """
+
+    def __init__(self, name: str, help_text: str, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def snapshot(self, *label_values) -> dict:
+        with self._lock:
+            series = list(self._series.get(label_values) or [0] * len(self.buckets) + [0.0, 0])
+        return {"buckets": dict(zip(self.buckets, series[:-2])), "sum": series[-2], "count": series[-1]}
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((values, list(series)) for values, series in self._series.items())
+        for values, series in items:
+            for bound, count in zip(self.buckets, series):
+                labels = _format_labels(self.label_names + ("le",), values + (repr(float(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.label_names + ("le",), values + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            labels = _format_labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {series[-2]}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+class Instrumentation:
+    """
+    In-process request metrics rendered in the Prometheus text format.
+
+    Holds the request latency histogram (by method, route and status), the per-stage
+    histogram for /predict work (validation, vectorize, classify, log_write) and the
+    in-flight request count. Everything else (model load time, cache and batcher
+    counters) is read from the app at scrape time and passed to render().
+    """
+
+    def __init__(self, prefix: str = "toxic_api", buckets=DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.requests = Histogram(f"{prefix}_request_duration_seconds", "Total request latency.",
+                                  ("method", "route", "status"), buckets)
+        self.stages = Histogram(f"{prefix}_stage_duration_seconds",
+                                "Time spent in each stage of a prediction, per request or per model call.",
+                                ("stage",), buckets)
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def stage(self, name: str):
+        """
+        Context manager timing one stage
+        """
+        return self.stages.time(name)
+
+    def observe_validation(self):
+        """
+        Record the time from the request entering the app to the endpoint body running,
+        which covers reading the body and pydantic validation
+        """
+        started = request_started.get()
+        if started is not None:
+            self.stages.observe(time.perf_counter() - started, "validation")
+
+    def _enter(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def render(self, gauges: dict | None = None) -> str:
+        """
+        Prometheus text exposition of the histograms, in-flight count and gauges, where
+        gauges maps a metric name suffix to (value, help text)
+        """
+        lines = self.requests.render() + self.stages.render()
+        all_gauges = {"in_flight_requests": (self.in_flight, "Requests currently being handled."), **(gauges or {})}
+        for suffix, (value, help_text) in all_gauges.items():
+            if value is None:
+                continue
+            name = f"{self.prefix}_{suffix}"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {float(value)}"]
+        return "\n".join(lines) + "\n"
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that counts in-flight requests and times every HTTP request
+    """
+
+    def __init__(self, app, instrumentation: Instrumentation):
+        self.app = app
+        self.instrumentation = instrumentation
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        token = request_started.set(start)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self.instrumentation._enter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.instrumentation._exit()
+            request_started.reset(token)
+            # route templates keep the label set small, unmatched paths share one series
+            route = getattr(scope.get("route"), "path", "unmatched")
+            self.instrumentation.requests.observe(time.perf_counter() - start, scope["method"], route, str(status_code))
+
+class SamplingProfiler:
+    """
+    Statistical profiler that samples the stacks of every other thread at a fixed
+    interval and counts them in the folded format flamegraph tools read
+    ("outer;inner;leaf count"). It only runs for the duration of profile().
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+
+    def _stack(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def profile(self, seconds: float) -> Counter:
+        """
+        Sample for the given number of seconds and return a Counter of folded stacks.
+        Only one profile runs at a time.
+        """
+        stacks = Counter()
+        with self._lock:
+            me = threading.get_ident()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id != me:
+                        stacks[self._stack(frame)] += 1
+                time.sleep(self.interval)
+        return stacks
+
+    @staticmethod
+    def folded(stacks: Counter, limit: int | None = None) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common(limit)) + "\n"
@@ -0,0 +1,376 @@
+"""
+Replay a corpus of comments against the API and record latency, throughput and memory.
+
+The app runs in its own `uvicorn --workers N` process, so the load generator does not
+share a GIL with it, with DynamoDB mocked by moto in every worker. It serves a model given
+with --model or a small one trained on the synthetic corpus from benchmark_scorer.py.
+RSS is sampled from /proc for the server and all of its worker processes. Results are
+written as JSON and can be compared to an earlier run.
+
+    python load_test.py --output results.json
+    python load_test.py --corpus train.csv --concurrency 64 --requests 5000 --workers 4
+    python load_test.py --baseline results.json --tolerance 0.2  # exits 1 on a regression
+    python load_test.py --url http://localhost:8000               # an already running API
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import platform
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+
+import numpy as np
+
+from cli_env import parse_env
+
+TABLE_NAME = "load_test_prediction_logs"
+REGION = "us-east-1"
+PERCENTILES = (50, 95, 99)
+# metrics compared against a baseline and whether a higher value is better
+COMPARED_METRICS = {
+    "latency_ms.p50": False,
+    "latency_ms.p95": False,
+    "latency_ms.p99": False,
+    "throughput_rps": True,
+    "rss_mb.peak": False,
+    "rss_mb.peak_per_worker": False,
+}
+
+
+def load_corpus(path: str | None, n: int, seed: int = 7) -> list[str]:
+    """
+    Comments from a CSV with a comment_text column (the Jigsaw format), a text file with
+    one comment per line, or the synthetic corpus when no path is given
+    """
+    if path is None:
+        from benchmark_scorer import synthetic_corpus
+        texts, _ = synthetic_corpus(n, seed=seed)
+        return texts
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            texts = [row["comment_text"] for row in csv.DictReader(f) if row.get("comment_text")]
+        else:
+            texts = [line.rstrip("\n") for line in f if line.strip()]
+    rng = random.Random(seed)
+    return [rng.choice(texts) for _ in range(n)] if len(texts) < n else rng.sample(texts, n)
+
+def process_rss_mb(pid: int | str = "self") -> float | None:
+    """
+    Resident set size of a process in MiB, None where /proc is not available or the
+    process is gone
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def descendant_pids(pid: int) -> list[int]:
+    """
+    Every process below pid, found through the parent pid in /proc/<pid>/stat
+    """
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # the command name is in parentheses and may contain spaces
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    found, todo = [], [pid]
+    while todo:
+        for child in children.get(todo.pop(), []):
+            found.append(child)
+            todo.append(child)
+    return found
+
+def tree_rss_mb(pid: int) -> dict | None:
+    """
+    RSS of pid and its descendants in MiB: the total and the largest single process
+    """
+    sizes = [rss for rss in (process_rss_mb(p) for p in [pid] + descendant_pids(pid)) if rss is not None]
+    if not sizes:
+        return None
+    return {"total": sum(sizes), "max_process": max(sizes), "processes": len(sizes)}
+
+class RssSampler:
+    """
+    Background thread keeping the peak RSS of a server process tree while the load runs
+    """
+
+    def __init__(self, pid: int, interval: float = 0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak = None
+        self.peak_process = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._sample()
+
+    def _sample(self):
+        rss = tree_rss_mb(self.pid)
+        if rss is not None:
+            self.peak = max(self.peak or 0.0, rss["total"])
+            self.peak_process = max(self.peak_process or 0.0, rss["max_process"])
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def _request_body(endpoint: str, texts: list[str]) -> dict:
+    if endpoint == "/predict/batch":
+        return {"items": [{"text": text} for text in texts]}
+    return {"text": texts[0]}
+
+async def replay(client, texts: list[str], concurrency: int, endpoint: str = "/predict", batch_size: int = 1):
+    """
+    Send texts with at most concurrency requests in flight. Returns the latency of every
+    request in seconds, the number of failed requests and the wall time.
+    """
+    chunks = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    latencies, errors = [], 0
+    next_chunk = iter(chunks)
+
+    async def worker():
+        nonlocal errors
+        for chunk in next_chunk:
+            start = time.perf_counter()
+            try:
+                response = await client.post(endpoint, json=_request_body(endpoint, chunk))
+                ok = response.status_code == 200
+            except Exception as e:
+                print(f"Request failed: {e}")
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+def summarize(latencies: list[float], errors: int, wall_seconds: float, batch_size: int = 1) -> dict:
+    """
+    Latency percentiles in milliseconds and throughput for one run
+    """
+    ms = np.asarray(latencies, dtype=np.float64) * 1000
+    latency = {f"p{p}": float(np.percentile(ms, p)) for p in PERCENTILES} if len(ms) else {}
+    if len(ms):
+        latency.update(mean=float(ms.mean()), max=float(ms.max()))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "wall_seconds": wall_seconds,
+        "throughput_rps": len(latencies) / wall_seconds if wall_seconds else 0.0,
+        "comments_per_second": len(latencies) * batch_size / wall_seconds if wall_seconds else 0.0,
+        "latency_ms": latency,
+    }
+
+def _lookup(results: dict, dotted: str):
+    value = results
+    for part in dotted.split("."):
+        if not isinstance(value, dict) or value.get(part) is None:
+            return None
+        value = value[part]
+    return value
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.2) -> list[str]:
+    """
+    Regressions of current against baseline: a latency or RSS more than tolerance above
+    the baseline, a throughput more than tolerance below it, or errors where there were none
+    """
+    regressions = []
+    for metric, higher_is_better in COMPARED_METRICS.items():
+        now, before = _lookup(current, metric), _lookup(baseline, metric)
+        if now is None or not before:
+            continue
+        change = (now - before) / before
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(f"{metric}: {before:.2f} -> {now:.2f} ({change:+.0%})")
+    if current.get("errors") and not baseline.get("errors"):
+        regressions.append(f"errors: 0 -> {current['errors']}")
+    return regressions
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _train_model(path: str, train_size: int):
+    import joblib
+    from benchmark_scorer import synthetic_corpus, train_small_model
+    joblib.dump(train_small_model(*synthetic_corpus(train_size)), path)
+
+def mocked_app():
+    """
+    uvicorn app factory run in every server worker: starts moto, creates the log table
+    and imports the app. The mock is left running for the life of the worker.
+    """
+    import boto3
+    from moto import mock_aws
+
+    mock_aws().start()
+    boto3.resource("dynamodb", region_name=REGION).create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{"AttributeName": "timestamp", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "timestamp", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    import main
+    return main.app
+
+def _serve_subprocess(model_path: str, env: dict, workers: int = 1, timeout: float = 60.0):
+    """
+    Start `uvicorn load_test:mocked_app --workers N` and wait for /health. Returns the
+    base URL and the server process.
+    """
+    import httpx
+
+    port = _free_port()
+    server_env = {
+        **os.environ,
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_DEFAULT_REGION": REGION,
+        "AWS_REGION": REGION,
+        "DYNAMODB_TABLE_NAME": TABLE_NAME,
+        "MODEL_PATH": model_path,
+        **env,
+    }
+    cmd = [sys.executable, "-m", "uvicorn", "load_test:mocked_app", "--factory", "--host", "127.0.0.1",
+           "--port", str(port), "--workers", str(workers), "--log-level", "warning", "--no-access-log"]
+    proc = subprocess.Popen(cmd, cwd=os.path.dirname(os.path.abspath(__file__)), env=server_env)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"API exited with status {proc.returncode} before it was ready")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).json().get("status") == "healthy":
+                return base_url, proc
+        except (httpx.HTTPError, ValueError):
+            pass
+        time.sleep(0.1)
+    _stop_server(proc)
+    raise RuntimeError(f"API did not become healthy within {timeout:.0f} seconds")
+
+def _stop_server(proc, timeout: float = 30.0):
+    """
+    SIGTERM so every worker runs its shutdown event and drains its log sink, then kill
+    """
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+async def _run_load(base_url: str, texts: list[str], args):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        warmup = args.warmup * args.batch_size
+        if warmup:
+            await replay(client, texts[:warmup], args.concurrency, args.endpoint, args.batch_size)
+        return await replay(client, texts[warmup:], args.concurrency, args.endpoint, args.batch_size)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="load an already running API instead of starting one")
+    parser.add_argument("--model", help="path to a fitted pipeline .joblib file or artifact directory")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes for the started server")
+    parser.add_argument("--train-size", type=int, default=5000)
+    parser.add_argument("--corpus", help="CSV with a comment_text column or a text file with one comment per line")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--endpoint", choices=["/predict", "/predict/batch"], default="/predict")
+    parser.add_argument("--batch-size", type=int, default=1, help="comments per request for /predict/batch")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="app setting for the in-process server, e.g. PREDICTION_CACHE_SIZE=0")
+    parser.add_argument("--output", help="write the results as JSON to this path")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative change before flagging")
+    args = parser.parse_args()
+
+    batch_size = args.batch_size if args.endpoint == "/predict/batch" else 1
+    args.batch_size = batch_size
+    texts = load_corpus(args.corpus, (args.requests + args.warmup) * batch_size, seed=args.seed)
+
+    server = None
+    with tempfile.TemporaryDirectory() as tmp:
+        base_url = args.url
+        if base_url is None:
+            model_path = args.model
+            if model_path is None:
+                model_path = os.path.join(tmp, "model.joblib")
+                _train_model(model_path, args.train_size)
+            base_url, server = _serve_subprocess(os.path.abspath(model_path), parse_env(args.env), args.workers)
+        rss_ready = tree_rss_mb(server.pid) if server else None
+
+        try:
+            with RssSampler(server.pid) if server else nullcontext() as sampler:
+                latencies, errors, wall = asyncio.run(_run_load(base_url, texts, args))
+        finally:
+            if server is not None:
+                _stop_server(server)
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "url": args.url, "model": args.model, "corpus": args.corpus, "concurrency": args.concurrency,
+            "endpoint": args.endpoint, "batch_size": batch_size, "warmup": args.warmup, "seed": args.seed,
+            "workers": args.workers if server else None,
+            "env": parse_env(args.env),
+        },
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        **summarize(latencies, errors, wall, batch_size),
+        # the server's own process tree: the uvicorn supervisor and its workers
+        "rss_mb": {"ready": rss_ready["total"] if rss_ready else None, "peak": sampler.peak,
+                   "peak_per_worker": sampler.peak_process,
+                   "processes": rss_ready["processes"] if rss_ready else None} if server else None,
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import json
+import os
+import queue
+import threading
+import time
+from decimal import Decimal
+
+OVERFLOW_POLICIES = ("drop", "spill", "block")
+# hash key of the log_date / timestamp index the dashboard queries for new logs
+LOG_DATE_ATTRIBUTE = "log_date"
+
+
+def _to_dynamo_item(log: dict) -> dict:
+    """
+    DynamoDB rejects Python floats, so round-trip through JSON and parse them as Decimal.
+    The day of the timestamp is added as LOG_DATE_ATTRIBUTE for the dashboard's index.
+    """
+    item = json.loads(json.dumps(log), parse_float=Decimal)
+    if isinstance(item.get("timestamp"), str):
+        item.setdefault(LOG_DATE_ATTRIBUTE, item["timestamp"][:10])
+    return item
+
+
+class PredictionLogSink:
+    """
+    Background writer that buffers prediction logs in a bounded queue and flushes them
+    to DynamoDB with batch_writer, so /predict never waits on a DynamoDB round trip.
+
+    A batch is written once flush_size logs are buffered or flush_interval seconds have
+    passed since the first one arrived. When the queue is full the overflow policy decides
+    what happens to new logs:
+        - "drop":  discard the log and count it
+        - "spill": append the log to spill_path as a JSON line; spilled logs are replayed
+                   the next time the writer thread starts
+        - "block": wait up to block_timeout seconds for room, then drop
+    """
+
+    def __init__(self, table_name: str, region_name: str, max_queue_size: int = 10000, flush_size: int = 25,
+                 flush_interval: float = 1.0, overflow_policy: str = "drop", spill_path: str = "prediction_logs_spill.jsonl",
+                 block_timeout: float = 1.0, autostart: bool = True):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {OVERFLOW_POLICIES}, got {overflow_policy!r}")
+        self.table_name = table_name
+        self.region_name = region_name
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.spill_path = spill_path
+        self.block_timeout = block_timeout
+        self.autostart = autostart
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._table = None
+        self._counts = {"enqueued": 0, "written": 0, "dropped": 0, "spilled": 0, "failed": 0, "flushes": 0}
+
+    def _get_table(self):
+        """
+        Build the DynamoDB table resource once and reuse its pooled connections for every flush
+        """
+        if self._table is None:
+            # boto3 is imported on the first flush, off the startup path
+            import boto3
+            from botocore.config import Config
+
+            session = boto3.session.Session()
+            dynamodb = session.resource(
+                "dynamodb",
+                region_name=self.region_name,
+                config=Config(retries={"max_attempts": 5, "mode": "adaptive"}),
+            )
+            self._table = dynamodb.Table(self.table_name)
+        return self._table
+
+    def start(self):
+        """
+        Start the writer thread if it is not already running
+        """
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="prediction-log-sink", daemon=True)
+            self._thread.start()
+
+    def put(self, log: dict):
+        """
+        Queue a single log entry without waiting on DynamoDB
+        """
+        if self.autostart:
+            self.start()
+        try:
+            if self.overflow_policy == "block":
+                self._queue.put(log, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(log)
+            self._counts["enqueued"] += 1
+        except queue.Full:
+            if self.overflow_policy == "spill":
+                self._spill([log])
+            else:
+                self._counts["dropped"] += 1
+
+    def put_many(self, logs: list[dict]):
+        """
+        Queue several log entries
+        """
+        for log in logs:
+            self.put(log)
+
+    def close(self, timeout: float = 10.0):
+        """
+        Stop the writer thread after draining everything still buffered
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        try:
+            # wake the writer if it is idle waiting on an empty queue
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        self._replay_spill()
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+            elif self._stop.is_set() and self._queue.empty():
+                break
+
+    def _next_batch(self) -> list[dict]:
+        batch = []
+        deadline = None
+        while len(batch) < self.flush_size:
+            if self._stop.is_set():
+                # shutting down: drain whatever is left without waiting
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            else:
+                timeout = self.flush_interval if deadline is None else deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            if item is None:
+                continue
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+        return batch
+
+    def _write(self, batch: list[dict]):
+        try:
+            table = self._get_table()
+            with table.batch_writer(overwrite_by_pkeys=["timestamp"]) as writer:
+                for log in batch:
+                    writer.put_item(Item=_to_dynamo_item(log))
+            self._counts["written"] += len(batch)
+            self._counts["flushes"] += 1
+        except Exception as db_error:
+            print(f'Error saving {len(batch)} predictions to DynamoDB: {db_error}')
+            self._counts["failed"] += len(batch)
+            if self.overflow_policy == "spill":
+                self._spill(batch)
+
+    def _spill(self, logs: list[dict]):
+        with self._spill_lock:
+            with open(self.spill_path, "a") as f:
+                for log in logs:
+                    f.write(json.dumps(log) + "\n")
+            self._counts["spilled"] += len(logs)
+
+    def _replay_spill(self):
+        """
+        Write logs spilled to disk by an earlier overflow back to DynamoDB
+        """
+        with self._spill_lock:
+            if not self.spill_path or not os.path.exists(self.spill_path):
+                return
+            with open(self.spill_path) as f:
+                logs = [json.loads(line) for line in f if line.strip()]
+            os.remove(self.spill_path)
+        for i in range(0, len(logs), self.flush_size):
+            self._write(logs[i:i + self.flush_size])
+
+    def stats(self) -> dict:
+        """
+        Snapshot of buffer depth and write counters for the /stats endpoint
+        """
+        return {
+            "overflow_policy": self.overflow_policy,
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            **self._counts,
+        }
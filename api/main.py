@@ -1,52 +1,470 @@
 import joblib
-from fastapi import FastAPI, HTTPException, status
-from pydantic import BaseModel
+from fastapi import FastAPI, Header, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
 import json
-from datetime import datetime
-import wandb
+from datetime import datetime, timedelta
 import os
-import boto3
+import threading
+import time
+from contextlib import nullcontext
+from functools import partial
+from batching import MicroBatcher
+from log_sink import PredictionLogSink
+from prediction_cache import PredictionCache
+from rollups import RollupAggregator
+from model_cache import ModelCache, fetch_from_registry, find_model_file
+from compact_model import CompactLinearModel, find_compact_model
+from linear_scorer import LinearScorer
+from scoring import apply_thresholds, classify, load_threshold_config, matrix_scores, threshold_vector, vectorize
+from instrumentation import Instrumentation, MetricsMiddleware, SamplingProfiler
+from routing import DEFAULT_ROUTE, ModelRouter, ShadowScorer, parse_routes
+
+# used to report how long the app took to become healthy
+_IMPORT_STARTED = time.perf_counter()
 
 # create app
 app = FastAPI(
     title="Toxic Comment Moderation App",
 )
+# request latency, per-stage timings and in-flight requests for /metrics
+instrumentation = Instrumentation()
+app.add_middleware(MetricsMiddleware, instrumentation=instrumentation)
 
 # Environment variables for DynamoDB
 DYNAMODB_TABLE_NAME = os.environ.get("DYNAMODB_TABLE_NAME", "table_01")
 AWS_REGION = os.environ.get("AWS_REGION", "us-east-1")
+# Upper bound on the number of comments accepted by /predict/batch in one call
+MAX_BATCH_ITEMS = int(os.environ.get("MAX_BATCH_ITEMS", "1000"))
+# Server-side micro-batching of concurrent /predict calls
+PREDICT_MAX_BATCH_SIZE = int(os.environ.get("PREDICT_MAX_BATCH_SIZE", "32"))
+PREDICT_MAX_WAIT_MS = float(os.environ.get("PREDICT_MAX_WAIT_MS", "5"))
+# Cache of label vectors for repeated comment texts, PREDICTION_CACHE_SIZE=0 disables it
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_MAX_BYTES = int(os.environ.get("PREDICTION_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", "3600"))
+# Background DynamoDB log writer
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+LOG_FLUSH_SIZE = int(os.environ.get("LOG_FLUSH_SIZE", "25"))
+LOG_FLUSH_INTERVAL = float(os.environ.get("LOG_FLUSH_INTERVAL", "1.0"))
+LOG_OVERFLOW_POLICY = os.environ.get("LOG_OVERFLOW_POLICY", "drop")  # drop, spill or block
+LOG_SPILL_PATH = os.environ.get("LOG_SPILL_PATH", "prediction_logs_spill.jsonl")
+# Per-minute metric rollups for the dashboard, disabled when no table is configured
+ROLLUP_TABLE_NAME = os.environ.get("ROLLUP_TABLE_NAME")
+ROLLUP_BUCKET_SECONDS = int(os.environ.get("ROLLUP_BUCKET_SECONDS", "60"))
+ROLLUP_FLUSH_INTERVAL = float(os.environ.get("ROLLUP_FLUSH_INTERVAL", "10"))
+# buckets kept for retry while the rollup table cannot be written, oldest dropped first
+ROLLUP_MAX_PENDING_BUCKETS = int(os.environ.get("ROLLUP_MAX_PENDING_BUCKETS", "1440"))
+# Model location: a baked-in path wins, then the local cache, then the W&B registry
+MODEL_PATH = os.environ.get("MODEL_PATH")  # .joblib file or artifact directory shipped with the image
+MODEL_ALIAS = os.environ.get("MODEL_ALIAS", "log_reg_model:latest")
+MODEL_CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", "model_cache")
+# "joblib" loads the pickled sklearn Pipeline, "compact" memory-maps the exported NumPy arrays
+MODEL_FORMAT = os.environ.get("MODEL_FORMAT", "joblib")
+# "sklearn" calls Pipeline.predict, "linear" scores joblib pipelines with the lightweight LinearScorer
+INFERENCE_ENGINE = os.environ.get("INFERENCE_ENGINE", "sklearn")
+# apply the per-label thresholds tuned at training time instead of model.predict when the model ships them,
+# off until the tuned thresholds of the served model have been checked
+APPLY_THRESHOLDS = os.environ.get("APPLY_THRESHOLDS", "0") == "1"
+WANDB_PROJECT = os.environ.get("WANDB_PROJECT", "toxic_comment_prediction")
+WANDB_ENTITY = os.environ.get("WANDB_ENTITY")
+# Check the registry for a newer version of MODEL_ALIAS in the background after startup
+MODEL_REFRESH_ON_START = os.environ.get("MODEL_REFRESH_ON_START", "0") == "1"
+# Hot-swap: poll MODEL_PATH (or MODEL_ALIAS in the registry) every N seconds, 0 disables the watcher
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", "0"))
+# predict calls on the warm-up comments before a reload is swapped in; the first also checks the output
+MODEL_WARMUP_ROUNDS = int(os.environ.get("MODEL_WARMUP_ROUNDS", "3"))
+# Extra models served next to the default one, e.g. "svm=linear_svm_model:latest@10,nb=multi_nb_model:latest@5".
+# Requests go to a route by weight (percent, the default model keeps the rest) or by the X-Model header
+MODEL_ROUTES = os.environ.get("MODEL_ROUTES", "")
+# Registry alias or path of a model that scores served comments in the background for comparison only
+SHADOW_MODEL = os.environ.get("SHADOW_MODEL")
+SHADOW_SAMPLE_RATE = float(os.environ.get("SHADOW_SAMPLE_RATE", "1.0"))
+SHADOW_MAX_PENDING = int(os.environ.get("SHADOW_MAX_PENDING", "1000"))
+# enables the /debug/profile sampling profiler endpoint
+DEBUG_PROFILING = os.environ.get("DEBUG_PROFILING", "0") == "1"
+# when set, /admin endpoints require a matching X-Admin-Token header
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+LABELS = ["toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"]
 
 model = None
+model_info = {}  # where the served model came from and how long it took to load
+# guards rebinding model and model_info together, see _served and _swap_model
+model_lock = threading.Lock()
+model_cache = ModelCache(MODEL_CACHE_DIR)
 
-def _load_model():
-    api_key = json.load(open("secrets.json"))["wandb_api_key"]
-    wandb.login(key=api_key)
-    run = wandb.init(project="toxic_comment_prediction")
-    artifact = run.use_artifact(artifact_or_name="log_reg_model:latest") # this creates a reference within Weights & Biases that this artifact was used by this run.
-    path = artifact.download() # this downloads the artifact from Weights & Biases to your local system where the code is executing.
-
-    for filename in os.listdir(path):
-        if filename.endswith(".joblib"):
-            model_path = os.path.join(path, filename)
-            break
+def _wandb_api_key():
+    if os.path.exists("secrets.json"):
+        with open("secrets.json") as f:
+            return json.load(f).get("wandb_api_key")
+    return os.environ.get("WANDB_API_KEY")
+
+def _find_model(path: str) -> str:
+    """
+    Locate the file or directory to load inside path for the configured MODEL_FORMAT
+    """
+    if MODEL_FORMAT == "compact":
+        return find_compact_model(path)
+    return find_model_file(path)
+
+def _locate_model():
+    """
+    Find the model file to serve without starting a W&B run
+    """
+    if MODEL_PATH:
+        return _find_model(MODEL_PATH), {"source": "baked", "digest": None}
+
+    digest = model_cache.resolve(MODEL_ALIAS)
+    source = "cache"
+    if digest is None:
+        # first start on this host: pull the artifact once and keep it in the cache
+        digest = fetch_from_registry(model_cache, MODEL_ALIAS, WANDB_PROJECT, api_key=_wandb_api_key(), entity=WANDB_ENTITY)
+        source = "registry"
+    return _find_model(model_cache.entry_path(digest)), {"source": source, "digest": digest}
+
+def _model_version(model_path: str, info: dict) -> str:
+    """
+    Artifact digest when known, otherwise the file name and modification time
+    """
+    if info.get("digest"):
+        return info["digest"]
+    return f"{os.path.basename(model_path)}@{int(os.path.getmtime(model_path))}"
+
+def _threshold_config(model_path: str, info: dict) -> dict | None:
+    """
+    Thresholds tuned at training time, from the artifact files or its registry metadata
+    """
+    artifact_metadata = None
+    if info.get("digest") and model_cache.has(info["digest"]):
+        try:
+            artifact_metadata = model_cache.metadata(info["digest"]).get("artifact_metadata")
+        except (OSError, ValueError):
+            pass
+    return load_threshold_config(model_path, artifact_metadata)
+
+def _load_from(model_path: str, info: dict):
+    start = time.perf_counter()
+    if MODEL_FORMAT == "compact":
+        # memory-mapped, so workers on the same host share the arrays
+        loaded = CompactLinearModel.load(model_path)
     else:
-        raise FileNotFoundError("No .joblib file found in artifact directory.")
+        loaded = joblib.load(model_path)
+        if INFERENCE_ENGINE == "linear":
+            try:
+                loaded = LinearScorer.from_pipeline(loaded, LABELS)
+            except (ValueError, AttributeError, IndexError) as e:
+                print(f"Linear scorer unavailable for this model, using sklearn: {e}")
+    loaded_info = {
+        **info,
+        "path": model_path,
+        "version": _model_version(model_path, info),
+        "engine": type(loaded).__name__,
+        "thresholds": _threshold_config(model_path, info),
+        "load_seconds": time.perf_counter() - start,
+    }
+    print(f"Loaded {type(loaded).__name__} from {info['source']}: {model_path}")
+    return loaded, loaded_info
+
+def _load_model():
+    model_path, info = _locate_model()
+    loaded, loaded_info = _load_from(model_path, info)
+    model_info.update(loaded_info)
+    return loaded
+
+def _load_source(source: str):
+    """
+    Load a routed or shadow model from a local path or a registry alias, using the local
+    cache before the registry
+    """
+    if os.path.exists(source):
+        return _load_from(_find_model(source), {"source": "path", "digest": None})
+    digest = model_cache.resolve(source)
+    origin = "cache"
+    if digest is None:
+        digest = fetch_from_registry(model_cache, source, WANDB_PROJECT, api_key=_wandb_api_key(), entity=WANDB_ENTITY)
+        origin = "registry"
+    return _load_from(_find_model(model_cache.entry_path(digest)), {"source": origin, "digest": digest})
 
-    run.finish()
-    model = joblib.load(model_path)
-    print(type(model))
-    return model
+def refresh_model_cache():
+    """
+    Pull the latest registry version of MODEL_ALIAS into the local cache.
+    The served model is left untouched; the new version is used on the next start.
+    """
+    try:
+        digest = fetch_from_registry(model_cache, MODEL_ALIAS, WANDB_PROJECT, api_key=_wandb_api_key(), entity=WANDB_ENTITY)
+        if digest != model_info.get("digest"):
+            print(f"Cached new version of {MODEL_ALIAS}: {digest}")
+    except Exception as e:
+        print(f"Failed to refresh model cache: {e}")
 
 try:
     model = _load_model()
 except Exception as e:
     print(f"Failed to load model: {e}")
     model = None
+model_info["time_to_healthy_seconds"] = time.perf_counter() - _IMPORT_STARTED if model is not None else None
+
+# synthetic comments used to warm a newly loaded model before it takes traffic
+WARMUP_TEXTS = [
+    "thanks for the helpful edit, great work",
+    "you are a stupid idiot and everyone hates you",
+    "I will find you and hurt you",
+    "neutral comment about the article history section",
+]
+
+reload_lock = threading.Lock()
+reload_state = {"state": "idle", "error": None, "requested": None, "finished_at": None}
+
+def _warm_up(candidate):
+    """
+    Run a few predictions so lazy initialisation happens before the swap, and reject
+    models whose output does not have one column per label
+    """
+    output = candidate.predict(WARMUP_TEXTS)
+    for _ in range(MODEL_WARMUP_ROUNDS - 1):
+        candidate.predict(WARMUP_TEXTS)
+    if len(output) != len(WARMUP_TEXTS) or any(len(row) != len(LABELS) for row in output):
+        raise ValueError("Candidate model output does not match the expected label layout")
+
+def _swap_model(candidate, candidate_info: dict):
+    """
+    Replace the served model. Requests already holding the old model finish on it.
+    """
+    global model, model_info
+    info = {**candidate_info, "swapped_at": datetime.now().isoformat(),
+            "time_to_healthy_seconds": model_info.get("time_to_healthy_seconds")}
+    with model_lock:
+        model, model_info = candidate, info
+    prediction_cache.clear()
+
+def _served():
+    """
+    The served model and its info as one pair, so a batch never scores with one
+    version and thresholds or caches under another
+    """
+    with model_lock:
+        return model, model_info
+
+def reload_model(path: str | None = None, alias: str | None = None):
+    """
+    Load, warm up and swap in a new model. Runs in a background thread and
+    keeps serving the current model if anything goes wrong.
+    """
+    reload_state.update(state="loading", error=None, requested={"path": path, "alias": alias})
+    try:
+        if path:
+            model_path, info = _find_model(path), {"source": "path", "digest": None}
+        else:
+            alias = alias or MODEL_ALIAS
+            digest = fetch_from_registry(model_cache, alias, WANDB_PROJECT, api_key=_wandb_api_key(), entity=WANDB_ENTITY)
+            model_path, info = _find_model(model_cache.entry_path(digest)), {"source": "registry", "digest": digest}
+        candidate, candidate_info = _load_from(model_path, info)
+        _warm_up(candidate)
+        _swap_model(candidate, candidate_info)
+        reload_state.update(state="idle")
+        print(f"Swapped in model version {candidate_info['version']}")
+    except Exception as e:
+        print(f"Failed to reload model: {e}")
+        reload_state.update(state="failed", error=str(e))
+    finally:
+        reload_state["finished_at"] = datetime.now().isoformat()
+        reload_lock.release()
+
+def _start_reload(path: str | None = None, alias: str | None = None) -> bool:
+    """
+    Start a background reload unless one is already running
+    """
+    if not reload_lock.acquire(blocking=False):
+        return False
+    threading.Thread(target=reload_model, kwargs={"path": path, "alias": alias}, name="model-reload", daemon=True).start()
+    return True
+
+def _watch_model():
+    """
+    Poll the model source and hot-swap whenever a new version shows up
+    """
+    while True:
+        time.sleep(MODEL_WATCH_INTERVAL)
+        try:
+            if MODEL_PATH:
+                model_path = _find_model(MODEL_PATH)
+                changed = _model_version(model_path, {}) != model_info.get("version")
+                if changed:
+                    _start_reload(path=MODEL_PATH)
+            else:
+                digest = fetch_from_registry(model_cache, MODEL_ALIAS, WANDB_PROJECT, api_key=_wandb_api_key(), entity=WANDB_ENTITY)
+                if digest != model_info.get("version"):
+                    _start_reload(alias=MODEL_ALIAS)
+        except Exception as e:
+            print(f"Model watcher failed: {e}")
+
+def _stage_timer(timed: bool):
+    return instrumentation.stage if timed else (lambda name: nullcontext())
+
+def _score_with(current_model, current_info: dict, texts: list[str], timed: bool = True):
+    """
+    Labels, per-label scores and score type from one vectorized scoring pass
+    """
+    stage = _stage_timer(timed)
+    with stage("vectorize"):
+        X = vectorize(current_model, texts)
+    with stage("classify"):
+        scores, score_type = matrix_scores(current_model, X)
+        config = current_info.get("thresholds") if APPLY_THRESHOLDS else None
+        labels = apply_thresholds(scores, threshold_vector(config, LABELS, score_type))
+    return labels, scores, score_type
+
+def _predict_with(current_model, current_info: dict, texts: list[str], timed: bool = True):
+    """
+    Labels for texts: tuned thresholds over the model scores when the model ships them,
+    otherwise model.predict. timed=False keeps the work out of the stage histograms.
+    """
+    if APPLY_THRESHOLDS and current_info.get("thresholds"):
+        return _score_with(current_model, current_info, texts, timed)[0]
+    stage = _stage_timer(timed)
+    with stage("vectorize"):
+        X = vectorize(current_model, texts)
+    with stage("classify"):
+        return classify(current_model, X)
+
+def _predict_texts(texts: list[str]):
+    """
+    Run one vectorized predict call against whichever model is currently loaded. Each
+    row comes back with the (model, info) pair that produced it.
+    """
+    served = _served()
+    return [(prediction, served) for prediction in _predict_with(*served, texts)]
+
+def _score_texts(texts: list[str]):
+    """
+    Run one vectorized scoring call and return (labels, scores, score_type) per text
+    """
+    labels, scores, score_type = _score_with(*_served(), texts)
+    return [(labels[i], scores[i], score_type) for i in range(len(texts))]
+
+batcher = MicroBatcher(_predict_texts, max_batch_size=PREDICT_MAX_BATCH_SIZE, max_wait_ms=PREDICT_MAX_WAIT_MS)
+# requests asking for scores are batched separately so plain requests keep the predict-only path
+scored_batcher = MicroBatcher(_score_texts, max_batch_size=PREDICT_MAX_BATCH_SIZE, max_wait_ms=PREDICT_MAX_WAIT_MS)
+prediction_cache = PredictionCache(
+    max_entries=PREDICTION_CACHE_SIZE,
+    max_bytes=PREDICTION_CACHE_MAX_BYTES,
+    ttl_seconds=PREDICTION_CACHE_TTL,
+)
+
+# route name -> (model, model info, batcher) for the MODEL_ROUTES models; the default route uses the globals above
+routed_models = {}
+route_weights = {}
+for route_name, route_source, route_weight in parse_routes(MODEL_ROUTES):
+    try:
+        route_model, route_info = _load_source(route_source)
+        route_batcher = MicroBatcher(partial(_predict_with, route_model, route_info),
+                                     max_batch_size=PREDICT_MAX_BATCH_SIZE, max_wait_ms=PREDICT_MAX_WAIT_MS)
+        routed_models[route_name] = (route_model, route_info, route_batcher)
+        route_weights[route_name] = route_weight
+    except Exception as e:
+        print(f"Failed to load model for route {route_name}: {e}")
+router = ModelRouter(route_weights)
+
+shadow_model, shadow_info, shadow = None, {}, None
+if SHADOW_MODEL:
+    try:
+        shadow_model, shadow_info = _load_source(SHADOW_MODEL)
+        shadow = ShadowScorer(LABELS, max_pending=SHADOW_MAX_PENDING, sample_rate=SHADOW_SAMPLE_RATE)
+    except Exception as e:
+        print(f"Failed to load shadow model: {e}")
+
+def _choose_route(requested: str | None, key: str) -> str:
+    try:
+        return router.choose(requested, key)
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown model route: {requested}")
+
+def _shadow_score(texts: list[str], predictions):
+    """
+    Hand served labels to the background shadow scorer, never waiting on it
+    """
+    if shadow is not None:
+        shadow.submit(texts, predictions, partial(_predict_with, shadow_model, shadow_info, timed=False))
 
 # create prediction request model
 class PredictionRequest(BaseModel):
     text: str
     true_labels: dict[str, int] = None  # expects keys: "toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"
+    return_scores: bool = False  # also return the per-label scores behind the labels
+
+# create model reload request model
+class ReloadRequest(BaseModel):
+    path: str | None = None  # local .joblib file or artifact directory
+    alias: str | None = None  # registry alias, defaults to MODEL_ALIAS
+
+# create batch prediction request model
+class BatchPredictionRequest(BaseModel):
+    items: list[PredictionRequest] = Field(min_length=1, max_length=MAX_BATCH_ITEMS)
+    return_scores: bool = False
+
+def _to_label_map(prediction) -> dict:
+    """
+    Convert one row of model output into a {label: 0/1} dict
+    """
+    return {label: int(prediction[i]) for i, label in enumerate(LABELS)}
+
+def _build_log(text: str, prediction_output: dict, true_labels: dict, timestamp: datetime | None = None,
+               scores=None, score_type: str | None = None) -> dict:
+    """
+    Build the log entry that is returned to the caller and written to DynamoDB
+    """
+    timestamp = timestamp or datetime.now()
+    log = {
+        "timestamp": timestamp.isoformat(),
+        "request_text": text,
+        'response': prediction_output,
+        'true_labels': true_labels
+    }
+    if scores is not None:
+        log['scores'] = {label: round(float(scores[i]), 6) for i, label in enumerate(LABELS)}
+        log['score_type'] = score_type
+    return log
+
+log_sink = PredictionLogSink(
+    table_name=DYNAMODB_TABLE_NAME,
+    region_name=AWS_REGION,
+    max_queue_size=LOG_QUEUE_SIZE,
+    flush_size=LOG_FLUSH_SIZE,
+    flush_interval=LOG_FLUSH_INTERVAL,
+    overflow_policy=LOG_OVERFLOW_POLICY,
+    spill_path=LOG_SPILL_PATH,
+)
+
+rollups = RollupAggregator(
+    table_name=ROLLUP_TABLE_NAME,
+    region_name=AWS_REGION,
+    labels=LABELS,
+    bucket_seconds=ROLLUP_BUCKET_SECONDS,
+    flush_interval=ROLLUP_FLUSH_INTERVAL,
+    max_pending_buckets=ROLLUP_MAX_PENDING_BUCKETS,
+) if ROLLUP_TABLE_NAME else None
+
+async def _write_log(log: dict):
+    """
+    Hand a single log entry to the background DynamoDB writer
+    """
+    if rollups is not None:
+        rollups.record(log)
+    if log_sink.overflow_policy == "block":
+        # a full queue would otherwise stall the event loop
+        await run_in_threadpool(log_sink.put, log)
+    else:
+        log_sink.put(log)
+
+def _write_logs(logs: list[dict]):
+    """
+    Hand several log entries to the background DynamoDB writer
+    """
+    if rollups is not None:
+        rollups.record_many(logs)
+    log_sink.put_many(logs)
 
 # generate startup event
 @app.on_event("startup")
@@ -58,6 +476,22 @@ def startup_event():
         print("Warning: Model not loaded")
     else:
         print("Model loaded successfully")
+    if MODEL_REFRESH_ON_START:
+        threading.Thread(target=refresh_model_cache, name="model-cache-refresh", daemon=True).start()
+    if MODEL_WATCH_INTERVAL > 0:
+        threading.Thread(target=_watch_model, name="model-watcher", daemon=True).start()
+
+# generate shutdown event
+@app.on_event("shutdown")
+def shutdown_event():
+    """
+    Shutdown event to drain buffered prediction logs and rollups to DynamoDB
+    """
+    if shadow is not None:
+        shadow.close(wait=False)
+    log_sink.close()
+    if rollups is not None:
+        rollups.close()
 
 # get health check endpoint
 @app.get("/health")
@@ -65,46 +499,217 @@ def health_check():
     """
     Health check endpoint to verify if the API is running
     """
+    startup = {
+        "model_version": model_info.get("version"),
+        "model_source": model_info.get("source"),
+        "model_engine": model_info.get("engine"),
+        "model_digest": model_info.get("digest"),
+        "model_load_seconds": model_info.get("load_seconds"),
+        "model_thresholds": model_info.get("thresholds"),
+        "time_to_healthy_seconds": model_info.get("time_to_healthy_seconds"),
+        "routes": {name: info.get("version") for name, (_, info, _) in routed_models.items()},
+        "shadow_model_version": shadow_info.get("version"),
+    }
     if model is None:
-        return {"status": "unhealthy", "message": "Model not loaded but app is running"}
-    return {"status": "healthy", "message": "Model loaded successfully and app is running"}
+        return {"status": "unhealthy", "message": "Model not loaded but app is running", **startup}
+    return {"status": "healthy", "message": "Model loaded successfully and app is running", **startup}
+
+def _check_admin_token(token: str | None):
+    if ADMIN_TOKEN and token != ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin token")
+
+# create model reload endpoint
+@app.post("/admin/reload", status_code=status.HTTP_202_ACCEPTED)
+def admin_reload(request: ReloadRequest | None = None, x_admin_token: str | None = Header(default=None)):
+    """
+    Load a new model in the background, warm it up and swap it in without a restart.
+    Defaults to the latest registry version of MODEL_ALIAS.
+    """
+    _check_admin_token(x_admin_token)
+    request = request or ReloadRequest()
+    if not _start_reload(path=request.path, alias=request.alias):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A model reload is already running")
+    return {"status": "reloading", "current_version": model_info.get("version")}
+
+# get model reload status endpoint
+@app.get("/admin/reload")
+def admin_reload_status(x_admin_token: str | None = Header(default=None)):
+    """
+    Report the state of the last model reload and the version currently served
+    """
+    _check_admin_token(x_admin_token)
+    return {**reload_state, "current_version": model_info.get("version")}
+
+# get stats endpoint
+@app.get("/stats")
+async def stats():
+    """
+    Stats endpoint reporting micro-batcher, log writer, prediction cache, routing and shadow counters
+    """
+    return {
+        "batcher": batcher.stats(),
+        "scored_batcher": scored_batcher.stats(),
+        "log_sink": log_sink.stats(),
+        "rollups": rollups.stats() if rollups is not None else None,
+        "prediction_cache": prediction_cache.stats(),
+        "router": router.stats(),
+        "route_batchers": {name: route_batcher.stats() for name, (_, _, route_batcher) in routed_models.items()},
+        "shadow": shadow.stats() if shadow is not None else None,
+    }
+
+def _stats_gauges(component: str, stats: dict | None) -> dict:
+    """
+    Numeric entries of a stats() dict as gauges named <component>_<key>
+    """
+    return {
+        f"{component}_{key}": (value, f"{key} reported by the {component.replace('_', ' ')} in /stats.")
+        for key, value in (stats or {}).items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+
+# get Prometheus metrics endpoint
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus text-format metrics: request and stage latency histograms, in-flight
+    requests, model load time and the batcher, cache and log writer counters
+    """
+    gauges = {
+        "model_loaded": (int(model is not None), "1 when a model is loaded."),
+        "model_load_seconds": (model_info.get("load_seconds"), "Seconds spent loading the served model."),
+        "time_to_healthy_seconds": (model_info.get("time_to_healthy_seconds"), "Seconds from import to a loaded model."),
+        **_stats_gauges("batcher", batcher.stats()),
+        **_stats_gauges("scored_batcher", scored_batcher.stats()),
+        **_stats_gauges("prediction_cache", prediction_cache.stats()),
+        **_stats_gauges("log_sink", log_sink.stats()),
+        **_stats_gauges("rollups", rollups.stats() if rollups is not None else None),
+        **_stats_gauges("route_requests", router.stats()["requests"]),
+        **_stats_gauges("shadow", shadow.stats() if shadow is not None else None),
+    }
+    return PlainTextResponse(instrumentation.render(gauges), media_type="text/plain; version=0.0.4")
+
+profiler = SamplingProfiler()
+
+# get sampling profile endpoint
+@app.get("/debug/profile", response_class=PlainTextResponse)
+def debug_profile(seconds: float = Query(default=5.0, gt=0, le=60), limit: int = Query(default=200, gt=0),
+                  x_admin_token: str | None = Header(default=None)):
+    """
+    Sample every thread's stack for the given number of seconds and return folded
+    stacks for a flamegraph. Only available when DEBUG_PROFILING=1.
+    """
+    if not DEBUG_PROFILING:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is disabled")
+    _check_admin_token(x_admin_token)
+    return PlainTextResponse(SamplingProfiler.folded(profiler.profile(seconds), limit))
 
 # create predict endpoint
 @app.post("/predict")
-def predict(request: PredictionRequest):
+async def predict(request: PredictionRequest, x_model: str | None = Header(default=None)):
     """
     Predict endpoint to predict the sentiment of the provided review text.
     Returns a JSON object with the predicted sentiment, "positive" or "negative"
     """
+    instrumentation.observe_validation()
+    route = _choose_route(x_model, request.text)
     # check if model is loaded  
-    if model is None:
+    if route == DEFAULT_ROUTE and model is None:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Model not loaded")
     
     # predict sentiment
     try:
-        prediction = model.predict([request.text])[0]
-        labels = ["toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"]
-        prediction_output = {}
-        for i, label in enumerate(labels):
-            prediction_output[label] = int(prediction[i])
+        scores = score_type = None
+        if route != DEFAULT_ROUTE:
+            # routed models have their own batcher and skip the default model's cache
+            route_model, route_info, route_batcher = routed_models[route]
+            if request.return_scores:
+                labels, route_scores, score_type = await run_in_threadpool(_score_with, route_model, route_info, [request.text])
+                prediction, scores = labels[0], route_scores[0]
+            else:
+                prediction = await route_batcher.submit(request.text)
+        elif request.return_scores:
+            # labels and scores come from the same scoring pass
+            prediction, scores, score_type = await scored_batcher.submit(request.text)
+        else:
+            # repeated comments are answered from the cache without running the vectorizer
+            current_model, current_info = _served()
+            generation = prediction_cache.bind(current_model)
+            version = current_info.get("version")
+            prediction = prediction_cache.get(request.text, version)
+            if prediction is None:
+                # concurrent requests are gathered into one vectorized model call
+                prediction, (batch_model, _) = await batcher.submit(request.text)
+                # a swap between the lookup and the batch must not cache under the old version
+                if batch_model is current_model:
+                    prediction_cache.put(request.text, version, prediction, generation)
+        prediction_output = _to_label_map(prediction)
         print('prediction output: ', prediction_output)
         # create log entry
-        log = {
-            "timestamp": datetime.now().isoformat(),
-            "request_text": request.text,
-            'response': prediction_output,
-            'true_labels': request.true_labels
-        }
-        # write log entry to DynamoDB
-        try:
-            dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
-            table = dynamodb.Table(DYNAMODB_TABLE_NAME)
-            table.put_item(
-                Item = log
-            )
-        except Exception as db_error:
-            print(f'Error saving prediction to DynamoDB: {db_error}')
+        log = _build_log(request.text, prediction_output, request.true_labels, scores=scores, score_type=score_type)
+        if routed_models:
+            log['model'] = route
+        _shadow_score([request.text], [prediction])
+        # queue log entry for the background DynamoDB writer
+        with instrumentation.stage("log_write"):
+            await _write_log(log)
         return log
 
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error predicting sentiment: {e}")
+
+# create batch predict endpoint
+@app.post("/predict/batch")
+def predict_batch(request: BatchPredictionRequest, x_model: str | None = Header(default=None)):
+    """
+    Batch predict endpoint that runs every comment through the model as a single sparse matrix.
+    Returns a JSON object with one log entry per input item, in the same order as the request.
+    """
+    instrumentation.observe_validation()
+    # the whole batch goes to one route
+    route = _choose_route(x_model, request.items[0].text)
+    # check if model is loaded
+    # hold on to the current model so a hot-swap mid-request cannot mix versions
+    if route == DEFAULT_ROUTE:
+        current_model, current_info = _served()
+    else:
+        current_model, current_info, _ = routed_models[route]
+    if current_model is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Model not loaded")
+
+    try:
+        texts = [item.text for item in request.items]
+        scores = [None] * len(texts)
+        score_type = None
+        if request.return_scores:
+            # one vectorized scoring call gives both labels and scores
+            predictions, scores, score_type = _score_with(current_model, current_info, texts)
+        elif route != DEFAULT_ROUTE:
+            predictions = _predict_with(current_model, current_info, texts)
+        else:
+            # serve repeated comments from the cache, then one vectorized call for the rest
+            generation = prediction_cache.bind(current_model)
+            version = current_info.get("version")
+            predictions = [prediction_cache.get(text, version) for text in texts]
+            misses = [i for i, prediction in enumerate(predictions) if prediction is None]
+            if misses:
+                for i, prediction in zip(misses, _predict_with(current_model, current_info, [texts[i] for i in misses])):
+                    predictions[i] = prediction
+                    prediction_cache.put(texts[i], version, prediction, generation)
+
+        # DynamoDB is keyed on timestamp, so give every item in the batch its own
+        base_time = datetime.now()
+        logs = [
+            _build_log(item.text, _to_label_map(prediction), item.true_labels, base_time + timedelta(microseconds=i),
+                       scores=scores[i], score_type=score_type)
+            for i, (item, prediction) in enumerate(zip(request.items, predictions))
+        ]
+        if routed_models:
+            for log in logs:
+                log['model'] = route
+        _shadow_score(texts, predictions)
+        with instrumentation.stage("log_write"):
+            _write_logs(logs)
+        return {"count": len(logs), "results": logs}
+
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error predicting batch: {e}")
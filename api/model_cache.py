@@ -0,0 +1,116 @@
+import json
+import os
+import shutil
+import tempfile
+
+INDEX_FILE = "index.json"
+METADATA_FILE = "metadata.json"
+
+
+def find_model_file(path: str) -> str:
+    """
+    Return the .joblib file at path, or the first one inside path if it is a directory
+    """
+    if os.path.isfile(path):
+        return path
+    for filename in sorted(os.listdir(path)):
+        if filename.endswith(".joblib"):
+            return os.path.join(path, filename)
+    raise FileNotFoundError(f"No .joblib file found in {path}")
+
+
+class ModelCache:
+    """
+    Content-addressed local cache of model artifacts.
+
+    Each artifact version lives in <cache_dir>/<digest>/ together with a metadata.json,
+    and index.json maps aliases such as "log_reg_model:latest" to the digest they last
+    resolved to. Loading from the cache needs no network access and no W&B run.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, INDEX_FILE)
+
+    def _read_index(self) -> dict:
+        try:
+            with open(self._index_path()) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_index(self, index: dict):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self._index_path())
+
+    def entry_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, digest)
+
+    def has(self, digest: str) -> bool:
+        return os.path.isfile(os.path.join(self.entry_path(digest), METADATA_FILE))
+
+    def resolve(self, alias: str) -> str | None:
+        """
+        Return the digest an alias last resolved to, if that entry is still cached
+        """
+        digest = self._read_index().get(alias)
+        if digest and self.has(digest):
+            return digest
+        return None
+
+    def metadata(self, digest: str) -> dict:
+        with open(os.path.join(self.entry_path(digest), METADATA_FILE)) as f:
+            return json.load(f)
+
+    def store(self, alias: str, digest: str, source_dir: str, metadata: dict | None = None) -> str:
+        """
+        Copy a downloaded artifact into the cache under its digest and point alias at it
+        """
+        target = self.entry_path(digest)
+        if not self.has(digest):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            staging = tempfile.mkdtemp(dir=self.cache_dir, suffix=".partial")
+            shutil.copytree(source_dir, staging, dirs_exist_ok=True)
+            with open(os.path.join(staging, METADATA_FILE), "w") as f:
+                json.dump({"alias": alias, "digest": digest, **(metadata or {})}, f, indent=2)
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            os.replace(staging, target)
+        self.link(alias, digest)
+        return target
+
+    def link(self, alias: str, digest: str):
+        index = self._read_index()
+        index[alias] = digest
+        self._write_index(index)
+
+
+def fetch_from_registry(cache: ModelCache, alias: str, project: str, api_key: str | None = None, entity: str | None = None) -> str:
+    """
+    Resolve alias in the W&B registry and make sure that version is in the cache.
+    Uses the public API only, so no W&B run is started. Returns the artifact digest.
+    """
+    # imported here so serving a local or compact model never loads wandb
+    import wandb
+
+    api = wandb.Api(api_key=api_key) if api_key else wandb.Api()
+    name = f"{entity}/{project}/{alias}" if entity else f"{project}/{alias}"
+    artifact = api.artifact(name, type="model")
+    digest = artifact.digest
+
+    if cache.has(digest):
+        cache.link(alias, digest)
+        return digest
+
+    with tempfile.TemporaryDirectory() as download_dir:
+        artifact.download(root=download_dir)
+        cache.store(alias, digest, download_dir, metadata={
+            "version": artifact.version,
+            "artifact_metadata": artifact.metadata,
+        })
+    return digest
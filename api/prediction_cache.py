@@ -0,0 +1,124 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# rough per-entry cost of the OrderedDict slot, key bytes object, tuple and expiry float
+ENTRY_OVERHEAD_BYTES = 240
+
+
+def normalize_text(text: str) -> str:
+    """
+    Collapse whitespace and lowercase, matching what the TF-IDF tokenizer ignores anyway
+    """
+    return " ".join(text.split()).lower()
+
+def cache_key(text: str, model_version: str | None) -> bytes:
+    return hashlib.sha256(f"{model_version}\0{normalize_text(text)}".encode("utf-8")).digest()
+
+class PredictionCache:
+    """
+    LRU cache of label vectors for repeated comment texts, with a TTL and a memory bound.
+
+    Keys are a sha256 of the model version and the normalized text. The cache belongs
+    to one model object: the first lookup against a different model clears it, so a
+    hot-swap never serves labels from the previous model. A prediction started before
+    the clear is not stored afterwards (see generation).
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 16 * 1024 * 1024, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.generation = 0
+
+        self._entries = OrderedDict()  # key -> (labels, expires_at, size)
+        self._bytes = 0
+        self._model_id = None
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._entries.clear()
+        self._bytes = 0
+        self.generation += 1
+        self._counts["invalidations"] += 1
+
+    def bind(self, model) -> int:
+        """
+        Clear the cache if model is not the one it was filled from. Returns the generation
+        to pass to put() once a prediction for a miss is ready.
+        """
+        with self._lock:
+            if self._model_id != id(model):
+                if self._model_id is not None:
+                    self._clear()
+                self._model_id = id(model)
+            return self.generation
+
+    def get(self, text: str, model_version: str | None):
+        """
+        Cached label vector for text, or None
+        """
+        if not self.enabled:
+            return None
+        key = cache_key(text, model_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counts["misses"] += 1
+                return None
+            labels, expires_at, size = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self._counts["expirations"] += 1
+                self._counts["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counts["hits"] += 1
+            return labels
+
+    def put(self, text: str, model_version: str | None, prediction, generation: int | None = None):
+        if not self.enabled:
+            return
+        key = cache_key(text, model_version)
+        labels = tuple(int(v) for v in prediction)
+        size = len(key) + 8 * len(labels) + ENTRY_OVERHEAD_BYTES
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                # the model changed while this prediction was running
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (labels, time.monotonic() + self.ttl_seconds, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._counts["evictions"] += 1
+
+    def stats(self) -> dict:
+        """
+        Snapshot of size and counters for the /stats endpoint
+        """
+        with self._lock:
+            lookups = self._counts["hits"] + self._counts["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hit_rate": self._counts["hits"] / lookups if lookups else 0.0,
+                **self._counts,
+            }
@@ -0,0 +1,176 @@
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+ROLLUP_KEY = "bucket"
+
+
+def bucket_start(timestamp: datetime, bucket_seconds: int = 60) -> str:
+    """
+    ISO string of the start of the bucket holding timestamp, used as the rollup key.
+    Buckets are aligned on the epoch, so any bucket_seconds works, not only divisors of an hour.
+    """
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc if timestamp.tzinfo else None)
+    offset = ((timestamp - epoch) // timedelta(seconds=1)) % bucket_seconds
+    start = timestamp - timedelta(seconds=offset, microseconds=timestamp.microsecond)
+    return start.isoformat(timespec="seconds")
+
+def rollup_counts(log: dict, labels: list[str]) -> Counter:
+    """
+    Counters one prediction log adds to its bucket: count, pos_<label>, and when true
+    labels were sent, labelled_count, exact_count and tp_/fp_/fn_/tn_<label>. Without
+    true labels, unlabelled_exact_count counts the predictions with no positive label,
+    the ones the dashboard's log metrics score as exact matches.
+    """
+    counts = Counter(count=1)
+    response = log.get("response") or {}
+    true_labels = log.get("true_labels")
+    for label in labels:
+        if response.get(label):
+            counts[f"pos_{label}"] += 1
+    if not true_labels and not any(response.get(label) for label in labels):
+        counts["unlabelled_exact_count"] += 1
+    if true_labels:
+        counts["labelled_count"] += 1
+        exact = True
+        for label in labels:
+            pred, true = int(response.get(label, 0)), int(true_labels.get(label, 0) or 0)
+            kind = ("tp" if pred else "fn") if true else ("fp" if pred else "tn")
+            counts[f"{kind}_{label}"] += 1
+            exact = exact and pred == true
+        if exact:
+            counts["exact_count"] += 1
+    return counts
+
+class RollupAggregator:
+    """
+    Per-minute metric rollups kept next to the raw prediction logs.
+
+    Every logged prediction is folded into an in-memory counter for its time bucket.
+    A background thread flushes the counters every flush_interval seconds with one
+    UpdateItem ADD per bucket, so several API workers can add to the same row and the
+    dashboard reads a handful of small items instead of every raw log. Counters that
+    fail to write are kept and retried on the next flush; while the table stays
+    unreachable at most max_pending_buckets are kept and the oldest are dropped.
+    """
+
+    def __init__(self, table_name: str, region_name: str, labels: list[str], bucket_seconds: int = 60,
+                 flush_interval: float = 10.0, autostart: bool = True, max_pending_buckets: int = 1440):
+        self.table_name = table_name
+        self.region_name = region_name
+        self.labels = list(labels)
+        self.bucket_seconds = bucket_seconds
+        self.flush_interval = flush_interval
+        self.autostart = autostart
+        self.max_pending_buckets = max_pending_buckets
+
+        self._pending = {}  # bucket -> Counter
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._table = None
+        self._counts = {"recorded": 0, "updates": 0, "failed": 0, "flushes": 0, "dropped_buckets": 0}
+
+    def _get_table(self):
+        if self._table is None:
+            # boto3 is imported on the first flush, off the startup path
+            import boto3
+            from botocore.config import Config
+
+            session = boto3.session.Session()
+            dynamodb = session.resource(
+                "dynamodb",
+                region_name=self.region_name,
+                config=Config(retries={"max_attempts": 5, "mode": "adaptive"}),
+            )
+            self._table = dynamodb.Table(self.table_name)
+        return self._table
+
+    def start(self):
+        """
+        Start the flush thread if it is not already running
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="rollup-flusher", daemon=True)
+            self._thread.start()
+
+    def record(self, log: dict):
+        """
+        Add one prediction log to its bucket
+        """
+        self.record_many([log])
+
+    def record_many(self, logs: list[dict]):
+        if self.autostart:
+            self.start()
+        updates = [(bucket_start(datetime.fromisoformat(log["timestamp"]), self.bucket_seconds),
+                    rollup_counts(log, self.labels)) for log in logs]
+        with self._lock:
+            for bucket, counts in updates:
+                self._pending.setdefault(bucket, Counter()).update(counts)
+            self._counts["recorded"] += len(updates)
+
+    def flush(self):
+        """
+        Write the pending counters to DynamoDB with UpdateItem ADD
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+            failed = {}
+            for bucket, counts in pending.items():
+                try:
+                    self._add(bucket, counts)
+                    self._counts["updates"] += 1
+                except Exception as db_error:
+                    print(f'Error saving rollup {bucket} to DynamoDB: {db_error}')
+                    self._counts["failed"] += 1
+                    failed[bucket] = counts
+            self._counts["flushes"] += 1
+            if failed:
+                with self._lock:
+                    for bucket, counts in failed.items():
+                        self._pending.setdefault(bucket, Counter()).update(counts)
+                    # bucket keys are ISO timestamps, so sorting them puts the oldest first
+                    overflow = len(self._pending) - self.max_pending_buckets
+                    for bucket in sorted(self._pending)[:max(overflow, 0)]:
+                        del self._pending[bucket]
+                    if overflow > 0:
+                        print(f'Dropped {overflow} rollup buckets that could not be written')
+                        self._counts["dropped_buckets"] += overflow
+
+    def _add(self, bucket: str, counts: Counter):
+        names = {f"#a{i}": name for i, name in enumerate(counts)}
+        values = {f":a{i}": int(value) for i, value in enumerate(counts.values())}
+        expression = "ADD " + ", ".join(f"#a{i} :a{i}" for i in range(len(counts)))
+        self._get_table().update_item(
+            Key={ROLLUP_KEY: bucket},
+            UpdateExpression=expression,
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self, timeout: float = 10.0):
+        """
+        Stop the flush thread and write whatever is still pending
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending_buckets": pending, **self._counts}
@@ -0,0 +1,156 @@
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# name of the route served by MODEL_PATH / MODEL_ALIAS
+DEFAULT_ROUTE = "default"
+
+
+def parse_routes(raw: str | None) -> list[tuple[str, str, float]]:
+    """
+    Parse MODEL_ROUTES, a comma-separated list of name=source@weight entries such as
+    "svm=linear_svm_model:latest@10,nb=multi_nb_model:latest@5". source is a registry
+    alias or a local path, weight a percentage of traffic (0 means header-only).
+    """
+    routes = []
+    for entry in (raw or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, rest = entry.partition("=")
+        source, _, weight = rest.rpartition("@") if "@" in rest else (rest, "", "0")
+        if not sep or not name.strip() or not source.strip():
+            raise ValueError(f"MODEL_ROUTES entry must look like name=source@weight, got {entry!r}")
+        if name.strip() == DEFAULT_ROUTE:
+            raise ValueError(f"{DEFAULT_ROUTE!r} is reserved for MODEL_PATH / MODEL_ALIAS")
+        routes.append((name.strip(), source.strip(), float(weight)))
+    return routes
+
+class ModelRouter:
+    """
+    Picks the model that answers a request: the one named in the X-Model header, or one
+    drawn by weight. The draw is a hash of the comment text, so a repeated comment always
+    goes to the same model. The default route gets whatever weight the others leave.
+    """
+
+    def __init__(self, weights: dict[str, float]):
+        extra = sum(weight for name, weight in weights.items() if name != DEFAULT_ROUTE)
+        if extra > 100:
+            raise ValueError(f"Route weights add up to {extra}, more than 100")
+        self.weights = {DEFAULT_ROUTE: 100.0 - extra,
+                        **{name: weight for name, weight in weights.items() if name != DEFAULT_ROUTE}}
+        self._names = list(self.weights)
+        self._bounds = np.cumsum([self.weights[name] for name in self._names]) / 100.0
+        self._counts = {name: 0 for name in self._names}
+        self._lock = threading.Lock()
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._names)
+
+    def choose(self, requested: str | None = None, key: str | None = None) -> str:
+        """
+        Route name for a request. Raises KeyError for an unknown requested route.
+        """
+        if requested:
+            if requested not in self.weights:
+                raise KeyError(requested)
+            name = requested
+        else:
+            u = zlib.crc32(key.encode("utf-8")) / 2 ** 32 if key is not None else random.random()
+            name = self._names[min(int(np.searchsorted(self._bounds, u, side="right")), len(self._names) - 1)]
+        with self._lock:
+            self._counts[name] += 1
+        return name
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"weights": dict(self.weights), "requests": dict(self._counts)}
+
+class ShadowScorer:
+    """
+    Scores a sample of served comments with a shadow model in a background thread and
+    counts how often its labels disagree with the ones returned to the caller.
+
+    submit() never blocks: when max_pending comments are already waiting the new ones
+    are dropped, so the shadow model cannot slow down or back up the primary path.
+    A summary line is printed every log_every comparisons.
+    """
+
+    def __init__(self, labels: list[str], max_pending: int = 1000, sample_rate: float = 1.0, log_every: int = 1000):
+        self.labels = list(labels)
+        self.max_pending = max_pending
+        self.sample_rate = sample_rate
+        self.log_every = log_every
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._label_disagreements = np.zeros(len(self.labels), dtype=np.int64)
+        self._counts = {"compared": 0, "disagreements": 0, "shadow_positive_only": 0, "primary_positive_only": 0,
+                        "dropped": 0, "skipped": 0, "errors": 0}
+        self._shadow_seconds = 0.0
+        self._next_log = log_every
+
+    def submit(self, texts: list[str], primary_labels, predict_fn) -> bool:
+        """
+        Queue texts for predict_fn and compare its labels with primary_labels. Returns
+        False when the comments were sampled out or dropped.
+        """
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            with self._lock:
+                self._counts["skipped"] += len(texts)
+            return False
+        with self._lock:
+            if self._pending + len(texts) > self.max_pending:
+                self._counts["dropped"] += len(texts)
+                return False
+            self._pending += len(texts)
+        self._executor.submit(self._run, list(texts), np.asarray(primary_labels, dtype=np.int64), predict_fn)
+        return True
+
+    def _run(self, texts, primary, predict_fn):
+        start = time.perf_counter()
+        try:
+            shadow = np.asarray(predict_fn(texts), dtype=np.int64).reshape(primary.shape)
+        except Exception as e:
+            print(f"Shadow scoring failed: {e}")
+            with self._lock:
+                self._counts["errors"] += len(texts)
+                self._pending -= len(texts)
+            return
+        elapsed = time.perf_counter() - start
+        diff = shadow != primary
+        with self._lock:
+            self._pending -= len(texts)
+            self._shadow_seconds += elapsed
+            self._counts["compared"] += len(texts)
+            self._counts["disagreements"] += int(diff.any(axis=1).sum())
+            self._counts["shadow_positive_only"] += int((shadow > primary).sum())
+            self._counts["primary_positive_only"] += int((primary > shadow).sum())
+            self._label_disagreements += diff.sum(axis=0)
+            log_now = self._counts["compared"] >= self._next_log
+            if log_now:
+                self._next_log += self.log_every
+        if log_now:
+            stats = self.stats()
+            print(f"Shadow model disagrees on {stats['disagreement_rate']:.2%} of {stats['compared']} comments")
+
+    def stats(self) -> dict:
+        with self._lock:
+            compared = self._counts["compared"]
+            return {
+                **self._counts,
+                "pending": self._pending,
+                "disagreement_rate": self._counts["disagreements"] / compared if compared else 0.0,
+                "shadow_seconds_per_comment": self._shadow_seconds / compared if compared else 0.0,
+                **{f"disagreement_rate_{label}": int(n) / compared if compared else 0.0
+                   for label, n in zip(self.labels, self._label_disagreements)},
+            }
+
+    def close(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,109 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+from compact_model import COMPACT_META_FILE
+from linear_scorer import LinearScorer
+
+THRESHOLDS_FILE = "thresholds.json"
+# score above which a label is predicted when the model ships no tuned thresholds
+DEFAULT_THRESHOLDS = {"probability": 0.5, "decision": 0.0}
+
+
+def _is_pipeline(model) -> bool:
+    """
+    isinstance check against sklearn's Pipeline without importing sklearn: a model
+    unpickled as a Pipeline has already imported it, so if it is not loaded the model
+    cannot be one
+    """
+    pipeline = sys.modules.get("sklearn.pipeline")
+    return pipeline is not None and isinstance(model, pipeline.Pipeline)
+
+def vectorize(model, texts: list[str]):
+    """
+    Feature matrix for a Pipeline or LinearScorer; other models get the texts unchanged
+    """
+    if _is_pipeline(model):
+        return model[:-1].transform(texts)
+    if isinstance(model, LinearScorer):
+        return model.transform(texts)
+    return texts
+
+def classify(model, X) -> np.ndarray:
+    """
+    Labels for the output of vectorize
+    """
+    if _is_pipeline(model):
+        return model.steps[-1][1].predict(X)
+    if isinstance(model, LinearScorer):
+        return (model.decision_from_matrix(X) > 0).astype(np.int64)
+    return model.predict(X)
+
+def matrix_scores(model, X):
+    """
+    Per-label scores of shape (n, n_labels) and their type for the output of vectorize.
+    "probability" for logistic regression and naive Bayes, "decision" margins otherwise,
+    matching classifier_scores in models/model_training.py.
+    """
+    if isinstance(model, LinearScorer):
+        margins = model.decision_from_matrix(X)
+        if model.score_type == "log_odds":
+            from scipy.special import expit
+            return expit(margins), "probability"
+        return np.asarray(margins, dtype=np.float64), "decision"
+
+    clf = model.steps[-1][1] if _is_pipeline(model) else model
+    if hasattr(clf, "predict_proba"):
+        proba = clf.predict_proba(X)
+        if isinstance(proba, list):
+            # MultiOutputClassifier returns one (n, n_classes) array per label
+            proba = np.column_stack([
+                p[:, list(est.classes_).index(1)] if 1 in est.classes_ else np.zeros(p.shape[0])
+                for p, est in zip(proba, clf.estimators_)
+            ])
+        return np.asarray(proba, dtype=np.float64), "probability"
+    return np.asarray(clf.decision_function(X), dtype=np.float64), "decision"
+
+def model_scores(model, texts: list[str]):
+    """
+    Per-label scores and their type from one vectorized pass over texts
+    """
+    return matrix_scores(model, vectorize(model, texts))
+
+def threshold_vector(config: dict | None, labels: list[str], score_type: str) -> np.ndarray:
+    """
+    Threshold per label for the served score type, falling back to the default for
+    labels without a tuned value or when the tuned values are for another score type
+    """
+    default = DEFAULT_THRESHOLDS[score_type]
+    if not config or config.get("score_type") != score_type:
+        return np.full(len(labels), default)
+    tuned = config.get("thresholds", {})
+    return np.array([float(tuned.get(label, default)) for label in labels])
+
+def apply_thresholds(scores: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    return (scores > thresholds).astype(np.int64)
+
+def load_threshold_config(model_path: str, artifact_metadata: dict | None = None) -> dict | None:
+    """
+    Tuned thresholds shipped with a model: thresholds.json next to the model file or in
+    the artifact directory above a compact model, otherwise the artifact metadata.
+    Only a compact model directory looks one level up, so a joblib file in a shared
+    directory never picks up an unrelated thresholds.json from its parent.
+    """
+    directory = model_path if os.path.isdir(model_path) else os.path.dirname(model_path)
+    candidates = [directory]
+    if os.path.isfile(os.path.join(directory, COMPACT_META_FILE)):
+        candidates.append(os.path.dirname(directory))
+    for candidate in candidates:
+        path = os.path.join(candidate, THRESHOLDS_FILE)
+        if os.path.isfile(path):
+            print(f"Applying tuned thresholds from {path}")
+            with open(path) as f:
+                return json.load(f)
+    if artifact_metadata and artifact_metadata.get("thresholds"):
+        print("Applying tuned thresholds from the artifact metadata")
+        return {"score_type": artifact_metadata.get("score_type"), "thresholds": artifact_metadata["thresholds"]}
+    return None
@@ -0,0 +1,141 @@
+"""
+Measure the cold-start cost of importing the API (or any module) in fresh interpreters.
+
+Each run imports the modules in a new process and records the wall time of the import
+and the modules it loaded. One extra run under `python -X importtime` gives the
+cumulative cost of every import and the self time summed per top-level package.
+
+    python startup_profile.py                         # main.py, without loading a model
+    python startup_profile.py --budget 2.0            # exits 1 when the import is slower
+    python startup_profile.py --path ../monitoring --module log_store rollup_store metrics rolling
+    python startup_profile.py --env MODEL_PATH=model.joblib --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from cli_env import parse_env
+
+# dependencies that should stay off the startup path until a request needs them
+HEAVY_MODULES = ("wandb", "boto3", "botocore", "sklearn", "scipy.sparse", "scipy.special")
+
+_SNIPPET = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "{imports}\n"
+    "print(json.dumps({{'seconds': time.perf_counter() - start, 'modules': sorted(sys.modules)}}))\n"
+)
+
+
+def parse_importtime(stderr: str) -> list[dict]:
+    """
+    Rows of `python -X importtime` output: module name, nesting depth, and self and
+    cumulative import time in microseconds
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_us": int(parts[0]),
+            "cumulative_us": int(parts[1]),
+        })
+    return rows
+
+def package_totals(rows: list[dict]) -> dict[str, int]:
+    """
+    Self import time summed per top-level package, slowest first
+    """
+    totals = {}
+    for row in rows:
+        package = row["module"].split(".")[0]
+        totals[package] = totals.get(package, 0) + row["self_us"]
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+def cold_start(modules: list[str], path: str = ".", env: dict | None = None, importtime: bool = False) -> dict:
+    """
+    Import modules in a fresh interpreter started in path. Returns the import wall time in
+    seconds, every module loaded by then and, with importtime, the parsed -X importtime rows.
+    """
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else [])
+    cmd += ["-c", _SNIPPET.format(imports="\n".join(f"import {module}" for module in modules))]
+    try:
+        proc = subprocess.run(cmd, cwd=path, env={**os.environ, **(env or {})}, capture_output=True, text=True,
+                              check=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"importing {', '.join(modules)} failed:\n{e.stderr[-2000:]}") from e
+    # the modules may print while importing, the measurement is the last line
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    if importtime:
+        result["importtime"] = parse_importtime(proc.stderr)
+    return result
+
+def profile(modules: list[str], path: str = ".", env: dict | None = None, repeats: int = 3, top: int = 15) -> dict:
+    """
+    Median import time of repeats cold starts, the heavy modules they loaded and the
+    slowest imports and packages from one -X importtime run
+    """
+    runs = [cold_start(modules, path, env) for _ in range(repeats)]
+    rows = cold_start(modules, path, env, importtime=True)["importtime"]
+    slowest = sorted(rows, key=lambda row: -row["cumulative_us"])[:top]
+    return {
+        "modules": modules,
+        "seconds": statistics.median(run["seconds"] for run in runs),
+        "runs": [run["seconds"] for run in runs],
+        "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in runs[0]["modules"]],
+        "slowest_imports": [{"module": row["module"], "cumulative_ms": row["cumulative_us"] / 1000} for row in slowest],
+        "packages_ms": {package: us / 1000 for package, us in list(package_totals(rows).items())[:top]},
+    }
+
+def print_report(report: dict):
+    print(f"import {', '.join(report['modules'])}: {report['seconds']:.3f}s "
+          f"(runs: {', '.join(f'{s:.3f}' for s in report['runs'])})")
+    print(f"heavy modules loaded: {', '.join(report['heavy_modules_loaded']) or 'none'}")
+    print("\nslowest imports (cumulative ms):")
+    for row in report["slowest_imports"]:
+        print(f"  {row['cumulative_ms']:9.1f}  {row['module']}")
+    print("\nper package (self ms):")
+    for package, ms in report["packages_ms"].items():
+        print(f"  {ms:9.1f}  {package}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", nargs="+", default=["main"], help="modules to import")
+    parser.add_argument("--path", default=".", help="directory the interpreter starts in")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="environment for the import, e.g. MODEL_PATH=model.joblib")
+    parser.add_argument("--repeats", type=int, default=3, help="cold starts to take the median of")
+    parser.add_argument("--top", type=int, default=15, help="imports and packages listed")
+    parser.add_argument("--budget", type=float, default=None, help="fail when the median import takes longer (seconds)")
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as empty_dir:
+        env = parse_env(args.env)
+        if args.module == ["main"]:
+            # without a model the API would resolve MODEL_ALIAS in the registry; measure the app itself
+            env.setdefault("MODEL_PATH", empty_dir)
+        report = profile(args.module, args.path, env, args.repeats, args.top)
+    report["budget_seconds"] = args.budget
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.budget is not None and report["seconds"] > args.budget:
+        print(f"OVER BUDGET {report['seconds']:.3f}s > {args.budget:.3f}s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
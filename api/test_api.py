@@ -2,8 +2,13 @@ import os
 import pytest
 import main
 from fastapi.testclient import TestClient
+import time
+import asyncio
 import warnings
-from unittest.mock import patch, MagicMock
+from functools import partial
+from unittest.mock import patch, MagicMock, AsyncMock
+from batching import MicroBatcher
+from routing import ModelRouter, ShadowScorer
 
 warnings.filterwarnings("ignore")
 client = TestClient(main.app)
@@ -58,8 +63,212 @@ def test_predict_negative():
 def test_health():
     main.startup_event()
     response = client.get("/health")
-    assert response.json() == {
-                "status": "healthy",
-                "message": "Model loaded successfully and app is running"
-            }
-    assert response.status_code == 200
\ No newline at end of file
+    body = response.json()
+    assert body["status"] == "healthy"
+    assert body["message"] == "Model loaded successfully and app is running"
+    for key in ["model_source", "model_digest", "model_load_seconds", "time_to_healthy_seconds"]:
+        assert key in body
+    assert response.status_code == 200
+
+def mock_predict_batch(input):
+    # Return one row per input text, flagging anything containing "stupid" as toxic
+    return [[int("stupid" in text), 0, 0, 0, 0, 0] for text in input]
+
+@patch.object(main, 'model', MagicMock(predict=mock_predict_batch))
+@patch.object(main, '_write_logs', MagicMock())
+def test_predict_batch_preserves_order():
+    items = [
+        {"text": "nice love happy good"},
+        {"text": "you are stupid", "true_labels": {"toxic": 1}},
+        {"text": "neutral comment"},
+    ]
+    response = client.post("/predict/batch", json={"items": items})
+    assert response.status_code == 200
+    response = response.json()
+    assert response['count'] == 3
+    assert [r['request_text'] for r in response['results']] == [item['text'] for item in items]
+    assert [r['response']['toxic'] for r in response['results']] == [0, 1, 0]
+    assert response['results'][1]['true_labels'] == {"toxic": 1}
+    assert len({r['timestamp'] for r in response['results']}) == 3
+    main._write_logs.assert_called_once()
+
+@patch.object(main, 'model', MagicMock(predict=mock_predict_batch))
+def test_predict_batch_rejects_empty():
+    response = client.post("/predict/batch", json={"items": []})
+    assert response.status_code == 422
+
+@patch.object(main, 'model', MagicMock(predict=mock_predict_batch))
+def test_stats_reports_batcher():
+    response = client.get("/stats")
+    assert response.status_code == 200
+    batcher_stats = response.json()['batcher']
+    assert batcher_stats['max_batch_size'] == main.PREDICT_MAX_BATCH_SIZE
+    assert 'queue_depth' in batcher_stats
+    assert 'batch_size_histogram' in batcher_stats
+
+@patch.object(main, '_write_logs', MagicMock())
+def test_predict_batch_serves_repeated_texts_from_cache():
+    model = MagicMock()
+    model.predict.side_effect = mock_predict_batch
+    with patch.object(main, 'model', model):
+        items = [{"text": "you are stupid"}, {"text": "nice comment"}]
+        client.post("/predict/batch", json={"items": items})
+        response = client.post("/predict/batch", json={"items": [{"text": "You are   STUPID"}, {"text": "new one"}]})
+    assert [r['response']['toxic'] for r in response.json()['results']] == [1, 0]
+    assert model.predict.call_args_list[-1].args[0] == ["new one"]
+    assert client.get("/stats").json()["prediction_cache"]["hits"] >= 1
+
+def scored_pipeline():
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.multiclass import OneVsRestClassifier
+    from sklearn.pipeline import Pipeline
+    from test_compact_model import TRAIN_LABELS, TRAIN_TEXTS
+    pipeline = Pipeline([("tfidf", TfidfVectorizer()), ("clf", OneVsRestClassifier(LogisticRegression()))])
+    return pipeline.fit(TRAIN_TEXTS, TRAIN_LABELS)
+
+@patch.object(main, '_write_log', MagicMock(side_effect=lambda log: asyncio.sleep(0)))
+@patch.object(main, '_write_logs', MagicMock())
+def test_return_scores_and_tuned_thresholds():
+    pipeline = scored_pipeline()
+    with patch.object(main, 'model', pipeline), patch.object(main, 'model_info', {"version": "scored"}), \
+            patch.object(main, 'APPLY_THRESHOLDS', True):
+        body = client.post("/predict", json={"text": "what a terrible insult", "return_scores": True}).json()
+        assert body["score_type"] == "probability"
+        assert set(body["scores"]) == set(main.LABELS)
+        assert all(body["response"][label] == int(body["scores"][label] > 0.5) for label in main.LABELS)
+
+        # a threshold of 0 turns every label on, without a second model call for the scores
+        main.model_info["thresholds"] = {"score_type": "probability", "thresholds": {label: 0.0 for label in main.LABELS}}
+        batch = client.post("/predict/batch", json={"items": [{"text": "hello there"}], "return_scores": True}).json()
+        assert batch["results"][0]["response"] == {label: 1 for label in main.LABELS}
+        plain = client.post("/predict/batch", json={"items": [{"text": "another comment"}]}).json()
+        assert plain["results"][0]["response"] == {label: 1 for label in main.LABELS}
+        assert "scores" not in plain["results"][0]
+
+@patch.object(main, 'model', MagicMock(predict=mock_predict_batch))
+@patch.object(main, '_write_logs', MagicMock())
+def test_metrics_reports_request_and_stage_latency():
+    client.post("/predict/batch", json={"items": [{"text": "metrics comment"}]})
+    body = client.get("/metrics").text
+    assert 'toxic_api_request_duration_seconds_count{method="POST",route="/predict/batch",status="200"}' in body
+    for stage in ("validation", "vectorize", "classify", "log_write"):
+        assert f'toxic_api_stage_duration_seconds_count{{stage="{stage}"}}' in body
+    assert "toxic_api_in_flight_requests" in body
+    assert "toxic_api_prediction_cache_hits" in body
+    assert "toxic_api_batcher_queue_depth" in body
+
+def test_debug_profile_requires_toggle():
+    assert client.get("/debug/profile").status_code == 404
+    with patch.object(main, 'DEBUG_PROFILING', True):
+        response = client.get("/debug/profile", params={"seconds": 0.05})
+    assert response.status_code == 200
+
+def mock_predict_all_toxic(input):
+    return [[1, 0, 0, 0, 0, 0] for _ in input]
+
+def _svm_route():
+    svm_model, svm_info = MagicMock(predict=mock_predict_all_toxic), {"version": "svm-1"}
+    return {"svm": (svm_model, svm_info, MicroBatcher(partial(main._predict_with, svm_model, svm_info)))}
+
+@patch.object(main, 'model', MagicMock(predict=mock_predict_batch))
+@patch.object(main, '_write_log', AsyncMock())
+@patch.object(main, '_write_logs', MagicMock())
+def test_routes_by_model_header():
+    with patch.object(main, 'routed_models', _svm_route()), patch.object(main, 'router', ModelRouter({"svm": 0.0})):
+        routed = client.post("/predict", json={"text": "a kind comment"}, headers={"X-Model": "svm"}).json()
+        default = client.post("/predict", json={"text": "a kind comment"}).json()
+        batch = client.post("/predict/batch", json={"items": [{"text": "hello"}]}, headers={"X-Model": "svm"}).json()
+        unknown = client.post("/predict", json={"text": "a kind comment"}, headers={"X-Model": "nb"})
+
+    assert routed["model"] == "svm" and routed["response"]["toxic"] == 1
+    assert default["model"] == "default" and default["response"]["toxic"] == 0
+    assert batch["results"][0]["model"] == "svm" and batch["results"][0]["response"]["toxic"] == 1
+    assert unknown.status_code == 400
+
+@patch.object(main, 'model', MagicMock(predict=mock_predict_batch))
+@patch.object(main, '_write_logs', MagicMock())
+def test_shadow_model_scores_in_background():
+    shadow = ShadowScorer(main.LABELS)
+    with patch.object(main, 'shadow', shadow), patch.object(main, 'shadow_model', MagicMock(predict=mock_predict_all_toxic)):
+        response = client.post("/predict/batch", json={"items": [{"text": "you are stupid"}, {"text": "thanks"}]})
+    shadow.close()
+
+    assert response.status_code == 200
+    assert "model" not in response.json()["results"][0]
+    stats = shadow.stats()
+    assert stats["compared"] == 2
+    assert stats["disagreements"] == 1
+    assert stats["disagreement_rate_toxic"] == 0.5
+
+def test_load_model_from_baked_path(tmp_path):
+    model_file = tmp_path / "baked.joblib"
+    main.joblib.dump({"kind": "stand-in model"}, model_file)
+    with patch.object(main, 'MODEL_PATH', str(tmp_path)), patch.object(main, 'model_info', {}):
+        loaded = main._load_model()
+        assert loaded == {"kind": "stand-in model"}
+        assert main.model_info["source"] == "baked"
+        assert main.model_info["path"] == str(model_file)
+
+class StandInModel:
+    def __init__(self, width=6):
+        self.width = width
+    def predict(self, texts):
+        return [[1] * self.width for _ in texts]
+
+def wait_for_reload():
+    for _ in range(100):
+        state = client.get("/admin/reload").json()
+        if state["state"] != "loading":
+            return state
+        time.sleep(0.05)
+    raise AssertionError("reload did not finish")
+
+def test_admin_reload_hot_swaps_model(tmp_path):
+    main.joblib.dump(StandInModel(), tmp_path / "new_model.joblib")
+    old_model = MagicMock(predict=mock_predict_batch)
+    with patch.object(main, 'model', old_model), patch.object(main, 'model_info', {"version": "old"}):
+        response = client.post("/admin/reload", json={"path": str(tmp_path)})
+        assert response.status_code == 202
+
+        state = wait_for_reload()
+        assert state["state"] == "idle"
+        assert isinstance(main.model, StandInModel)
+        health = client.get("/health").json()
+        assert health["model_version"].startswith("new_model.joblib@")
+        assert health["model_source"] == "path"
+
+def test_admin_reload_keeps_old_model_when_warmup_fails(tmp_path):
+    main.joblib.dump(StandInModel(width=2), tmp_path / "broken_model.joblib")
+    old_model = MagicMock(predict=mock_predict_batch)
+    with patch.object(main, 'model', old_model), patch.object(main, 'model_info', {"version": "old"}):
+        client.post("/admin/reload", json={"path": str(tmp_path)})
+        state = wait_for_reload()
+        assert state["state"] == "failed"
+        assert main.model is old_model
+        assert client.get("/health").json()["model_version"] == "old"
+
+def test_admin_reload_validates_output_without_warmup_rounds(tmp_path):
+    main.joblib.dump(StandInModel(width=2), tmp_path / "broken_model.joblib")
+    old_model = MagicMock(predict=mock_predict_batch)
+    with patch.object(main, 'MODEL_WARMUP_ROUNDS', 0), patch.object(main, 'model', old_model), \
+            patch.object(main, 'model_info', {"version": "old"}):
+        client.post("/admin/reload", json={"path": str(tmp_path)})
+        state = wait_for_reload()
+        assert state["state"] == "failed"
+        assert "label layout" in state["error"]
+        assert main.model is old_model
+
+def test_batched_predictions_carry_the_model_that_made_them():
+    old_model, new_model = MagicMock(predict=mock_predict_batch), MagicMock(predict=mock_predict_batch)
+    with patch.object(main, 'model', old_model), patch.object(main, 'model_info', {"version": "old"}):
+        [(_, (batch_model, batch_info))] = main._predict_texts(["hello"])
+        assert batch_model is old_model and batch_info["version"] == "old"
+        main._swap_model(new_model, {"version": "new"})
+        [(_, (batch_model, batch_info))] = main._predict_texts(["hello"])
+        assert batch_model is new_model and batch_info["version"] == "new"
+
+def test_admin_reload_requires_token():
+    with patch.object(main, 'ADMIN_TOKEN', 'secret'):
+        assert client.post("/admin/reload").status_code == 401
+        assert client.get("/admin/reload", headers={"X-Admin-Token": "secret"}).status_code == 200
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from batching import MicroBatcher
+
+
+def make_batcher(max_batch_size, max_wait_ms=5.0):
+    calls = []
+
+    def predict_fn(texts):
+        calls.append(list(texts))
+        return [[len(text), 0, 0, 0, 0, 0] for text in texts]
+
+    return MicroBatcher(predict_fn, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms), calls
+
+def test_concurrent_submits_are_batched():
+    batcher, calls = make_batcher(max_batch_size=4)
+    texts = ["x" * i for i in range(1, 11)]
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(text) for text in texts))
+
+    results = asyncio.run(run())
+
+    # each caller gets back the row for its own text
+    assert [row[0] for row in results] == [len(text) for text in texts]
+    assert sorted(len(call) for call in calls) == [2, 4, 4]
+    stats = batcher.stats()
+    assert stats["batches"] == 3
+    assert stats["items"] == 10
+    assert stats["queue_depth"] == 0
+    assert stats["batch_size_histogram"] == {"le_1": 0, "le_2": 1, "le_4": 2}
+
+def test_single_submit_flushes_after_wait():
+    batcher, calls = make_batcher(max_batch_size=32, max_wait_ms=1.0)
+    result = asyncio.run(batcher.submit("hello"))
+    assert result[0] == 5
+    assert calls == [["hello"]]
+
+def test_predict_errors_reach_every_caller():
+    def failing_predict(texts):
+        raise RuntimeError("model exploded")
+
+    batcher = MicroBatcher(failing_predict, max_batch_size=2)
+
+    async def run():
+        return await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+def test_short_predict_output_fails_every_caller():
+    batcher = MicroBatcher(lambda texts: [[1, 0, 0, 0, 0, 0]], max_batch_size=3)
+
+    async def run():
+        results = await asyncio.wait_for(asyncio.gather(
+            *(batcher.submit(text) for text in "abc"), return_exceptions=True), timeout=5)
+        await asyncio.sleep(0)
+        return results
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert batcher._tasks == set()
+
+def test_invalid_batch_size():
+    with pytest.raises(ValueError):
+        MicroBatcher(lambda texts: texts, max_batch_size=0)
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.pipeline import Pipeline
+
+from compact_model import CompactLinearModel, find_compact_model, save_compact_model
+from linear_scorer import LinearScorer
+
+LABELS = ["toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"]
+
+TRAIN_TEXTS = [
+    "this movie was great and fun",
+    "awful insult and very toxic",
+    "threat implied but unclear",
+    "clean friendly and kind",
+    "obscene words here",
+    "identity hate speech sample",
+    "neutral comment with nothing bad",
+    "bad acting but great plot",
+]
+TRAIN_LABELS = np.array([
+    [0, 0, 0, 0, 0, 0],
+    [1, 0, 1, 0, 1, 0],
+    [0, 0, 0, 1, 0, 0],
+    [0, 0, 0, 0, 0, 0],
+    [1, 0, 1, 0, 0, 0],
+    [1, 1, 0, 0, 1, 1],
+    [0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0],
+])
+TEST_TEXTS = ["utterly great performance", "what a terrible insult", "Crème brûlée is obscene!", ""]
+
+
+def write_compact(pipeline, out_dir):
+    return save_compact_model(LinearScorer.from_pipeline(pipeline, LABELS), str(out_dir))
+
+@pytest.fixture(params=["tfidf", "count"])
+def fitted_pipeline(request):
+    if request.param == "tfidf":
+        vectorizer = TfidfVectorizer(ngram_range=(1, 2), strip_accents="unicode", sublinear_tf=True)
+    else:
+        vectorizer = CountVectorizer(stop_words="english")
+    pipeline = Pipeline([
+        ("vectorizer", vectorizer),
+        ("clf", OneVsRestClassifier(LogisticRegression(solver="liblinear", class_weight="balanced"))),
+    ])
+    return pipeline.fit(TRAIN_TEXTS, TRAIN_LABELS)
+
+def test_compact_model_matches_pipeline(tmp_path, fitted_pipeline):
+    write_compact(fitted_pipeline, tmp_path / "compact")
+    compact = CompactLinearModel.load(str(tmp_path))
+
+    assert isinstance(compact.weights, np.memmap)
+    assert compact.labels == LABELS
+    assert np.allclose(compact.transform(TEST_TEXTS).toarray(),
+                       fitted_pipeline.steps[0][1].transform(TEST_TEXTS).toarray())
+    assert np.allclose(compact.decision_function(TEST_TEXTS), fitted_pipeline.decision_function(TEST_TEXTS), atol=1e-5)
+    assert np.array_equal(compact.predict(TEST_TEXTS), fitted_pipeline.predict(TEST_TEXTS))
+
+def test_find_compact_model_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        find_compact_model(str(tmp_path))
+
+def test_main_loads_compact_format(tmp_path, fitted_pipeline):
+    from unittest.mock import patch
+    import main
+
+    write_compact(fitted_pipeline, tmp_path / "compact")
+    with patch.object(main, 'MODEL_FORMAT', 'compact'), patch.object(main, 'MODEL_PATH', str(tmp_path)), \
+            patch.object(main, 'model_info', {}):
+        loaded = main._load_model()
+        assert isinstance(loaded, CompactLinearModel)
+        assert main.model_info["path"] == str(tmp_path / "compact")
+
+def test_compact_model_matches_pipeline_with_trailing_empty_docs(tmp_path, fitted_pipeline):
+    write_compact(fitted_pipeline, tmp_path / "compact")
+    compact = CompactLinearModel.load(str(tmp_path))
+
+    texts = ["great fun movie and awful insult", "zzzz", ""]
+    assert np.allclose(compact.decision_function(texts), fitted_pipeline.decision_function(texts), atol=1e-5)
+    assert np.array_equal(compact.predict(texts), fitted_pipeline.predict(texts))
@@ -0,0 +1,43 @@
+import threading
+
+from instrumentation import Histogram, Instrumentation, SamplingProfiler
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 2.0):
+        histogram.observe(value, "classify")
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{stage="classify",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="classify",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{stage="classify",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{stage="classify"} 3' in lines
+    assert histogram.snapshot("classify")["sum"] == 2.55
+
+def test_render_includes_gauges_and_skips_missing():
+    instrumentation = Instrumentation(prefix="app")
+    with instrumentation.stage("vectorize"):
+        pass
+    text = instrumentation.render({"model_load_seconds": (1.5, "Load time."), "unknown": (None, "Skipped.")})
+    assert "# TYPE app_stage_duration_seconds histogram" in text
+    assert 'app_stage_duration_seconds_count{stage="vectorize"} 1' in text
+    assert "app_model_load_seconds 1.5" in text
+    assert "app_in_flight_requests 0.0" in text
+    assert "app_unknown" not in text
+
+def test_sampling_profiler_sees_busy_thread():
+    stop = threading.Event()
+
+    def busy_loop():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=busy_loop)
+    worker.start()
+    try:
+        stacks = SamplingProfiler(interval=0.001).profile(0.1)
+    finally:
+        stop.set()
+        worker.join()
+    assert any("busy_loop" in stack for stack in stacks)
+    folded = SamplingProfiler.folded(stacks, limit=1)
+    assert len(folded.strip().splitlines()) == 1
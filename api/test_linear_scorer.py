@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.multioutput import MultiOutputClassifier
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+
+from linear_scorer import LinearScorer
+from test_compact_model import LABELS, TEST_TEXTS, TRAIN_LABELS, TRAIN_TEXTS
+
+
+def tfidf():
+    return TfidfVectorizer(analyzer="word", ngram_range=(1, 2), min_df=1, strip_accents="unicode", sublinear_tf=True)
+
+PIPELINES = {
+    # same shapes as build_lr_pipeline / build_svm_pipeline / build_nb_pipeline in models/
+    "lr": lambda: Pipeline([("tfidf", tfidf()), ("clf", OneVsRestClassifier(
+        LogisticRegression(solver="liblinear", class_weight="balanced")))]),
+    "svm": lambda: Pipeline([("tfidf", tfidf()), ("clf", OneVsRestClassifier(
+        LinearSVC(C=1.0, class_weight="balanced")))]),
+    "nb": lambda: Pipeline([("vectorizer", CountVectorizer(stop_words="english")), ("clf", MultiOutputClassifier(
+        MultinomialNB(alpha=0.1)))]),
+}
+
+@pytest.mark.parametrize("kind", PIPELINES)
+def test_scorer_matches_pipeline_predict(kind):
+    pipeline = PIPELINES[kind]().fit(TRAIN_TEXTS, TRAIN_LABELS)
+    scorer = LinearScorer.from_pipeline(pipeline, LABELS)
+
+    texts = TEST_TEXTS + TRAIN_TEXTS
+    assert np.array_equal(scorer.predict(texts), pipeline.predict(texts))
+    if kind != "nb":
+        assert np.allclose(scorer.decision_function(texts), pipeline.decision_function(texts), atol=1e-5)
+    assert scorer.score_type == ("decision" if kind == "svm" else "log_odds")
+
+@pytest.mark.parametrize("texts", [
+    ["great fun movie and awful insult", ""],
+    ["awful insult toxic", "", ""],
+    ["you are an idiot", "zzzz qqqq", "\U0001F600"],
+])
+def test_transform_matches_vectorizer_with_trailing_empty_docs(texts):
+    pipeline = PIPELINES["lr"]().fit(TRAIN_TEXTS, TRAIN_LABELS)
+    scorer = LinearScorer.from_pipeline(pipeline, LABELS)
+    assert np.allclose(scorer.transform(texts).toarray(), pipeline[:-1].transform(texts).toarray(), atol=1e-12)
+    assert np.allclose(scorer.decision_function(texts), pipeline.decision_function(texts), atol=1e-5)
+
+def test_scorer_handles_single_class_labels():
+    labels = TRAIN_LABELS.copy()
+    labels[:, 1] = 0  # severe_toxic never seen, OneVsRest stores a constant predictor
+    pipeline = PIPELINES["lr"]().fit(TRAIN_TEXTS, labels)
+    scorer = LinearScorer.from_pipeline(pipeline, LABELS)
+    assert np.array_equal(scorer.predict(TEST_TEXTS), pipeline.predict(TEST_TEXTS))
+
+def test_scorer_rejects_unfitted_pipeline():
+    with pytest.raises(ValueError):
+        LinearScorer.from_pipeline(PIPELINES["lr"](), LABELS)
+
+def test_main_selects_linear_engine(tmp_path):
+    from unittest.mock import patch
+    import main
+
+    pipeline = PIPELINES["lr"]().fit(TRAIN_TEXTS, TRAIN_LABELS)
+    main.joblib.dump(pipeline, tmp_path / "log_reg.joblib")
+    with patch.object(main, 'INFERENCE_ENGINE', 'linear'), patch.object(main, 'MODEL_PATH', str(tmp_path)), \
+            patch.object(main, 'model_info', {}):
+        loaded = main._load_model()
+        assert isinstance(loaded, LinearScorer)
+        assert main.model_info["engine"] == "LinearScorer"
+        assert np.array_equal(loaded.predict(TEST_TEXTS), pipeline.predict(TEST_TEXTS))
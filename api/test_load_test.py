@@ -0,0 +1,70 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import httpx
+
+from load_test import compare, descendant_pids, load_corpus, replay, summarize, tree_rss_mb
+
+def test_summarize_reports_percentiles_and_throughput():
+    results = summarize([0.001 * i for i in range(1, 101)], errors=2, wall_seconds=2.0, batch_size=4)
+    assert results["requests"] == 100
+    assert results["throughput_rps"] == 50.0
+    assert results["comments_per_second"] == 200.0
+    assert round(results["latency_ms"]["p50"], 1) == 50.5
+    assert round(results["latency_ms"]["p99"], 2) == 99.01
+    assert results["latency_ms"]["max"] == 100.0
+
+def test_compare_flags_only_changes_beyond_tolerance():
+    baseline = {"latency_ms": {"p50": 10.0, "p95": 20.0, "p99": 40.0}, "throughput_rps": 100.0,
+                "rss_mb": {"peak": 300.0}, "errors": 0}
+    current = {"latency_ms": {"p50": 11.0, "p95": 30.0, "p99": 40.0}, "throughput_rps": 70.0,
+               "rss_mb": None, "errors": 3}
+    regressions = compare(current, baseline, tolerance=0.2)
+    assert [r.split(":")[0] for r in regressions] == ["latency_ms.p95", "throughput_rps", "errors"]
+    assert compare(baseline, baseline) == []
+
+def test_replay_sends_every_comment_with_bounded_concurrency():
+    in_flight = peak = 0
+    received = []
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        items = json.loads(request.content)["items"]
+        received.extend(item["text"] for item in items)
+        return httpx.Response(500 if any(item["text"] == "fail" for item in items) else 200)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://test") as client:
+            return await replay(client, [f"c{i}" for i in range(9)] + ["fail"], 3, "/predict/batch", batch_size=2)
+
+    latencies, errors, wall = asyncio.run(run())
+    assert len(latencies) == 5
+    assert errors == 1
+    assert sorted(received) == sorted([f"c{i}" for i in range(9)] + ["fail"])
+    assert peak <= 3
+
+def test_load_corpus_reads_jigsaw_csv(tmp_path):
+    path = tmp_path / "train.csv"
+    path.write_text('id,comment_text,toxic\n1,"hello, world",0\n2,you fool,1\n')
+    texts = load_corpus(str(path), 5, seed=1)
+    assert len(texts) == 5
+    assert set(texts) <= {"hello, world", "you fool"}
+    assert len(load_corpus(None, 3)) == 3
+
+def test_tree_rss_includes_child_processes():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        assert child.pid in descendant_pids(os.getpid())
+        rss = tree_rss_mb(os.getpid())
+        assert rss["processes"] >= 2
+        assert rss["total"] > rss["max_process"] > 0
+    finally:
+        child.kill()
+        child.wait()
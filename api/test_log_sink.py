@@ -0,0 +1,71 @@
+import json
+import boto3
+import pytest
+from moto import mock_aws
+from log_sink import PredictionLogSink
+
+TABLE_NAME = "test_prediction_logs"
+REGION = "us-east-1"
+
+def make_log(i):
+    return {
+        "timestamp": f"2025-08-21T10:00:00.{i:06d}",
+        "request_text": f"comment {i}",
+        "response": {"toxic": i % 2, "severe_toxic": 0},
+        "true_labels": None,
+        "score": 0.25,
+    }
+
+@pytest.fixture
+def table(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", REGION)
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name=REGION)
+        table = dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[{"AttributeName": "timestamp", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "timestamp", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield table
+
+def test_sink_flushes_and_drains_on_close(table):
+    sink = PredictionLogSink(TABLE_NAME, REGION, flush_size=10, flush_interval=0.05)
+    sink.put_many([make_log(i) for i in range(35)])
+    sink.close()
+
+    items = table.scan()["Items"]
+    assert len(items) == 35
+    assert {item["log_date"] for item in items} == {"2025-08-21"}
+    assert sink.stats()["written"] == 35
+    assert sink.stats()["flushes"] >= 4
+    assert sink.stats()["queue_depth"] == 0
+
+def test_sink_drops_when_full(table):
+    sink = PredictionLogSink(TABLE_NAME, REGION, max_queue_size=3, overflow_policy="drop", autostart=False)
+    sink.put_many([make_log(i) for i in range(5)])
+    assert sink.stats()["dropped"] == 2
+
+    sink.start()
+    sink.close()
+    assert len(table.scan()["Items"]) == 3
+
+def test_sink_spills_to_disk_and_replays(table, tmp_path):
+    spill_path = tmp_path / "spill.jsonl"
+    sink = PredictionLogSink(TABLE_NAME, REGION, max_queue_size=2, overflow_policy="spill",
+                             spill_path=str(spill_path), autostart=False)
+    sink.put_many([make_log(i) for i in range(5)])
+    assert sink.stats()["spilled"] == 3
+    assert len(spill_path.read_text().splitlines()) == 3
+    assert json.loads(spill_path.read_text().splitlines()[0])["request_text"] == "comment 2"
+
+    sink.start()
+    sink.close()
+    assert len(table.scan()["Items"]) == 5
+    assert not spill_path.exists()
+
+def test_invalid_overflow_policy():
+    with pytest.raises(ValueError):
+        PredictionLogSink(TABLE_NAME, REGION, overflow_policy="explode")
@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+import pytest
+import wandb
+from model_cache import ModelCache, fetch_from_registry, find_model_file
+
+
+def write_artifact(directory, name="log_reg.joblib"):
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / name).write_bytes(b"model bytes")
+    return directory
+
+def test_store_and_resolve(tmp_path):
+    cache = ModelCache(str(tmp_path / "cache"))
+    source = write_artifact(tmp_path / "download")
+
+    assert cache.resolve("log_reg_model:latest") is None
+    path = cache.store("log_reg_model:latest", "abc123", str(source), metadata={"version": "v3"})
+
+    assert cache.resolve("log_reg_model:latest") == "abc123"
+    assert find_model_file(path).endswith("log_reg.joblib")
+    assert cache.metadata("abc123")["version"] == "v3"
+
+def test_find_model_file_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        find_model_file(str(tmp_path))
+
+class FakeArtifact:
+    def __init__(self, digest):
+        self.digest = digest
+        self.version = "v7"
+        self.metadata = {"labels": ["toxic"]}
+        self.downloads = 0
+
+    def download(self, root):
+        self.downloads += 1
+        write_artifact(Path(root))
+
+def test_fetch_from_registry_downloads_once(tmp_path, monkeypatch):
+    artifact = FakeArtifact("d1")
+
+    class FakeApi:
+        def __init__(self, api_key=None):
+            pass
+        def artifact(self, name, type=None):
+            assert name == "toxic_comment_prediction/log_reg_model:latest"
+            return artifact
+
+    monkeypatch.setattr(wandb, "Api", FakeApi)
+    cache = ModelCache(str(tmp_path / "cache"))
+
+    assert fetch_from_registry(cache, "log_reg_model:latest", "toxic_comment_prediction") == "d1"
+    assert fetch_from_registry(cache, "log_reg_model:latest", "toxic_comment_prediction") == "d1"
+    assert artifact.downloads == 1
+    with open(tmp_path / "cache" / "index.json") as f:
+        assert json.load(f) == {"log_reg_model:latest": "d1"}
+    assert cache.metadata("d1")["artifact_metadata"] == {"labels": ["toxic"]}
@@ -0,0 +1,55 @@
+import time
+
+from prediction_cache import PredictionCache, normalize_text
+
+def test_normalized_text_hits_and_version_misses():
+    cache = PredictionCache()
+    cache.put("You are  STUPID\n", "v1", [1, 0, 0, 0, 1, 0])
+    assert cache.get("you are stupid", "v1") == (1, 0, 0, 0, 1, 0)
+    assert cache.get("you are stupid", "v2") is None
+    assert normalize_text("  a \t B ") == "a b"
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = PredictionCache(max_entries=2)
+    cache.put("a", "v", [0])
+    cache.put("b", "v", [0])
+    cache.get("a", "v")
+    cache.put("c", "v", [0])
+    assert cache.get("b", "v") is None
+    assert cache.get("a", "v") is not None
+    assert cache.stats()["evictions"] == 1
+
+    small = PredictionCache(max_bytes=700)
+    for text in "abcdef":
+        small.put(text, "v", [0] * 6)
+    assert small.stats()["bytes"] <= 700
+    assert small.stats()["entries"] < 6
+
+def test_ttl_expiry():
+    cache = PredictionCache(ttl_seconds=0.01)
+    cache.put("a", "v", [1])
+    time.sleep(0.02)
+    assert cache.get("a", "v") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_bind_to_new_model_invalidates():
+    cache = PredictionCache()
+    old_model, new_model = object(), object()
+    generation = cache.bind(old_model)
+    cache.put("a", None, [1], generation)
+    assert cache.bind(old_model) == generation
+    assert cache.get("a", None) == (1,)
+
+    cache.bind(new_model)
+    assert cache.get("a", None) is None
+    # a prediction started against the old model is not stored
+    cache.put("b", None, [1], generation)
+    assert cache.get("b", None) is None
+
+def test_disabled_cache():
+    cache = PredictionCache(max_entries=0)
+    cache.put("a", "v", [1])
+    assert cache.get("a", "v") is None
+    assert cache.stats()["misses"] == 0
@@ -0,0 +1,88 @@
+from datetime import datetime
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from rollups import RollupAggregator, bucket_start, rollup_counts
+
+TABLE_NAME = "test_rollups"
+REGION = "us-east-1"
+LABELS = ["toxic", "insult"]
+
+def make_log(second, toxic, true_labels=None):
+    return {
+        "timestamp": f"2025-08-21T10:{second // 60:02d}:{second % 60:02d}.000123",
+        "request_text": "comment",
+        "response": {"toxic": toxic, "insult": 0},
+        "true_labels": true_labels,
+    }
+
+@pytest.fixture
+def table(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", REGION)
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name=REGION)
+        yield dynamodb.create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[{"AttributeName": "bucket", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "bucket", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+
+def test_bucket_start():
+    ts = datetime(2025, 8, 21, 10, 7, 42, 999)
+    assert bucket_start(ts) == "2025-08-21T10:07:00"
+    assert bucket_start(ts, bucket_seconds=300) == "2025-08-21T10:05:00"
+    # 420s does not divide an hour; the bucket runs across :00 instead of restarting there
+    assert bucket_start(datetime(2025, 8, 21, 10, 59, 0), bucket_seconds=420) == "2025-08-21T10:58:00"
+    assert bucket_start(datetime(2025, 8, 21, 11, 4, 59), bucket_seconds=420) == "2025-08-21T10:58:00"
+    assert bucket_start(datetime(2025, 8, 21, 11, 5, 0), bucket_seconds=420) == "2025-08-21T11:05:00"
+
+def test_rollup_counts_confusion_only_for_labelled_logs():
+    assert rollup_counts(make_log(0, 1), LABELS) == {"count": 1, "pos_toxic": 1}
+    assert rollup_counts(make_log(0, 0), LABELS) == {"count": 1, "unlabelled_exact_count": 1}
+    counts = rollup_counts(make_log(0, 1, {"toxic": 0, "insult": 1}), LABELS)
+    assert counts == {"count": 1, "pos_toxic": 1, "labelled_count": 1, "fp_toxic": 1, "fn_insult": 1}
+
+def test_flush_adds_counts_per_bucket(table):
+    rollups = RollupAggregator(TABLE_NAME, REGION, LABELS, autostart=False)
+    rollups.record_many([make_log(1, 1, {"toxic": 1}), make_log(2, 0), make_log(61, 1)])
+    rollups.flush()
+    # a second worker adding to the same minute sums into the same row
+    other = RollupAggregator(TABLE_NAME, REGION, LABELS, autostart=False)
+    other.record(make_log(3, 0, {"toxic": 0}))
+    other.close()
+
+    items = {item["bucket"]: item for item in table.scan()["Items"]}
+    assert set(items) == {"2025-08-21T10:00:00", "2025-08-21T10:01:00"}
+    first = items["2025-08-21T10:00:00"]
+    assert first["count"] == 3
+    assert first["labelled_count"] == 2
+    assert first["exact_count"] == 2
+    assert first["tp_toxic"] == 1 and first["tn_toxic"] == 1
+    assert items["2025-08-21T10:01:00"]["pos_toxic"] == 1
+    assert rollups.stats()["updates"] == 2
+
+def test_failed_flush_keeps_counts_for_retry(table):
+    rollups = RollupAggregator("missing_table", REGION, LABELS, autostart=False)
+    rollups.record(make_log(1, 1))
+    rollups.flush()
+    assert rollups.stats()["failed"] == 1
+    assert rollups.stats()["pending_buckets"] == 1
+
+def test_failed_buckets_are_capped(table):
+    rollups = RollupAggregator("missing_table", REGION, LABELS, autostart=False, max_pending_buckets=2)
+    for minute in range(4):
+        rollups.record({**make_log(1, 1), "timestamp": f"2025-08-21T10:0{minute}:30"})
+    rollups.flush()
+    assert sorted(rollups._pending) == ["2025-08-21T10:02:00", "2025-08-21T10:03:00"]
+    assert rollups.stats()["dropped_buckets"] == 2
+
+def test_background_thread_flushes(table):
+    rollups = RollupAggregator(TABLE_NAME, REGION, LABELS, flush_interval=0.05)
+    rollups.record(make_log(1, 1))
+    rollups.close()
+    assert table.scan()["Items"][0]["count"] == 1
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+from routing import DEFAULT_ROUTE, ModelRouter, ShadowScorer, parse_routes
+
+LABELS = ["toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"]
+
+def test_parse_routes():
+    assert parse_routes("") == []
+    assert parse_routes("svm=linear_svm_model:latest@10, nb=/models/nb.joblib") == [
+        ("svm", "linear_svm_model:latest", 10.0), ("nb", "/models/nb.joblib", 0.0)]
+    with pytest.raises(ValueError):
+        parse_routes("linear_svm_model:latest@10")
+    with pytest.raises(ValueError):
+        parse_routes("default=log_reg_model:latest@10")
+
+def test_router_splits_by_weight_and_is_sticky_per_text():
+    router = ModelRouter({"svm": 30.0, "nb": 0.0})
+    assert router.weights == {DEFAULT_ROUTE: 70.0, "svm": 30.0, "nb": 0.0}
+    picks = [router.choose(key=f"comment {i}") for i in range(5000)]
+    assert 0.27 < picks.count("svm") / len(picks) < 0.33
+    assert "nb" not in picks
+    assert router.choose(key="same text") == router.choose(key="same text")
+    assert router.choose("nb", key="comment 1") == "nb"
+    assert router.stats()["requests"]["nb"] == 1
+    with pytest.raises(KeyError):
+        router.choose("missing")
+    with pytest.raises(ValueError):
+        ModelRouter({"a": 60.0, "b": 50.0})
+
+def test_shadow_scorer_counts_disagreements():
+    shadow = ShadowScorer(LABELS)
+    primary = [[1, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0], [0, 1, 0, 0, 0, 0]]
+    assert shadow.submit(["a", "b", "c"], primary, lambda texts: [[1, 0, 0, 0, 0, 0], [0, 0, 1, 0, 0, 0], [0, 0, 0, 0, 0, 0]])
+    shadow.close()
+
+    stats = shadow.stats()
+    assert stats["compared"] == 3
+    assert stats["disagreements"] == 2
+    assert stats["shadow_positive_only"] == 1 and stats["primary_positive_only"] == 1
+    assert stats["disagreement_rate_obscene"] == pytest.approx(1 / 3)
+    assert stats["disagreement_rate_toxic"] == 0.0
+    assert stats["pending"] == 0
+
+def test_shadow_scorer_drops_instead_of_queueing_and_survives_errors():
+    release = threading.Event()
+    shadow = ShadowScorer(LABELS, max_pending=2)
+
+    def slow_predict(texts):
+        release.wait(5)
+        raise RuntimeError("shadow model broke")
+
+    assert shadow.submit(["a", "b"], [[0] * 6] * 2, slow_predict)
+    assert not shadow.submit(["c"], [[0] * 6], slow_predict)
+    release.set()
+    shadow.close()
+
+    stats = shadow.stats()
+    assert stats["dropped"] == 1
+    assert stats["errors"] == 2
+    assert stats["compared"] == 0 and stats["pending"] == 0
+
+def test_shadow_scorer_sampling():
+    shadow = ShadowScorer(LABELS, sample_rate=0.0)
+    assert not shadow.submit(["a"], [[0] * 6], lambda texts: [[0] * 6])
+    shadow.close()
+    assert shadow.stats()["skipped"] == 1
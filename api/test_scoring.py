@@ -0,0 +1,62 @@
+import json
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.multioutput import MultiOutputClassifier
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+
+from linear_scorer import LinearScorer
+from scoring import DEFAULT_THRESHOLDS, apply_thresholds, load_threshold_config, model_scores, threshold_vector
+from test_compact_model import LABELS, TEST_TEXTS, TRAIN_LABELS, TRAIN_TEXTS
+
+def build(kind):
+    if kind == "lr":
+        return Pipeline([("tfidf", TfidfVectorizer()), ("clf", OneVsRestClassifier(LogisticRegression()))])
+    if kind == "svm":
+        return Pipeline([("tfidf", TfidfVectorizer()), ("clf", OneVsRestClassifier(LinearSVC()))])
+    return Pipeline([("count", CountVectorizer()), ("clf", MultiOutputClassifier(MultinomialNB()))])
+
+@pytest.mark.parametrize("kind, score_type", [("lr", "probability"), ("svm", "decision"), ("nb", "probability")])
+def test_scores_with_default_thresholds_match_predict(kind, score_type):
+    pipeline = build(kind).fit(TRAIN_TEXTS, TRAIN_LABELS)
+    expected = pipeline.predict(TEST_TEXTS)
+
+    scores, got_type = model_scores(pipeline, TEST_TEXTS)
+    assert got_type == score_type
+    np.testing.assert_array_equal(apply_thresholds(scores, threshold_vector(None, LABELS, score_type)), expected)
+
+    scorer = LinearScorer.from_pipeline(pipeline, LABELS)
+    linear_scores, linear_type = model_scores(scorer, TEST_TEXTS)
+    assert linear_type == score_type
+    np.testing.assert_allclose(linear_scores, scores, rtol=1e-4, atol=1e-5)
+
+def test_threshold_vector_ignores_other_score_type():
+    config = {"score_type": "probability", "thresholds": {"toxic": 0.2}}
+    assert threshold_vector(config, LABELS, "probability").tolist() == [0.2] + [0.5] * 5
+    assert threshold_vector(config, LABELS, "decision").tolist() == [DEFAULT_THRESHOLDS["decision"]] * 6
+
+def test_load_threshold_config_from_file_or_metadata(tmp_path):
+    config = {"score_type": "decision", "thresholds": {"toxic": -0.3}}
+    (tmp_path / "thresholds.json").write_text(json.dumps(config))
+    (tmp_path / "model.joblib").write_bytes(b"")
+    (tmp_path / "compact").mkdir()
+    (tmp_path / "compact" / "compact_model.json").write_text("{}")
+    assert load_threshold_config(str(tmp_path / "model.joblib")) == config
+    assert load_threshold_config(str(tmp_path / "compact")) == config
+
+    # a joblib file or a plain directory below the thresholds does not look up
+    (tmp_path / "shared").mkdir()
+    (tmp_path / "shared" / "model.joblib").write_bytes(b"")
+    assert load_threshold_config(str(tmp_path / "shared" / "model.joblib")) is None
+    assert load_threshold_config(str(tmp_path / "shared")) is None
+
+    other = tmp_path / "elsewhere" / "model"
+    other.mkdir(parents=True)
+    assert load_threshold_config(str(other)) is None
+    metadata = {"score_type": "probability", "thresholds": {"toxic": 0.3}}
+    assert load_threshold_config(str(other), metadata) == metadata
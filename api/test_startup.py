@@ -0,0 +1,29 @@
+import os
+
+from startup_profile import HEAVY_MODULES, cold_start, package_totals, parse_importtime
+
+# cold-start budget for importing main.py, overridable for slow CI machines
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "3.0"))
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        900 |     numpy.core
+import time:       500 |       1400 |   numpy
+import time:        50 |       1450 | scoring
+"""
+
+def test_parse_importtime_reads_every_module():
+    rows = parse_importtime(IMPORTTIME)
+    assert [row["module"] for row in rows] == ["_io", "numpy.core", "numpy", "scoring"]
+    assert [row["depth"] for row in rows] == [1, 2, 1, 0]
+    assert rows[1]["self_us"] == 300
+    assert rows[3]["cumulative_us"] == 1450
+
+def test_package_totals_sum_self_time_per_package():
+    assert package_totals(parse_importtime(IMPORTTIME)) == {"numpy": 800, "_io": 120, "scoring": 50}
+
+def test_main_starts_within_budget_without_heavy_dependencies(tmp_path):
+    result = cold_start(["main"], env={"MODEL_PATH": str(tmp_path)})
+    assert [name for name in HEAVY_MODULES if name in result["modules"]] == []
+    assert result["seconds"] < STARTUP_BUDGET_SECONDS
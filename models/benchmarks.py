@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from model_training import (MODELS, compute_and_log_metrics, init_wandb, load_and_prepare_data,
+                            set_n_jobs)
+
+LABEL_COLS = ['toxic','severe_toxic','obscene','threat','insult','identity_hate']
+BATCH_SIZES = (1, 32, 1024)
+# batch size whose per-comment latency is the serving cost used for promotion, when it is benchmarked
+COST_BATCH_SIZE = 32
+# words of the synthetic corpus, the same as api/benchmark_scorer.py so both benchmarks see the same comments
+NEUTRAL_WORDS = ("article edit page source thanks please section history reference talk wiki "
+                 "discussion image link user policy review change add remove update good great help").split()
+LABEL_WORDS = {
+    "toxic": ["stupid", "idiot", "dumb", "pathetic"],
+    "severe_toxic": ["worthless", "scum"],
+    "obscene": ["crap", "damn", "hell"],
+    "threat": ["kill", "hurt", "destroy"],
+    "insult": ["moron", "loser", "fool"],
+    "identity_hate": ["bigot", "racist"],
+}
+
+
+class LocalRun:
+    """
+    Stand-in for a W&B run when benchmarking offline: keeps what is logged so it can be
+    written to JSON
+    """
+    def __init__(self, name, config=None):
+        self.name = name
+        self.config = config or {}
+        self.logged = []
+        self.summary = {}
+
+    def log(self, d):
+        self.logged.append(dict(d))
+        self.summary.update(d)
+
+    def finish(self):
+        pass
+
+def synthetic_corpus(n, seed=1337):
+    """
+    Wikipedia-talk-like comments with label words mixed in at roughly Jigsaw rates, as a
+    Series and a label DataFrame
+    """
+    rng = random.Random(seed)
+    texts, labels = [], []
+    for _ in range(n):
+        words = rng.choices(NEUTRAL_WORDS, k=rng.randint(5, 60))
+        row = []
+        for label in LABEL_COLS:
+            hit = rng.random() < 0.08
+            row.append(int(hit))
+            if hit:
+                words.insert(rng.randrange(len(words)), rng.choice(LABEL_WORDS[label]))
+        texts.append(" ".join(words))
+        labels.append(row)
+    return pd.Series(texts), pd.DataFrame(labels, columns=LABEL_COLS)
+
+def load_corpus(scale, test_size, data_cache_dir=None, seed=1337):
+    """
+    Train and test splits of the given sizes, sampled from the cached Jigsaw dataset when
+    data_cache_dir is given and generated otherwise
+    """
+    if data_cache_dir is None:
+        X, y = synthetic_corpus(scale + test_size, seed=seed)
+        return X[:scale], X[scale:].reset_index(drop=True), y[:scale], y[scale:].reset_index(drop=True)
+
+    X_train, X_test, y_train, y_test, _ = load_and_prepare_data(cache_dir=data_cache_dir, offline=True)
+    train_idx = np.random.default_rng(seed).choice(len(X_train), size=min(scale, len(X_train)), replace=False)
+    test_idx = np.random.default_rng(seed + 1).choice(len(X_test), size=min(test_size, len(X_test)), replace=False)
+    return (X_train.iloc[train_idx].reset_index(drop=True), X_test.iloc[test_idx].reset_index(drop=True),
+            y_train.iloc[train_idx].reset_index(drop=True), y_test.iloc[test_idx].reset_index(drop=True))
+
+def predict_throughput(pipeline, texts, batch_size, max_comments=2048):
+    """
+    Comments per second when predicting texts in batches of batch_size
+    """
+    texts = list(texts)[:max_comments]
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    start = time.perf_counter()
+    for batch in batches:
+        pipeline.predict(batch)
+    return len(texts) / (time.perf_counter() - start)
+
+def benchmark_pipeline(model_name, builder, X_train, y_train, X_test, y_test, run, label_cols,
+                       batch_sizes=BATCH_SIZES, max_comments=2048, load_repeats=3, n_jobs=1):
+    """
+    Fit one pipeline and log its fit time, predict throughput per batch size, pickled size
+    and load time next to the quality metrics from compute_and_log_metrics
+    """
+    print(f'benchmarking {model_name} on {len(X_train)} comments')
+    pipeline = set_n_jobs(builder(), n_jobs)
+
+    start = time.perf_counter()
+    pipeline.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    metrics = compute_and_log_metrics(y_test, pipeline.predict(X_test), run, label_cols)
+
+    bench = {"bench/train_size": len(X_train), "bench/fit_seconds": fit_seconds}
+    for batch_size in batch_sizes:
+        cps = predict_throughput(pipeline, X_test, batch_size, max_comments)
+        bench[f"bench/predict_cps/batch_{batch_size}"] = cps
+        bench[f"bench/predict_us/batch_{batch_size}"] = 1e6 / cps
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"{model_name}.joblib")
+        joblib.dump(pipeline, path)
+        bench["bench/model_bytes"] = os.path.getsize(path)
+        load_times = []
+        for _ in range(load_repeats):
+            start = time.perf_counter()
+            joblib.load(path)
+            load_times.append(time.perf_counter() - start)
+        bench["bench/load_seconds"] = float(np.median(load_times))
+
+    run.log(bench)
+    run.summary.update(bench)
+    return {"key": model_name, **metrics, **bench}
+
+def rank_for_promotion(results, f1_tolerance=0.01, cost_batch_size=COST_BATCH_SIZE):
+    """
+    Order benchmark results for promotion. Models within f1_tolerance of the best macro F1
+    count as equally good and are ranked by serving cost (per-comment latency, then model
+    size); the rest follow by macro F1.
+    """
+    df = pd.DataFrame(results)
+    latency = f"bench/predict_us/batch_{cost_batch_size}"
+    if latency not in df:
+        raise ValueError(f"No latency measured at batch size {cost_batch_size} to rank by")
+    df["promotion/eligible"] = df["macro/f1"] >= df["macro/f1"].max() - f1_tolerance
+    df = df.sort_values(by=["promotion/eligible", latency, "bench/model_bytes"], ascending=[False, True, True])
+    eligible, others = df[df["promotion/eligible"]], df[~df["promotion/eligible"]]
+    return pd.concat([eligible, others.sort_values("macro/f1", ascending=False)]).reset_index(drop=True)
+
+def cost_batch_size_for(batch_sizes):
+    """
+    COST_BATCH_SIZE when it is benchmarked, otherwise the closest benchmarked batch size
+    """
+    if not batch_sizes:
+        raise ValueError("At least one batch size is needed to benchmark predict latency")
+    return min(batch_sizes, key=lambda size: (abs(size - COST_BATCH_SIZE), size))
+
+def run_benchmarks(models, scales, test_size=2000, data_cache_dir=None, offline=False, batch_sizes=BATCH_SIZES,
+                   max_comments=2048, n_jobs=1, f1_tolerance=0.01, seed=1337):
+    """
+    Benchmark every model at every training scale, one W&B run (or LocalRun) each, grouped
+    per invocation. Returns the ranked results per scale and the runs.
+    """
+    cost_batch_size = cost_batch_size_for(batch_sizes)
+    group_id = f"benchmark-{uuid.uuid4().hex[:8]}"
+    rankings, runs = {}, []
+    for scale in scales:
+        X_train, X_test, y_train, y_test = load_corpus(scale, test_size, data_cache_dir, seed)
+        results = []
+        for model_name, model_data in models.items():
+            experiment_name = f"{model_name}-bench-{scale}"
+            if offline:
+                run = LocalRun(experiment_name, {"model_name": model_name, "train_size": scale, "group": group_id})
+            else:
+                run = init_wandb(project_name="toxic_comment_prediction", experiment_name=experiment_name,
+                                 config_name=model_name, config_registry=model_data["registry_name"], group=group_id)
+            results.append(benchmark_pipeline(model_name, model_data["pipeline"], X_train, y_train, X_test, y_test,
+                                              run, LABEL_COLS, batch_sizes, max_comments, n_jobs=n_jobs))
+            runs.append(run)
+
+        ranking = rank_for_promotion(results, f1_tolerance, cost_batch_size)
+        winner = ranking.iloc[0]["key"]
+        for run in runs[-len(models):]:
+            run.summary.update({"promotion/recommended": winner,
+                                "promotion/rank": int(ranking.index[ranking["key"] == run.config["model_name"]][0]) + 1})
+            run.finish()
+        rankings[scale] = ranking
+    return rankings, runs
+
+def write_results(path, rankings, runs):
+    """
+    Write the rankings and every run's logged values as JSON
+    """
+    out = {
+        "rankings": {str(scale): ranking.to_dict(orient="records") for scale, ranking in rankings.items()},
+        "runs": [{"name": run.name, "config": dict(run.config), "summary": dict(run.summary)} for run in runs],
+    }
+    with open(path, "w") as f:
+        json.dump(out, f, indent=2, default=float)
+    return path
+
+def main(scales=(2000, 20000), test_size=2000, data_cache_dir=None, offline=False, output=None, n_jobs=1,
+         f1_tolerance=0.01):
+    rankings, runs = run_benchmarks(MODELS, scales, test_size=test_size, data_cache_dir=data_cache_dir,
+                                    offline=offline, n_jobs=n_jobs, f1_tolerance=f1_tolerance)
+    for scale, ranking in rankings.items():
+        print(f"\ntrain size {scale}:")
+        print(ranking[["key", "macro/f1", "bench/fit_seconds", f"bench/predict_us/batch_{cost_batch_size_for(BATCH_SIZES)}",
+                       "bench/model_bytes", "bench/load_seconds", "promotion/eligible"]].to_string())
+        print(f"recommended for promotion: {ranking.iloc[0]['key']}")
+    if offline or output:
+        print(f"results written to {write_results(output or 'benchmarks.json', rankings, runs)}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark training and inference cost of the model pipelines")
+    parser.add_argument("--scales", type=int, nargs="+", default=[2000, 20000], help="training set sizes")
+    parser.add_argument("--test-size", type=int, default=2000)
+    parser.add_argument("--data-cache", default=None, help="sample from the cached dataset instead of synthetic comments")
+    parser.add_argument("--offline", action="store_true", help="skip W&B and write the results to --output")
+    parser.add_argument("--output", default=None, help="JSON results path (default benchmarks.json when offline)")
+    parser.add_argument("--n-jobs", type=int, default=1, help="n_jobs for OneVsRest/MultiOutput during the benchmark")
+    parser.add_argument("--f1-tolerance", type=float, default=0.01,
+                        help="macro F1 gap within which the cheaper model is promoted")
+    args = parser.parse_args()
+    main(scales=args.scales, test_size=args.test_size, data_cache_dir=args.data_cache, offline=args.offline,
+         output=args.output, n_jobs=args.n_jobs, f1_tolerance=args.f1_tolerance)
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import urllib.request
+
+import pandas as pd
+
+DATA_URLS = {
+    "train": "https://toxic-comment-moderation-app.s3.us-east-1.amazonaws.com/train.csv",
+    "test": "https://toxic-comment-moderation-app.s3.us-east-1.amazonaws.com/test.csv",
+    "test_labels": "https://toxic-comment-moderation-app.s3.us-east-1.amazonaws.com/test_labels.csv",
+}
+LABEL_COLS = ['toxic','severe_toxic','obscene','threat','insult','identity_hate']
+MANIFEST_FILE = "manifest.json"
+
+
+def _sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _download(url, target):
+    """
+    Stream url to target and return its sha256
+    """
+    digest = hashlib.sha256()
+    with urllib.request.urlopen(url) as response, open(target, "wb") as f:
+        for chunk in iter(lambda: response.read(1 << 20), b""):
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
+
+def _to_columnar(df):
+    """
+    Compact dtypes for the cache: uint8 labels (int8 when -1 markers are present)
+    and Arrow-backed strings for the comment text
+    """
+    for col in LABEL_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype("uint8" if df[col].min() >= 0 else "int8")
+    for col in ("id", "comment_text"):
+        if col in df.columns:
+            df[col] = df[col].astype("string[pyarrow]")
+    return df
+
+class DatasetCache:
+    """
+    Local, versioned copy of the Jigsaw CSVs stored as Parquet.
+
+    The first load of each file downloads the CSV once, records its sha256, and converts
+    it to Parquet in cache_dir. Later loads read the Parquet file after checking it against
+    the checksum in manifest.json. With offline=True nothing is downloaded. fixture_dir
+    points at local <name>.csv files that are used in place of the S3 URLs, so tests and
+    air-gapped retrains need no network. A copy cached from another source (fixtures
+    instead of S3, or another fixture_dir) is not reused.
+    """
+
+    def __init__(self, cache_dir="data_cache", offline=False, fixture_dir=None):
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.fixture_dir = fixture_dir
+
+    def _manifest_path(self):
+        return os.path.join(self.cache_dir, MANIFEST_FILE)
+
+    def manifest(self):
+        try:
+            with open(self._manifest_path()) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_manifest(self, manifest):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self._manifest_path())
+
+    def _parquet_path(self, name):
+        return os.path.join(self.cache_dir, f"{name}.parquet")
+
+    def _source(self, name):
+        """
+        Fixture file or S3 URL name is loaded from
+        """
+        if self.fixture_dir:
+            return os.path.abspath(os.path.join(self.fixture_dir, f"{name}.csv"))
+        return DATA_URLS[name]
+
+    def _cached(self, name):
+        """
+        Path to a verified Parquet copy of name from the current source, or None
+        """
+        entry = self.manifest().get(name)
+        path = self._parquet_path(name)
+        if entry is None or not os.path.exists(path):
+            return None
+        if entry["source"] != self._source(name):
+            print(f'cached {name} came from {entry["source"]}, refetching from {self._source(name)}')
+            return None
+        if _sha256(path) != entry["parquet_sha256"]:
+            print(f'checksum mismatch for cached {name}, refetching')
+            return None
+        return path
+
+    def load(self, name):
+        path = self._cached(name)
+        if path is not None:
+            return pd.read_parquet(path)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=self.cache_dir) as staging:
+            source = self._source(name)
+            if self.fixture_dir:
+                csv_path = os.path.join(staging, f"{name}.csv")
+                shutil.copyfile(source, csv_path)
+                source_sha256 = _sha256(csv_path)
+            elif self.offline:
+                raise FileNotFoundError(f"{name} is not in {self.cache_dir} and offline mode is on")
+            else:
+                print(f'downloading {source}')
+                csv_path = os.path.join(staging, f"{name}.csv")
+                source_sha256 = _download(source, csv_path)
+
+            previous = self.manifest().get(name)
+            if previous and previous["source_sha256"] != source_sha256:
+                print(f'{name} changed upstream since it was last cached')
+
+            df = _to_columnar(pd.read_csv(csv_path))
+            parquet_tmp = os.path.join(staging, f"{name}.parquet")
+            df.to_parquet(parquet_tmp, index=False)
+            os.replace(parquet_tmp, self._parquet_path(name))
+
+        manifest = self.manifest()
+        manifest[name] = {
+            "source": source,
+            "source_sha256": source_sha256,
+            "parquet_sha256": _sha256(self._parquet_path(name)),
+            "rows": len(df),
+        }
+        self._write_manifest(manifest)
+        return df
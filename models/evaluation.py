@@ -0,0 +1,93 @@
+import numpy as np
+
+# order of the last axis of the confusion counts; also the 2 * true + pred cell code
+TN, FP, FN, TP = range(4)
+
+
+def label_patterns(y_true, y_pred):
+    """
+    One pass over the (n, n_labels) label matrices. Every row is coded by its
+    2 * true + pred cell for each label, packed two bits per label, so rows with the same
+    outcome on every label share a code. Returns the distinct codes and their counts.
+    """
+    y_true = np.asarray(y_true).astype(np.int64) != 0
+    y_pred = np.asarray(y_pred).astype(np.int64) != 0
+    cells = (y_true.astype(np.int64) << 1) | y_pred
+    shifts = 2 * np.arange(cells.shape[1], dtype=np.int64)
+    codes = (cells << shifts).sum(axis=1)
+    return np.unique(codes, return_counts=True)
+
+def _pattern_table(patterns, n_labels):
+    """
+    (n_patterns, n_labels, 4) one-hot confusion cells and an (n_patterns,) exact match flag
+    """
+    cells = (patterns[:, None] >> (2 * np.arange(n_labels))) & 3
+    onehot = (cells[..., None] == np.arange(4)).astype(np.int64)
+    exact = ((cells == TN) | (cells == TP)).all(axis=1).astype(np.int64)
+    return onehot, exact
+
+def _ratio(num, den):
+    num = np.asarray(num, dtype=np.float64)
+    den = np.asarray(den, dtype=np.float64)
+    return np.divide(num, den, out=np.zeros(np.broadcast(num, den).shape), where=den > 0)
+
+def metrics_from_counts(counts, exact_matches, n, label_cols):
+    """
+    Every metric compute_and_log_metrics reports, from (..., n_labels, 4) confusion counts.
+    Leading axes are kept, so one call covers all bootstrap replicates. Undefined ratios
+    are 0, like sklearn's zero_division=0.
+    """
+    counts = np.asarray(counts)
+    fp, fn, tp = counts[..., FP], counts[..., FN], counts[..., TP]
+    precision = _ratio(tp, tp + fp)
+    recall = _ratio(tp, tp + fn)
+    f1 = _ratio(2 * tp, 2 * tp + fp + fn)
+    tp_all, fp_all, fn_all = tp.sum(axis=-1), fp.sum(axis=-1), fn.sum(axis=-1)
+
+    metrics = {
+        "micro/f1":        _ratio(2 * tp_all, 2 * tp_all + fp_all + fn_all),
+        "macro/f1":        f1.mean(axis=-1),
+        "micro/precision": _ratio(tp_all, tp_all + fp_all),
+        "micro/recall":    _ratio(tp_all, tp_all + fn_all),
+        "macro/precision": precision.mean(axis=-1),
+        "macro/recall":    recall.mean(axis=-1),
+        "subset_accuracy": _ratio(exact_matches, n),
+    }
+    for i, lbl in enumerate(label_cols):
+        metrics[f"f1/{lbl}"] = f1[..., i]
+    return metrics
+
+def bootstrap_counts(patterns, freq, n_labels, n_bootstrap=1000, seed=0):
+    """
+    Confusion counts and exact matches of n_bootstrap resamples of the rows. Resampling n
+    rows with replacement is a multinomial draw over the distinct row patterns, so every
+    replicate costs one row of at most 4 ** n_labels counts instead of n rows.
+    """
+    n = int(freq.sum())
+    onehot, exact = _pattern_table(patterns, n_labels)
+    weights = np.random.default_rng(seed).multinomial(n, freq / n, size=n_bootstrap)
+    counts = np.tensordot(weights, onehot, axes=1)
+    return counts, weights @ exact
+
+def evaluate(y_true, y_pred, label_cols, n_bootstrap=1000, confidence=0.95, seed=0):
+    """
+    Micro/macro/per-label metrics from one pass over the label matrices, with percentile
+    bootstrap intervals logged as {key}/ci_low and {key}/ci_high when n_bootstrap > 0
+    """
+    patterns, freq = label_patterns(y_true, y_pred)
+    n = int(freq.sum())
+    n_labels = len(label_cols)
+    onehot, exact = _pattern_table(patterns, n_labels)
+    counts = np.tensordot(freq, onehot, axes=1)
+    metrics = {key: float(value) for key, value in
+               metrics_from_counts(counts, int(freq @ exact), n, label_cols).items()}
+
+    if n_bootstrap and n:
+        boot_counts, boot_exact = bootstrap_counts(patterns, freq, n_labels, n_bootstrap, seed)
+        replicates = metrics_from_counts(boot_counts, boot_exact, n, label_cols)
+        tail = (1 - confidence) / 2 * 100
+        for key, values in replicates.items():
+            low, high = np.percentile(values, [tail, 100 - tail])
+            metrics[f"{key}/ci_low"] = float(low)
+            metrics[f"{key}/ci_high"] = float(high)
+    return metrics
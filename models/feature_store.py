@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import joblib
+import pandas as pd
+import scipy.sparse as sp
+
+
+def _fingerprint_texts(texts):
+    """
+    Hash a Series of comments without a Python-level loop
+    """
+    hashed = pd.util.hash_pandas_object(pd.Series(texts).reset_index(drop=True), index=False)
+    return hashlib.sha256(hashed.values.tobytes()).hexdigest()
+
+def vectorizer_config(vectorizer):
+    """
+    JSON-able description of a vectorizer's class and parameters
+    """
+    params = {name: repr(value) for name, value in sorted(vectorizer.get_params().items())}
+    return {"class": type(vectorizer).__name__, "params": params}
+
+class FeatureStore:
+    """
+    Disk cache of fitted vectorizers and their sparse train/test matrices.
+
+    Entries are keyed by a hash of the vectorizer config and the train/test texts, so
+    pipelines that share a vectorizer config (log_reg and linear_svm) fit it once, and
+    repeated experiments skip vectorization entirely. Each entry holds train.npz,
+    test.npz and the fitted vectorizer.joblib.
+    """
+
+    def __init__(self, cache_dir="feature_cache"):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, vectorizer, X_train, X_test):
+        payload = {
+            "vectorizer": vectorizer_config(vectorizer),
+            "train": _fingerprint_texts(X_train),
+            "test": _fingerprint_texts(X_test),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+    def _paths(self, key):
+        entry = os.path.join(self.cache_dir, key)
+        return entry, os.path.join(entry, "train.npz"), os.path.join(entry, "test.npz"), os.path.join(entry, "vectorizer.joblib")
+
+    def get_or_fit(self, vectorizer, X_train, X_test):
+        """
+        Return (X_train_matrix, X_test_matrix, fitted_vectorizer), fitting only on a cache miss
+        """
+        key = self.key(vectorizer, X_train, X_test)
+        entry, train_path, test_path, vectorizer_path = self._paths(key)
+        if os.path.isdir(entry):
+            self.hits += 1
+            print(f'feature cache hit {key}')
+            return sp.load_npz(train_path), sp.load_npz(test_path), joblib.load(vectorizer_path)
+
+        self.misses += 1
+        print(f'feature cache miss {key}, fitting {type(vectorizer).__name__}')
+        X_train_matrix = vectorizer.fit_transform(X_train)
+        X_test_matrix = vectorizer.transform(X_test)
+
+        # write into a staging dir and rename, so concurrent workers never see half an entry
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.cache_dir, suffix=".partial")
+        sp.save_npz(os.path.join(staging, "train.npz"), X_train_matrix.tocsr())
+        sp.save_npz(os.path.join(staging, "test.npz"), X_test_matrix.tocsr())
+        joblib.dump(vectorizer, os.path.join(staging, "vectorizer.joblib"))
+        with open(os.path.join(staging, "config.json"), "w") as f:
+            json.dump(vectorizer_config(vectorizer), f, indent=2)
+        try:
+            os.rename(staging, entry)
+        except OSError:
+            # another process stored the same entry first
+            shutil.rmtree(staging, ignore_errors=True)
+        return X_train_matrix, X_test_matrix, vectorizer
+
+    def warm(self, vectorizers, X_train, X_test):
+        """
+        Fit each distinct vectorizer config once, ahead of training the classifiers
+        """
+        seen = set()
+        for vectorizer in vectorizers:
+            key = self.key(vectorizer, X_train, X_test)
+            if key not in seen:
+                seen.add(key)
+                self.get_or_fit(vectorizer, X_train, X_test)
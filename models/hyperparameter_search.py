@@ -0,0 +1,198 @@
+import argparse
+import math
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import f1_score
+from sklearn.model_selection import KFold, ParameterGrid
+
+from feature_store import FeatureStore
+from model_training import (MODELS, init_wandb, load_and_prepare_data, plan_workers, set_n_jobs,
+                            train_and_log_model, train_model)
+
+# builder arguments searched per model, the current defaults are always in the grid
+SEARCH_SPACES = {
+    "log_reg": {
+        "C": [0.25, 1.0, 4.0],
+        "min_df": [2, 3, 5],
+        "ngram_range": [(1,1), (1,2)],
+    },
+    "linear_svm": {
+        "C": [0.1, 0.5, 1.0],
+        "min_df": [2, 3, 5],
+        "ngram_range": [(1,1), (1,2)],
+    },
+    "multi_nb": {
+        "alpha": [0.01, 0.1, 0.5],
+        "min_df": [1, 2],
+        "ngram_range": [(1,1), (1,2)],
+    },
+}
+
+
+def n_rounds_for(n_candidates, factor):
+    """
+    rounds needed to cut n_candidates down by factor until the last round picks the winner
+    """
+    rounds = 1
+    # integer ceil(log_factor(n_candidates)), math.log rounds e.g. log(125, 5) above 3
+    while factor ** rounds < n_candidates:
+        rounds += 1
+    return rounds
+
+def evaluate_candidate(model_name, builder, params, X, y, folds, label_cols, feature_store=None, n_jobs=1,
+                       group=None, round_idx=0, candidate_id=0):
+    """
+    Mean and std of the macro F1 of one config over folds, logged as one W&B run in the
+    search group. Runs in a worker process, so everything it needs is passed in.
+    """
+    run = init_wandb(project_name="toxic_comment_prediction", experiment_name=f"{model_name}-c{candidate_id}-r{round_idx}",
+                     config_name=model_name, group=group)
+    run.config.update({"params": params, "round": round_idx, "candidate": candidate_id, "n_resources": len(X)})
+
+    start = time.perf_counter()
+    scores = []
+    for train_idx, val_idx in folds:
+        pipeline = set_n_jobs(builder(**params), n_jobs)
+        try:
+            y_pred = train_model(pipeline, X.iloc[train_idx], y.iloc[train_idx], X.iloc[val_idx],
+                                 f"{model_name} c{candidate_id}", feature_store=feature_store)
+            scores.append(f1_score(y.iloc[val_idx], y_pred, average="macro", zero_division=0))
+        except ValueError as e:
+            # e.g. min_df prunes every term on a small subset
+            print(f'trial {model_name} c{candidate_id} failed: {e}')
+            scores.append(0.0)
+
+    result = {
+        "candidate": candidate_id,
+        "round": round_idx,
+        "n_resources": len(X),
+        "cv/macro_f1_mean": float(np.mean(scores)),
+        "cv/macro_f1_std": float(np.std(scores)),
+        "fit_seconds": time.perf_counter() - start,
+    }
+    run.log(result)
+    run.finish()
+    return {**result, "params": params}
+
+def successive_halving(model_name, builder, space, X, y, label_cols, cv=3, factor=3, min_resources=None,
+                       max_resources=None, feature_store=None, max_workers=None, cpu_budget=None, seed=1337, group=None):
+    """
+    Search the grid in space with successive halving: every config is scored with cv-fold
+    macro F1 on a small sample, the best 1/factor survive, and the sample grows by factor
+    each round until at most factor configs are left, whose best is the winner. Rounds use nested prefixes of one shuffled order,
+    so later rounds see the earlier rows plus new ones. Configs that share a vectorizer
+    are vectorized once per fold through the feature store.
+    Returns the best params and the history of every trial.
+    """
+    candidates = list(ParameterGrid(space))
+    n_rounds = n_rounds_for(len(candidates), factor)
+    max_resources = min(max_resources or len(X), len(X))
+    min_resources = min_resources or max(cv * 10, max_resources // factor ** (n_rounds - 1))
+    group = group or f"{model_name}-search-{uuid.uuid4().hex[:8]}"
+    order = np.random.default_rng(seed).permutation(len(X))
+    max_workers, n_jobs = plan_workers(len(candidates), max_workers, cpu_budget)
+    print(f'searching {len(candidates)} {model_name} configs in {n_rounds} rounds with {max_workers} worker(s)')
+
+    survivors = list(range(len(candidates)))
+    history = []
+    pool = None
+    if max_workers > 1:
+        # spawn so each worker starts with a clean W&B and BLAS state
+        pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        for round_idx in range(n_rounds):
+            n_resources = min(max_resources, min_resources * factor ** round_idx)
+            subset = order[:n_resources]
+            X_round = X.iloc[subset].reset_index(drop=True)
+            y_round = y.iloc[subset].reset_index(drop=True)
+            folds = list(KFold(n_splits=cv, shuffle=True, random_state=seed).split(X_round))
+
+            if feature_store is not None:
+                # fit each distinct vectorizer config once per fold before the trials read it
+                vectorizers = [builder(**candidates[i]).steps[0][1] for i in survivors]
+                for train_idx, val_idx in folds:
+                    try:
+                        feature_store.warm(vectorizers, X_round.iloc[train_idx], X_round.iloc[val_idx])
+                    except ValueError as e:
+                        print(f'could not pre-fit a vectorizer: {e}')
+
+            args = [(model_name, builder, candidates[i], X_round, y_round, folds, label_cols, feature_store, n_jobs,
+                     group, round_idx, i) for i in survivors]
+            if pool is None:
+                results = [evaluate_candidate(*a) for a in args]
+            else:
+                results = [future.result() for future in [pool.submit(evaluate_candidate, *a) for a in args]]
+            history.extend(results)
+
+            ranked = sorted(results, key=lambda r: (-r["cv/macro_f1_mean"], r["candidate"]))
+            print(f'round {round_idx}: {len(results)} configs on {n_resources} comments, '
+                  f'best macro F1 {ranked[0]["cv/macro_f1_mean"]:.4f}')
+            if len(ranked) == 1 or round_idx == n_rounds - 1:
+                break
+            survivors = [r["candidate"] for r in ranked[:max(1, math.ceil(len(ranked) / factor))]]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    best = ranked[0]
+    return best["params"], pd.DataFrame(history)
+
+def search_and_publish(model_names, X_train, X_test, y_train, y_test, label_cols, cv=3, factor=3, min_resources=None,
+                       max_resources=None, feature_store=None, max_workers=None, cpu_budget=None, publish=True):
+    """
+    Run the search for each model, then retrain the best config on the full training set
+    and publish it through train_and_log_model and build_model_artifact
+    """
+    best = {}
+    for model_name in model_names:
+        model_data = MODELS[model_name]
+        params, history = successive_halving(
+            model_name, model_data["pipeline"], SEARCH_SPACES[model_name], X_train, y_train, label_cols, cv=cv,
+            factor=factor, min_resources=min_resources, max_resources=max_resources, feature_store=feature_store,
+            max_workers=max_workers, cpu_budget=cpu_budget)
+        print(f'best {model_name} config: {params}')
+        result = {"key": model_name, "params": params, "trials": len(history)}
+        if publish:
+            _, n_jobs = plan_workers(1, 1, cpu_budget)
+            result.update(train_and_log_model(model_name, model_data, X_train, X_test, y_train, y_test, label_cols,
+                                              n_jobs=n_jobs, feature_store=feature_store, params=params))
+        best[model_name] = result
+    return best
+
+def main(model_names=None, cv=3, factor=3, min_resources=None, max_resources=None, max_workers=None, cpu_budget=None,
+         feature_cache_dir="feature_cache", data_cache_dir="data_cache", offline=False, fixture_dir=None, publish=True):
+    X_train, X_test, y_train, y_test, label_cols = load_and_prepare_data(
+        cache_dir=data_cache_dir, offline=offline, fixture_dir=fixture_dir)
+    feature_store = FeatureStore(feature_cache_dir) if feature_cache_dir else None
+    best = search_and_publish(model_names or list(SEARCH_SPACES), X_train, X_test, y_train, y_test, label_cols, cv=cv,
+                              factor=factor, min_resources=min_resources, max_resources=max_resources,
+                              feature_store=feature_store, max_workers=max_workers, cpu_budget=cpu_budget,
+                              publish=publish)
+    for model_name, result in best.items():
+        print(model_name, result["params"], result.get("macro/f1"))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Successive halving hyperparameter search over the model pipelines")
+    parser.add_argument("--models", nargs="+", choices=list(SEARCH_SPACES), default=None)
+    parser.add_argument("--cv", type=int, default=3, help="folds per trial")
+    parser.add_argument("--factor", type=int, default=3, help="keep 1/factor configs and grow the sample by factor each round")
+    parser.add_argument("--min-resources", type=int, default=None, help="training comments in the first round")
+    parser.add_argument("--max-resources", type=int, default=None, help="cap on training comments per round")
+    parser.add_argument("--workers", type=int, default=None, help="trials run at once")
+    parser.add_argument("--cpu-budget", type=int, default=None, help="total cores to use (default: all)")
+    parser.add_argument("--feature-cache", default="feature_cache", help="directory for cached feature matrices")
+    parser.add_argument("--no-feature-cache", action="store_true", help="refit the vectorizer for every trial")
+    parser.add_argument("--data-cache", default="data_cache", help="directory for the Parquet copy of the dataset")
+    parser.add_argument("--offline", action="store_true", help="never download, read only from the data cache")
+    parser.add_argument("--data-fixtures", default=None, help="directory of train/test/test_labels CSVs to use instead of S3")
+    parser.add_argument("--no-publish", action="store_true", help="only search, do not train and publish the best config")
+    args = parser.parse_args()
+    main(model_names=args.models, cv=args.cv, factor=args.factor, min_resources=args.min_resources,
+         max_resources=args.max_resources, max_workers=args.workers, cpu_budget=args.cpu_budget,
+         feature_cache_dir=None if args.no_feature_cache else args.feature_cache, data_cache_dir=args.data_cache,
+         offline=args.offline, fixture_dir=args.data_fixtures, publish=not args.no_publish)
@@ -0,0 +1,224 @@
+# api/linear_scorer.py and models/linear_scorer.py are identical copies: the API serves compact models, training
+# writes them, and the two directories are deployed separately. models/tests/test_export_compact.py
+# fails when the copies differ, so change both.
+import re
+import unicodedata
+
+import numpy as np
+
+
+def _strip_accents_unicode(s: str) -> str:
+    try:
+        s.encode("ASCII", errors="strict")
+        return s
+    except UnicodeEncodeError:
+        normalized = unicodedata.normalize("NFKD", s)
+        return "".join([c for c in normalized if not unicodedata.combining(c)])
+
+
+def _strip_accents_ascii(s: str) -> str:
+    return unicodedata.normalize("NFKD", s).encode("ASCII", "ignore").decode("ASCII")
+
+
+_ACCENT_FUNCTIONS = {"unicode": _strip_accents_unicode, "ascii": _strip_accents_ascii, None: None}
+
+
+def extract_linear_params(clf):
+    """
+    Pull one weight vector and intercept per label out of a fitted OneVsRestClassifier or
+    MultiOutputClassifier. A label is predicted as 1 when weights . x + intercept > 0.
+    Returns (weights of shape (n_features, n_labels), intercept, score_type).
+    """
+    rows = []
+    n_features = None
+    for est in clf.estimators_:
+        if hasattr(est, "feature_log_prob_"):
+            # MultinomialNB: the log-odds of the two classes is linear in the counts
+            if len(est.classes_) == 2:
+                rows.append((est.feature_log_prob_[1] - est.feature_log_prob_[0],
+                             est.class_log_prior_[1] - est.class_log_prior_[0]))
+            else:
+                rows.append((None, 1.0 if est.classes_[0] == 1 else -1.0))
+        elif hasattr(est, "coef_"):
+            rows.append((np.ravel(est.coef_), float(np.ravel(est.intercept_)[0])))
+        elif hasattr(est, "y_"):
+            # OneVsRestClassifier keeps a constant predictor for single-class labels
+            rows.append((None, 1.0 if np.ravel(est.y_)[0] == 1 else -1.0))
+        else:
+            raise ValueError(f"Cannot score {type(est).__name__} with a linear scorer")
+        if rows[-1][0] is not None:
+            n_features = len(rows[-1][0])
+
+    weights = np.zeros((n_features, len(rows)), dtype=np.float32)
+    intercept = np.zeros(len(rows), dtype=np.float32)
+    for i, (coef, bias) in enumerate(rows):
+        if coef is not None:
+            weights[:, i] = coef
+        intercept[i] = bias
+
+    probabilistic = all(
+        hasattr(est, "feature_log_prob_") or type(est).__name__ == "LogisticRegression" or hasattr(est, "y_")
+        for est in clf.estimators_
+    )
+    return weights, intercept, ("log_odds" if probabilistic else "decision")
+
+
+class LinearScorer:
+    """
+    Minimal-overhead inference engine for vectorizer + linear classifier pipelines.
+
+    Text goes through a pre-compiled tokenizer, a direct vocabulary lookup and the tf-idf
+    transform, then one sparse x dense product scores all labels at once. There is no
+    per-estimator loop or sklearn input validation, and the outputs match Pipeline.predict.
+    """
+
+    def __init__(self, meta: dict, weights, intercept, idf=None, vocabulary: dict | None = None):
+        self.meta = meta
+        self.labels = meta["labels"]
+        self.score_type = meta["score_type"]
+        self.n_features = int(meta["n_features"])
+        self.weights = weights
+        self.intercept = np.asarray(intercept)
+        self.idf = idf
+        self.vocabulary = vocabulary
+
+        self._token_findall = re.compile(meta["token_pattern"]).findall
+        self._lowercase = meta["lowercase"]
+        self._strip_accents = _ACCENT_FUNCTIONS[meta["strip_accents"]]
+        self._stop_words = frozenset(meta["stop_words"]) if meta["stop_words"] else None
+        self._min_n, self._max_n = meta["ngram_range"]
+        self._binary = meta["binary"]
+        self._sublinear_tf = meta["sublinear_tf"]
+        self._norm = meta["norm"]
+
+    @classmethod
+    def from_pipeline(cls, pipeline, labels: list[str]):
+        """
+        Build a scorer from a fitted sklearn Pipeline of a word-level Count/TfidfVectorizer
+        followed by a OneVsRest or MultiOutput linear classifier
+        """
+        vectorizer = pipeline.steps[0][1]
+        clf = pipeline.steps[-1][1]
+        if not hasattr(vectorizer, "vocabulary_") or getattr(vectorizer, "analyzer", None) != "word":
+            raise ValueError("Linear scorer needs a fitted word-level Count/TfidfVectorizer")
+        if vectorizer.tokenizer is not None or vectorizer.preprocessor is not None:
+            raise ValueError("Linear scorer does not support custom tokenizers or preprocessors")
+        if not hasattr(clf, "estimators_"):
+            raise ValueError("Linear scorer needs a fitted OneVsRest or MultiOutput classifier")
+
+        weights, intercept, score_type = extract_linear_params(clf)
+        use_idf = bool(getattr(vectorizer, "use_idf", False))
+        stop_words = vectorizer.get_stop_words()
+        meta = {
+            "format_version": 1,
+            "labels": list(labels),
+            "n_features": int(weights.shape[0]),
+            "score_type": score_type,
+            "lowercase": vectorizer.lowercase,
+            "strip_accents": vectorizer.strip_accents,
+            "token_pattern": vectorizer.token_pattern,
+            "ngram_range": list(vectorizer.ngram_range),
+            "stop_words": sorted(stop_words) if stop_words else None,
+            "binary": vectorizer.binary,
+            "use_idf": use_idf,
+            "sublinear_tf": bool(getattr(vectorizer, "sublinear_tf", False)),
+            "norm": getattr(vectorizer, "norm", None),
+        }
+        idf = vectorizer.idf_.astype(np.float64) if use_idf else None
+        return cls(meta, weights, intercept, idf=idf, vocabulary=dict(vectorizer.vocabulary_))
+
+    def analyze(self, text: str) -> list[str]:
+        """
+        Split a comment into word n-grams exactly like sklearn's word analyzer
+        """
+        if self._lowercase:
+            text = text.lower()
+        if self._strip_accents is not None:
+            text = self._strip_accents(text)
+        tokens = self._token_findall(text)
+        if self._stop_words is not None:
+            tokens = [w for w in tokens if w not in self._stop_words]
+
+        min_n, max_n = self._min_n, self._max_n
+        if max_n == 1:
+            return tokens
+        if min_n == 1 and max_n == 2:
+            # the served models all use (1, 2); build bigrams without the generic loop
+            return tokens + [a + " " + b for a, b in zip(tokens, tokens[1:])]
+
+        original_tokens = tokens
+        if min_n == 1:
+            tokens = list(original_tokens)
+            min_n += 1
+        else:
+            tokens = []
+        n_original = len(original_tokens)
+        for n in range(min_n, min(max_n + 1, n_original + 1)):
+            for i in range(n_original - n + 1):
+                tokens.append(" ".join(original_tokens[i:i + n]))
+        return tokens
+
+    def _lookup(self, terms: list[str]) -> np.ndarray:
+        """
+        Map terms to feature columns, -1 for terms outside the vocabulary
+        """
+        get = self.vocabulary.get
+        return np.fromiter((get(t, -1) for t in terms), dtype=np.int64, count=len(terms))
+
+    def transform(self, texts: list[str]):
+        """
+        Vectorize a batch of comments into a CSR matrix matching the training vectorizer
+        """
+        # scipy is imported on the first batch, so importing the API does not load it
+        import scipy.sparse as sp
+
+        terms = []
+        lengths = []
+        analyze = self.analyze
+        for text in texts:
+            doc_terms = analyze(text)
+            terms.extend(doc_terms)
+            lengths.append(len(doc_terms))
+        columns = self._lookup(terms)
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+        keep = columns >= 0
+
+        # duplicate (row, column) pairs are summed into term counts
+        X = sp.csr_matrix(
+            (np.ones(int(keep.sum()), dtype=np.float64), (rows[keep], columns[keep])),
+            shape=(len(texts), self.n_features),
+        )
+        X.sum_duplicates()
+        if self._binary:
+            X.data[:] = 1.0
+        if self._sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1.0
+        if self.idf is not None:
+            X.data *= self.idf[X.indices]
+        if self._norm in ("l1", "l2"):
+            squared = X.data ** 2 if self._norm == "l2" else np.abs(X.data)
+            row_lengths = np.diff(X.indptr)
+            # per-row sums by row index, so empty rows anywhere in the batch get 0
+            norms = np.bincount(np.repeat(np.arange(len(texts)), row_lengths), weights=squared,
+                                minlength=len(texts))
+            if self._norm == "l2":
+                norms = np.sqrt(norms)
+            norms[norms == 0.0] = 1.0
+            X.data /= np.repeat(norms, row_lengths)
+        return X
+
+    def decision_from_matrix(self, X) -> np.ndarray:
+        """
+        Raw per-label scores for an already transformed matrix
+        """
+        return np.asarray(X @ self.weights) + self.intercept
+
+    def decision_function(self, texts: list[str]) -> np.ndarray:
+        """
+        Raw per-label scores from one sparse x dense product; positive means label 1
+        """
+        return self.decision_from_matrix(self.transform(texts))
+
+    def predict(self, texts: list[str]) -> np.ndarray:
+        return (self.decision_function(texts) > 0).astype(np.int64)
@@ -1,16 +1,29 @@
 import wandb
 import pandas as pd
+import numpy as np
 import joblib
-from sklearn.metrics import f1_score, precision_score, recall_score, accuracy_score
+import json
+import os
 import warnings
-from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer, HashingVectorizer
 from sklearn.multioutput import MultiOutputClassifier
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.pipeline import Pipeline
 from sklearn.svm import LinearSVC
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.multiclass import OneVsRestClassifier
 import uuid
+import argparse
+import itertools
+import multiprocessing
+import pyarrow.parquet as pq
+from concurrent.futures import ProcessPoolExecutor
+from feature_store import FeatureStore
+from dataset_cache import DatasetCache
+from evaluation import evaluate
+# copies of the API's modules, so the compact export uses the same writer as the API
+from compact_model import save_compact_model
+from linear_scorer import LinearScorer
 
 warnings.filterwarnings('ignore')
 
@@ -32,17 +45,34 @@ def init_wandb(project_name="toxic_comment_prediction", experiment_name=None, co
     )
     return run
 
-def load_and_prepare_data():
+def drop_unscored(test_df, test_labels_df, label_cols):
     """
-    load the training data, test data and test labels from aws s3 bucket
+    Drop the test rows labelled -1: they were never scored, so they are neither
+    positives nor negatives and would bias the metrics and thresholds
     """
-    # read csv
-    print('load and prepare data')
-    train_df = pd.read_csv("https://toxic-comment-moderation-app.s3.us-east-1.amazonaws.com/train.csv")
-    test_df = pd.read_csv("https://toxic-comment-moderation-app.s3.us-east-1.amazonaws.com/test.csv")
-    test_labels_df = pd.read_csv("https://toxic-comment-moderation-app.s3.us-east-1.amazonaws.com/test_labels.csv").replace(-1, 1)
+    scored = (test_labels_df[label_cols] != -1).all(axis=1).to_numpy()
+    return test_df[scored], test_labels_df[scored]
 
+def load_and_prepare_data(cache_dir=None, offline=False, fixture_dir=None):
+    """
+    load the training data, test data and test labels from aws s3 bucket,
+    or from the local Parquet cache when cache_dir, offline or fixture_dir is given
+    """
+    print('load and prepare data')
     label_cols = ['toxic','severe_toxic','obscene','threat','insult','identity_hate']
+    if cache_dir or offline or fixture_dir:
+        cache = DatasetCache(cache_dir or "data_cache", offline=offline, fixture_dir=fixture_dir)
+        train_df = cache.load("train")
+        test_df, test_labels_df = drop_unscored(cache.load("test"), cache.load("test_labels"), label_cols)
+        test_labels_df = test_labels_df.astype({label: "uint8" for label in label_cols})
+    else:
+        # read csv
+        train_df = pd.read_csv("https://toxic-comment-moderation-app.s3.us-east-1.amazonaws.com/train.csv")
+        test_df, test_labels_df = drop_unscored(
+            pd.read_csv("https://toxic-comment-moderation-app.s3.us-east-1.amazonaws.com/test.csv"),
+            pd.read_csv("https://toxic-comment-moderation-app.s3.us-east-1.amazonaws.com/test_labels.csv"),
+            label_cols)
+
     X_train = train_df['comment_text']
     y_train = train_df[label_cols]
 
@@ -51,14 +81,45 @@ def load_and_prepare_data():
 
     return X_train, X_test, y_train, y_test, label_cols
 
+# share of the training rows held out to tune the serving thresholds
+VALIDATION_FRACTION = 0.1
+
+def validation_mask(n, start=0, fraction=VALIDATION_FRACTION):
+    """
+    Rows held out for validation: the last of every round(1 / fraction) rows counted from
+    start, so the same rows are held out whatever the chunking or the number of epochs
+    """
+    every = round(1 / fraction)
+    return np.arange(start, start + n) % every == every - 1
+
+def split_validation(X, y, fraction=VALIDATION_FRACTION):
+    """
+    Split the training data into the rows the model is fit on and the validation rows
+    """
+    mask = validation_mask(len(X), fraction=fraction)
+    return X[~mask], X[mask], y[~mask], y[mask]
+
+def split_chunks(chunks, validation=False, fraction=VALIDATION_FRACTION):
+    """
+    Yield the training rows of each chunk, or its validation rows with validation=True,
+    picked by their position across all chunks as in split_validation
+    """
+    start = 0
+    for chunk in chunks:
+        mask = validation_mask(len(chunk), start, fraction)
+        start += len(chunk)
+        rows = chunk[mask if validation else ~mask]
+        if len(rows):
+            yield rows
+
 
-def build_nb_pipeline():
+def build_nb_pipeline(alpha=0.1, ngram_range=(1,1), min_df=1, stop_words='english'):
     """
     build Multinomial NaiveBayes model pipeline
     """
     print('building nb pipeline')
-    vectorizer = CountVectorizer(stop_words='english')
-    clf = MultiOutputClassifier(MultinomialNB(alpha=0.1))
+    vectorizer = CountVectorizer(stop_words=stop_words, ngram_range=ngram_range, min_df=min_df)
+    clf = MultiOutputClassifier(MultinomialNB(alpha=alpha))
     nb_pipeline = Pipeline(steps=[
         ('vectorizer', vectorizer),
         ('clf', clf)
@@ -66,7 +127,7 @@ def build_nb_pipeline():
 
     return nb_pipeline
 
-def build_lr_pipeline():
+def build_lr_pipeline(C=1.0, ngram_range=(1,2), min_df=3, sublinear_tf=True, class_weight="balanced"):
     """
     build LogisticRegression model pipeline
     """
@@ -74,22 +135,23 @@ def build_lr_pipeline():
     lr_pipeline = Pipeline([
         ("tfidf", TfidfVectorizer(
             analyzer="word",
-            ngram_range=(1,2), 
-            min_df=3,         
+            ngram_range=ngram_range,
+            min_df=min_df,
             strip_accents="unicode",
-            sublinear_tf=True 
+            sublinear_tf=sublinear_tf
         )),
         ("clf", OneVsRestClassifier(
             LogisticRegression(
+                C=C,
                 solver="liblinear",
                 max_iter=1000,
-                class_weight="balanced"
+                class_weight=class_weight
             ), n_jobs=-1))
     ])
 
     return lr_pipeline
 
-def build_svm_pipeline():
+def build_svm_pipeline(C=1.0, ngram_range=(1,2), min_df=3, sublinear_tf=True, class_weight="balanced"):
     """
     build the LinearSVC model pipeline
     """
@@ -97,15 +159,15 @@ def build_svm_pipeline():
     svm_pipeline = Pipeline([
         ("tfidf", TfidfVectorizer(
             analyzer="word",
-            ngram_range=(1,2),
-            min_df=3,
+            ngram_range=ngram_range,
+            min_df=min_df,
             strip_accents="unicode",
-            sublinear_tf=True
+            sublinear_tf=sublinear_tf
         )),
         ("clf", OneVsRestClassifier(
-            LinearSVC(  
-                C=1.0,   
-                class_weight="balanced"
+            LinearSVC(
+                C=C,
+                class_weight=class_weight
             ),
             n_jobs=-1
         ))
@@ -113,46 +175,213 @@ def build_svm_pipeline():
 
     return svm_pipeline
 
-def train_model(pipeline, X_train, y_train, X_test, model_name):
+def classifier_scores(clf, X):
+    """
+    Per-label scores of shape (n, n_labels) for an already vectorized X: the positive-class
+    probability when the classifier has predict_proba, otherwise the decision_function margin
+    """
+    if hasattr(clf, "predict_proba"):
+        proba = clf.predict_proba(X)
+        if isinstance(proba, list):
+            # MultiOutputClassifier returns one (n, n_classes) array per label
+            proba = np.column_stack([
+                p[:, list(est.classes_).index(1)] if 1 in est.classes_ else np.zeros(p.shape[0])
+                for p, est in zip(proba, clf.estimators_)
+            ])
+        return np.asarray(proba, dtype=np.float64), "probability"
+    return np.asarray(clf.decision_function(X), dtype=np.float64), "decision"
+
+def train_model(pipeline, X_train, y_train, X_test, model_name, feature_store=None, return_scores=False):
     """
     Train a model 
+    With return_scores=True also returns the per-label test scores and their score type
+    from the same vectorized test matrix.
     """
     print(f"Training {model_name}...")
 
-    pipeline.fit(X_train, y_train)
+    if feature_store is not None and len(pipeline.steps) == 2:
+        # reuse cached tf-idf/count matrices and only fit the classifier
+        vectorizer_name, vectorizer = pipeline.steps[0]
+        X_train_matrix, X_test_matrix, fitted_vectorizer = feature_store.get_or_fit(vectorizer, X_train, X_test)
+        pipeline.steps[0] = (vectorizer_name, fitted_vectorizer)
+        clf = pipeline.steps[-1][1]
+        clf.fit(X_train_matrix, y_train)
+    else:
+        pipeline.fit(X_train, y_train)
+        clf = pipeline.steps[-1][1]
+        X_test_matrix = pipeline[:-1].transform(X_test)
+
+    y_pred = clf.predict(X_test_matrix)
+
+    if return_scores:
+        return (y_pred, *classifier_scores(clf, X_test_matrix))
+    return y_pred
 
-    y_pred = pipeline.predict(X_test)
+# features of the stateless hashing featurizer used by the streaming models
+STREAM_N_FEATURES = 2 ** 20
 
-    return y_pred
+def build_streaming_hashing_vectorizer(n_features=STREAM_N_FEATURES):
+    """
+    build the stateless featurizer for streaming training: no vocabulary to fit or hold
+    in memory, and non-negative counts so MultinomialNB can use it as well
+    """
+    return HashingVectorizer(
+        analyzer="word",
+        ngram_range=(1,2),
+        strip_accents="unicode",
+        alternate_sign=False,
+        n_features=n_features
+    )
 
-def compute_and_log_metrics(y_true, y_pred, run, label_cols):
+def build_sgd_stream_pipeline():
     """
-    calculate and send metrics to wandb.ai dashboard
+    build the streaming SGD logistic regression pipeline, one partial_fit model per label
     """
-    print('computing metrics')
+    print('building sgd stream pipeline')
+    return Pipeline([
+        ("hashing", build_streaming_hashing_vectorizer()),
+        ("clf", MultiOutputClassifier(
+            SGDClassifier(
+                loss="log_loss",
+                alpha=1e-6,
+                random_state=1337
+            )))
+    ])
+
+def build_nb_stream_pipeline():
+    """
+    build the streaming Multinomial NaiveBayes pipeline, one partial_fit model per label
+    """
+    print('building nb stream pipeline')
+    return Pipeline([
+        ("hashing", build_streaming_hashing_vectorizer()),
+        ("clf", MultiOutputClassifier(MultinomialNB(alpha=0.1)))
+    ])
+
+def iter_chunks(paths, chunksize=50000, columns=None):
+    """
+    Yield DataFrames of at most chunksize rows from one or more CSV or Parquet files,
+    in order, without reading any file whole
+    """
+    for path in [paths] if isinstance(paths, str) else paths:
+        if path.endswith(".parquet"):
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(path, chunksize=chunksize, usecols=columns)
+
+def train_streaming_model(pipeline, chunks, label_cols, text_col="comment_text"):
+    """
+    Train the classifier of a hashing pipeline with partial_fit, one chunk at a time.
+    Only the current chunk and its sparse matrix are held in memory.
+    """
+    vectorizer = pipeline.steps[0][1]
+    clf = pipeline.steps[-1][1]
+    classes = [np.array([0, 1])] * len(label_cols)
+    n_rows = 0
+    for chunk in chunks:
+        X = vectorizer.transform(chunk[text_col].fillna("").astype(str))
+        Y = chunk[label_cols].to_numpy(dtype=np.int64)
+        clf.partial_fit(X, Y, classes=classes)
+        n_rows += len(chunk)
+        print(f'trained on {n_rows} comments')
+    return pipeline, n_rows
+
+def predict_streaming(pipeline, text_chunks, label_chunks, label_cols, text_col="comment_text"):
+    """
+    Predict and score the test set chunk by chunk, without the unscored -1 rows. Returns the
+    labels, predictions and per-label scores of the test set, the only part that grows with its size.
+    """
+    vectorizer = pipeline.steps[0][1]
+    clf = pipeline.steps[-1][1]
+    y_true, y_pred, scores, score_type = [], [], [], None
+    for texts, labels in zip(text_chunks, label_chunks):
+        texts, labels = drop_unscored(texts, labels, label_cols)
+        if not len(texts):
+            continue
+        X = vectorizer.transform(texts[text_col].fillna("").astype(str))
+        chunk_scores, score_type = classifier_scores(clf, X)
+        y_true.append(labels[label_cols].to_numpy(dtype=np.uint8))
+        y_pred.append(clf.predict(X))
+        scores.append(chunk_scores)
+    n_labels = len(label_cols)
+    return (pd.DataFrame(np.vstack(y_true) if y_true else np.zeros((0, n_labels)), columns=label_cols),
+            np.vstack(y_pred) if y_pred else np.zeros((0, n_labels)),
+            np.vstack(scores) if scores else np.zeros((0, n_labels)), score_type)
+
+# score above which a label is predicted when no tuned threshold is available
+DEFAULT_THRESHOLDS = {"probability": 0.5, "decision": 0.0}
+
+def _best_f1_threshold(scores, y_true, default):
+    """
+    Threshold with the best F1 for one label, found with one sort and a cumulative sum
+    """
+    positives = int(y_true.sum())
+    if positives == 0 or len(scores) < 2:
+        return default
+    order = np.argsort(-scores, kind="stable")
+    sorted_scores = scores[order]
+    tp = np.cumsum(y_true[order])
+    fp = np.arange(1, len(scores) + 1) - tp
+    f1 = 2 * tp / (2 * tp + fp + (positives - tp))
+    # a cut can only fall between two different scores
+    f1[:-1][sorted_scores[:-1] == sorted_scores[1:]] = -1
+    k = int(np.argmax(f1))
+    if k == len(scores) - 1:
+        return float(np.nextafter(sorted_scores[-1], -np.inf))
+    return float((sorted_scores[k] + sorted_scores[k + 1]) / 2)
+
+def tune_thresholds(scores, y_true, label_cols, score_type):
+    """
+    Per-label thresholds that maximize F1, a label is predicted when its score is above
+    its threshold. Labels without positives keep the default threshold.
+    """
+    y_true = np.asarray(y_true).astype(np.int64) == 1
+    default = DEFAULT_THRESHOLDS[score_type]
+    return {label: _best_f1_threshold(scores[:, i], y_true[:, i], default) for i, label in enumerate(label_cols)}
+
+def tune_and_log_thresholds(val_scores, y_val, test_scores, y_test, score_type, run, label_cols):
+    """
+    Tune thresholds on the validation split held out from the training data and report
+    F1 with them on the test set
+    """
+    thresholds = tune_thresholds(val_scores, y_val, label_cols, score_type)
+
+    y_tuned = (test_scores > np.array([thresholds[label] for label in label_cols])).astype(int)
+    tuned = evaluate(np.asarray(y_test), y_tuned, label_cols, n_bootstrap=0)
     metrics = {
-        "micro/f1":       f1_score(y_true, y_pred, average="micro", zero_division=0),
-        "macro/f1":       f1_score(y_true, y_pred, average="macro", zero_division=0),
-        "micro/precision": precision_score(y_true, y_pred, average="micro", zero_division=0),
-        "micro/recall":   recall_score(y_true, y_pred, average="micro", zero_division=0),
-        "macro/precision": precision_score(y_true, y_pred, average="macro", zero_division=0),
-        "macro/recall":   recall_score(y_true, y_pred, average="macro", zero_division=0),
-        "subset_accuracy": accuracy_score(y_true, y_pred), 
+        "tuned/micro/f1": tuned["micro/f1"],
+        "tuned/macro/f1": tuned["macro/f1"],
+        **{f"threshold/{label}": value for label, value in thresholds.items()},
     }
+    run.log(metrics)
+    return {"score_type": score_type, "thresholds": thresholds}, metrics
+
+def compute_and_log_metrics(y_true, y_pred, run, label_cols, n_bootstrap=1000, seed=0):
+    """
+    calculate and send metrics to wandb.ai dashboard
+    every metric comes from one pass of confusion counts, with bootstrap intervals as {key}/ci_low and {key}/ci_high
+    """
+    print('computing metrics')
+    metrics_to_log = evaluate(y_true, y_pred, label_cols, n_bootstrap=n_bootstrap, seed=seed)
 
-    per_label_f1 = f1_score(y_true, y_pred, average=None, zero_division=0)
-    metrics_to_log = {**metrics}
-    for lbl, f1v in zip(label_cols, per_label_f1):
-        metrics_to_log[f"f1/{lbl}"] = float(f1v)
-    
     run.log(metrics_to_log)
     run.summary.update(metrics_to_log)
 
     return metrics_to_log
 
-def build_model_artifact(model_name, pipeline, registry_name, label_cols, metrics, run):
+def export_compact_model(pipeline, out_dir, label_cols):
+    """
+    Export a fitted vectorizer + linear classifier pipeline as plain NumPy arrays that the
+    API can load with mmap_mode, so every uvicorn worker shares the same pages.
+    The vocabulary dict is replaced by sorted 64-bit term hashes and their column indices.
+    """
+    return save_compact_model(LinearScorer.from_pipeline(pipeline, label_cols), out_dir)
+
+def build_model_artifact(model_name, pipeline, registry_name, label_cols, metrics, run, threshold_config=None):
     """
     build model, dump locally and use local path to create W&B artifact and log
+    threshold_config ({"score_type", "thresholds"}) ships as thresholds.json and in the metadata
     """
     print(f'build artifact for {model_name}')
 
@@ -166,81 +395,262 @@ def build_model_artifact(model_name, pipeline, registry_name, label_cols, metric
         metadata={
             "model_key": model_name,
             "labels": label_cols,
-            "metrics": metrics
+            "metrics": metrics,
+            **(threshold_config or {}),
         }
     )
     art.add_file(model_path)
 
+    # per-label decision thresholds, applied by the API at serve time
+    if threshold_config:
+        thresholds_path = f"models/{model_name}_thresholds.json"
+        with open(thresholds_path, "w") as f:
+            json.dump(threshold_config, f, indent=2)
+        art.add_file(thresholds_path, name="thresholds.json")
+
+    # compact, memory-mappable copy of the same model for the API
+    try:
+        compact_dir = export_compact_model(pipeline, f"models/{model_name}_compact", label_cols)
+        art.add_dir(compact_dir, name="compact")
+    except ValueError as e:
+        print(f'skipping compact export for {model_name}: {e}')
+
     # mark this version as a "candidate" (and as "latest" for convenience)
     run.log_artifact(art, aliases=["candidate", "latest", model_name])
 
-def main():
-    """
-    Main training pipeline - trains one model at a time
-    """
-    # Define models to train
-    models = {
-        "log_reg": {
-            "pipeline": build_lr_pipeline,
-            "registry_name": "log_reg_model"
-        },
-        "linear_svm": {
-            "pipeline": build_svm_pipeline,
-            "registry_name": "linear_svm_model"
-        },
-        "multi_nb": {
-            "pipeline": build_nb_pipeline,
-            "registry_name": "multi_nb_model"
-        }
+# Define models to train
+MODELS = {
+    "log_reg": {
+        "pipeline": build_lr_pipeline,
+        "registry_name": "log_reg_model"
+    },
+    "linear_svm": {
+        "pipeline": build_svm_pipeline,
+        "registry_name": "linear_svm_model"
+    },
+    "multi_nb": {
+        "pipeline": build_nb_pipeline,
+        "registry_name": "multi_nb_model"
     }
+}
+
+# Models trained out-of-core with --stream
+STREAMING_MODELS = {
+    "sgd_stream": {
+        "pipeline": build_sgd_stream_pipeline,
+        "registry_name": "sgd_stream_model"
+    },
+    "nb_stream": {
+        "pipeline": build_nb_stream_pipeline,
+        "registry_name": "nb_stream_model"
+    }
+}
+
+def plan_workers(n_models, max_workers=None, cpu_budget=None):
+    """
+    Split the cpu budget between concurrent model processes and the n_jobs each one
+    hands to OneVsRest/MultiOutput, so the two levels together never oversubscribe the cores
+    """
+    cpu_budget = cpu_budget or os.cpu_count() or 1
+    max_workers = max(1, min(max_workers or n_models, n_models, cpu_budget))
+    n_jobs = max(1, cpu_budget // max_workers)
+    return max_workers, n_jobs
+
+def set_n_jobs(pipeline, n_jobs):
+    """
+    Set every n_jobs parameter in the pipeline (OneVsRest, MultiOutput) to n_jobs
+    """
+    params = {name: n_jobs for name in pipeline.get_params() if name.endswith("n_jobs")}
+    pipeline.set_params(**params)
+    return pipeline
+
+def train_and_log_model(model_name, model_data, X_train, X_test, y_train, y_test, label_cols, n_jobs=-1, feature_store=None,
+                        params=None):
+    """
+    Train, evaluate and publish one model in its own W&B run. Runs in a worker process
+    when models are trained concurrently, so everything it needs is passed in.
+    params are builder arguments (e.g. the best hyperparameter search config), recorded in the run config.
+    The model is fit without the validation split, which tunes its serving thresholds.
+    """
+    print(f'start of experiment for {model_name}')
+    # setup variables from model data
+    pipeline = set_n_jobs(model_data["pipeline"](**(params or {})), n_jobs)
+    registry_name = model_data["registry_name"]
+
+    # Initialize W&B for this specific model
+    group_id = str(uuid.uuid4())
+    run = init_wandb(project_name="toxic_comment_prediction", experiment_name=f"{model_name}-experiment", config_name=model_name, config_registry=registry_name, group=group_id)
+    if params:
+        run.config.update({"params": params})
+
+    X_fit, X_val, y_fit, y_val = split_validation(X_train, y_train)
+
+    # log data metrics
+    run.log({
+        "train_size": len(X_fit),
+        "validation_size": len(X_val),
+        "toxic_pct": y_train['toxic'].mean(),
+        "severe_toxic_pct": y_train['severe_toxic'].mean(),
+        "obscene_pct": y_train['obscene'].mean(),
+        "threat_pct": y_train['threat'].mean(),
+        "insult_pct": y_train['insult'].mean(),
+        "identity_hate_pct": y_train['identity_hate'].mean(),
+    })
+
+    # Train model
+    y_pred, scores, score_type = train_model(pipeline, X_fit, y_fit, X_test, model_name,
+                                             feature_store=feature_store, return_scores=True)
+
+    # compute and log metrics
+    metrics = compute_and_log_metrics(y_test, y_pred, run, label_cols)
+
+    # tune per-label thresholds for serving
+    # a dataset smaller than 1 / VALIDATION_FRACTION rows has no validation rows and keeps the defaults
+    val_scores = (classifier_scores(pipeline.steps[-1][1], pipeline[:-1].transform(X_val))[0] if len(X_val)
+                  else np.zeros((0, len(label_cols))))
+    threshold_config, threshold_metrics = tune_and_log_thresholds(val_scores, y_val, scores, y_test, score_type, run,
+                                                                  label_cols)
+    metrics = {**metrics, **threshold_metrics}
+
+    # create model and artifact
+    build_model_artifact(model_name, pipeline, registry_name, label_cols, metrics, run, threshold_config)
+
+    # Finish the W&B run
+    run.finish()
+    print(f"Experiment for {model_name} completed!\n")
+    return {"key": model_name, "registry_name": registry_name, **metrics}
+
+def train_and_log_streaming_model(model_name, model_data, train_paths, test_path, test_labels_path, label_cols,
+                                  chunksize=50000, epochs=1):
+    """
+    Train, evaluate and publish one streaming model in its own W&B run, reading the
+    training and test files in chunks so memory stays bounded by chunksize.
+    The validation rows of the training files are skipped in training and tune the thresholds.
+    """
+    print(f'start of streaming experiment for {model_name}')
+    pipeline = model_data["pipeline"]()
+    registry_name = model_data["registry_name"]
+
+    run = init_wandb(project_name="toxic_comment_prediction", experiment_name=f"{model_name}-experiment",
+                     config_name=model_name, config_registry=registry_name, group=str(uuid.uuid4()))
+
+    train_columns = ["comment_text", *label_cols]
+    n_rows = 0
+    for epoch in range(epochs):
+        print(f'epoch {epoch + 1} of {epochs}')
+        pipeline, n_rows = train_streaming_model(
+            pipeline, split_chunks(iter_chunks(train_paths, chunksize, train_columns)), label_cols)
+    run.log({"train_size": n_rows, "chunksize": chunksize, "epochs": epochs})
+
+    # tee walks the validation rows once for both their texts and labels
+    val_texts, val_labels = itertools.tee(split_chunks(iter_chunks(train_paths, chunksize, train_columns), validation=True))
+    y_val, _, val_scores, _ = predict_streaming(pipeline, val_texts, val_labels, label_cols)
+
+    y_test, y_pred, scores, score_type = predict_streaming(
+        pipeline,
+        iter_chunks(test_path, chunksize, ["comment_text"]),
+        iter_chunks(test_labels_path, chunksize, label_cols),
+        label_cols)
+
+    # compute and log metrics
+    metrics = compute_and_log_metrics(y_test, y_pred, run, label_cols)
+
+    # tune per-label thresholds for serving
+    threshold_config, threshold_metrics = tune_and_log_thresholds(val_scores, y_val, scores, y_test, score_type, run,
+                                                                  label_cols)
+    metrics = {**metrics, **threshold_metrics}
+
+    # the hashing vectorizer has no vocabulary, so only the joblib model is published
+    build_model_artifact(model_name, pipeline, registry_name, label_cols, metrics, run, threshold_config)
+
+    run.finish()
+    print(f"Streaming experiment for {model_name} completed!\n")
+    return {"key": model_name, "registry_name": registry_name, **metrics}
+
+def run_experiments(models, X_train, X_test, y_train, y_test, label_cols, max_workers=None, cpu_budget=None, feature_store=None):
+    """
+    Train every model config, concurrently across a process pool when the budget allows,
+    and return the results sorted by macro F1
+    """
+    max_workers, n_jobs = plan_workers(len(models), max_workers, cpu_budget)
+    print(f'training {len(models)} models with {max_workers} worker(s) x {n_jobs} job(s)')
+
+    if feature_store is not None:
+        # fit each distinct vectorizer once up front; workers then load the cached matrices
+        X_fit = split_validation(X_train, y_train)[0]
+        feature_store.warm([model_data["pipeline"]().steps[0][1] for model_data in models.values()], X_fit, X_test)
+
+    data = (X_train, X_test, y_train, y_test, label_cols)
+    if max_workers == 1:
+        results = [train_and_log_model(name, model_data, *data, n_jobs=n_jobs, feature_store=feature_store)
+                   for name, model_data in models.items()]
+    else:
+        # spawn so each worker starts with a clean W&B and BLAS state
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(train_and_log_model, name, model_data, *data, n_jobs=n_jobs, feature_store=feature_store)
+                       for name, model_data in models.items()]
+            results = [future.result() for future in futures]
+
+    return pd.DataFrame(results).sort_values("macro/f1", ascending=False)
+
+def main_streaming(train_paths=None, test_path=None, test_labels_path=None, data_cache_dir="data_cache",
+                   chunksize=50000, epochs=1):
+    """
+    Streaming training pipeline - trains the STREAMING_MODELS one after another from files
+    read in chunks, defaulting to the Parquet copies in the data cache
+    """
+    label_cols = ['toxic','severe_toxic','obscene','threat','insult','identity_hate']
+    train_paths = train_paths or [os.path.join(data_cache_dir, "train.parquet")]
+    test_path = test_path or os.path.join(data_cache_dir, "test.parquet")
+    test_labels_path = test_labels_path or os.path.join(data_cache_dir, "test_labels.parquet")
+
+    results = [train_and_log_streaming_model(name, model_data, train_paths, test_path, test_labels_path, label_cols,
+                                             chunksize=chunksize, epochs=epochs)
+               for name, model_data in STREAMING_MODELS.items()]
+    results_df = pd.DataFrame(results).sort_values("macro/f1", ascending=False)
+
+    print("All streaming experiments completed! Check your W&B dashboard for results.")
+    print(results_df[["key","micro/f1","macro/f1"]])
 
+def main(max_workers=None, cpu_budget=None, feature_cache_dir="feature_cache", data_cache_dir="data_cache",
+         offline=False, fixture_dir=None):
+    """
+    Main training pipeline - trains the model configs concurrently, one W&B run each
+    """
     # load data
-    X_test, X_train, y_test, y_train, label_cols = load_and_prepare_data()
+    X_train, X_test, y_train, y_test, label_cols = load_and_prepare_data(
+        cache_dir=data_cache_dir, offline=offline, fixture_dir=fixture_dir)
+    feature_store = FeatureStore(feature_cache_dir) if feature_cache_dir else None
 
-    # init results for viewing model performance together:
-    results = []
-    
     # Train each model in a separate W&B run
-    for model_name, model_data in models.items():
-        print(f'start of loop for {model_name}')
-        # setup variables from model data
-        pipeline = model_data["pipeline"]() 
-        registry_name = model_data["registry_name"]
-
-        # Initialize W&B for this specific model
-        group_id = str(uuid.uuid4())
-        run = init_wandb(project_name="toxic_comment_prediction", experiment_name=f"{model_name}-experiment", config_name=model_name, config_registry=registry_name, group=group_id)
-
-        # log data metrics
-        wandb.log({
-            "train_size": len(X_train),
-            "toxic_pct": y_train['toxic'].mean(),
-            "severe_toxic_pct": y_train['severe_toxic'].mean(),
-            "obscene_pct": y_train['obscene'].mean(),
-            "threat_pct": y_train['threat'].mean(),
-            "insult_pct": y_train['insult'].mean(),
-            "identity_hate_pct": y_train['identity_hate'].mean(),
-        })
-        
-        # Train model
-        y_pred = train_model(pipeline, X_train, y_train, X_test, model_name)
-
-        # compute and log metrics
-        metrics = compute_and_log_metrics(y_test, y_pred, run, label_cols)
-
-        # create model and artifact
-        build_model_artifact(model_name, pipeline, registry_name, label_cols, metrics, run)
-        
-        # add to results to compare
-        results.append({"key": model_name, "registry_name": registry_name, **metrics})
-        # Finish the W&B run
-        run.finish()
-        print(f"Experiment for {model_name} completed!\n")
+    results_df = run_experiments(MODELS, X_train, X_test, y_train, y_test, label_cols,
+                                 max_workers=max_workers, cpu_budget=cpu_budget, feature_store=feature_store)
 
     print("All experiments completed! Check your W&B dashboard for results.")
-    results_df = pd.DataFrame(results).sort_values("macro/f1", ascending=False)
     print(results_df[["key","micro/f1","macro/f1"]])
 
 if __name__ == '__main__':
-    main()
-
+    parser = argparse.ArgumentParser(description="Train and publish the toxic comment models")
+    parser.add_argument("--workers", type=int, default=None, help="models trained at once (default: one per model)")
+    parser.add_argument("--cpu-budget", type=int, default=None, help="total cores to use (default: all)")
+    parser.add_argument("--feature-cache", default="feature_cache", help="directory for cached feature matrices")
+    parser.add_argument("--no-feature-cache", action="store_true", help="refit the vectorizer for every model")
+    parser.add_argument("--data-cache", default="data_cache", help="directory for the Parquet copy of the dataset")
+    parser.add_argument("--offline", action="store_true", help="never download, read only from the data cache")
+    parser.add_argument("--data-fixtures", default=None, help="directory of train/test/test_labels CSVs to use instead of S3")
+    parser.add_argument("--stream", action="store_true", help="train the hashing + partial_fit models out-of-core")
+    parser.add_argument("--stream-train", nargs="+", default=None,
+                        help="CSV/Parquet training files for --stream (default: the data cache train.parquet)")
+    parser.add_argument("--stream-test", default=None, help="CSV/Parquet test comments for --stream")
+    parser.add_argument("--stream-test-labels", default=None, help="CSV/Parquet test labels for --stream")
+    parser.add_argument("--chunksize", type=int, default=50000, help="rows per chunk for --stream")
+    parser.add_argument("--epochs", type=int, default=1, help="passes over the training files for --stream")
+    args = parser.parse_args()
+    if args.stream:
+        main_streaming(train_paths=args.stream_train, test_path=args.stream_test,
+                       test_labels_path=args.stream_test_labels, data_cache_dir=args.data_cache,
+                       chunksize=args.chunksize, epochs=args.epochs)
+    else:
+        main(max_workers=args.workers, cpu_budget=args.cpu_budget,
+             feature_cache_dir=None if args.no_feature_cache else args.feature_cache,
+             data_cache_dir=args.data_cache, offline=args.offline, fixture_dir=args.data_fixtures)
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+import benchmarks
+from benchmarks import (LocalRun, benchmark_pipeline, cost_batch_size_for, rank_for_promotion, run_benchmarks,
+                        synthetic_corpus)
+from model_training import build_nb_pipeline
+
+
+def test_synthetic_corpus_is_reproducible(label_cols):
+    X, y = synthetic_corpus(50, seed=3)
+    X2, y2 = synthetic_corpus(50, seed=3)
+    assert list(X) == list(X2)
+    assert list(y.columns) == label_cols
+    assert y.equals(y2)
+
+def test_benchmark_pipeline_logs_cost_next_to_quality(dummy_text_train, dummy_labels_train, label_cols):
+    run = LocalRun("nb")
+    result = benchmark_pipeline("multi_nb", build_nb_pipeline, dummy_text_train, dummy_labels_train,
+                                dummy_text_train, dummy_labels_train, run, label_cols, batch_sizes=(1, 4))
+
+    assert result["bench/fit_seconds"] > 0
+    assert result["bench/predict_cps/batch_1"] > 0
+    assert result["bench/predict_us/batch_4"] > 0
+    assert result["bench/model_bytes"] > 0
+    assert result["bench/load_seconds"] > 0
+    assert "macro/f1" in run.summary and "bench/model_bytes" in run.summary
+
+def test_rank_for_promotion_prefers_cheaper_model_within_tolerance():
+    results = [
+        {"key": "slow", "macro/f1": 0.80, "bench/predict_us/batch_32": 90.0, "bench/model_bytes": 100},
+        {"key": "fast", "macro/f1": 0.795, "bench/predict_us/batch_32": 10.0, "bench/model_bytes": 300},
+        {"key": "bad", "macro/f1": 0.60, "bench/predict_us/batch_32": 1.0, "bench/model_bytes": 10},
+        {"key": "ok", "macro/f1": 0.70, "bench/predict_us/batch_32": 50.0, "bench/model_bytes": 10},
+    ]
+    assert list(rank_for_promotion(results, f1_tolerance=0.01)["key"]) == ["fast", "slow", "ok", "bad"]
+    assert list(rank_for_promotion(results, f1_tolerance=0.0)["key"]) == ["slow", "fast", "ok", "bad"]
+
+def test_cost_batch_size_follows_the_benchmarked_sizes():
+    assert cost_batch_size_for((1, 32, 1024)) == 32
+    assert cost_batch_size_for((1, 16, 64)) == 16
+    assert cost_batch_size_for((1, 4)) == 4
+    with pytest.raises(ValueError):
+        rank_for_promotion([{"key": "a", "macro/f1": 0.5, "bench/predict_us/batch_4": 1.0, "bench/model_bytes": 1}])
+
+def test_run_benchmarks_ranks_without_the_default_cost_batch_size():
+    models = {"multi_nb": {"pipeline": build_nb_pipeline, "registry_name": "multi_nb_model"}}
+    rankings, runs = run_benchmarks(models, scales=[60], test_size=20, offline=True, batch_sizes=(1, 4))
+    assert rankings[60].iloc[0]["key"] == "multi_nb"
+
+def test_run_benchmarks_offline_writes_json(tmp_path):
+    models = {"multi_nb": {"pipeline": build_nb_pipeline, "registry_name": "multi_nb_model"}}
+    rankings, runs = run_benchmarks(models, scales=[60], test_size=20, offline=True, batch_sizes=(1, 32))
+
+    assert list(rankings) == [60]
+    assert runs[0].summary["promotion/recommended"] == "multi_nb"
+    assert runs[0].summary["promotion/rank"] == 1
+
+    path = benchmarks.write_results(str(tmp_path / "bench.json"), rankings, runs)
+    with open(path) as f:
+        out = json.load(f)
+    assert out["rankings"]["60"][0]["key"] == "multi_nb"
+    assert out["runs"][0]["config"]["train_size"] == 60
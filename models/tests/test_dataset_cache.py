@@ -0,0 +1,72 @@
+import pytest
+
+from dataset_cache import DatasetCache
+from model_training import load_and_prepare_data
+
+LABELS = ['toxic','severe_toxic','obscene','threat','insult','identity_hate']
+
+@pytest.fixture
+def fixture_dir(tmp_path):
+    fixtures = tmp_path / "fixtures"
+    fixtures.mkdir()
+    header = "id," + ",".join(LABELS)
+    (fixtures / "train.csv").write_text(
+        "id,comment_text," + ",".join(LABELS) + "\n"
+        "a1,you rock,0,0,0,0,0,0\n"
+        "a2,\"you stink, really\",1,0,1,0,1,0\n"
+        "a3,meh,0,0,0,0,0,0\n"
+    )
+    (fixtures / "test.csv").write_text("id,comment_text\nb1,ok...\nb2,the best\n")
+    (fixtures / "test_labels.csv").write_text(header + "\nb1,-1,-1,-1,-1,-1,-1\nb2,1,0,1,0,0,0\n")
+    return fixtures
+
+def test_first_load_builds_parquet_cache(tmp_path, fixture_dir):
+    cache = DatasetCache(str(tmp_path / "cache"), fixture_dir=str(fixture_dir))
+    train_df = cache.load("train")
+
+    assert (tmp_path / "cache" / "train.parquet").exists()
+    assert str(train_df["toxic"].dtype) == "uint8"
+    assert cache.manifest()["train"]["rows"] == 3
+    assert len(cache.manifest()["train"]["source_sha256"]) == 64
+
+    # later loads come from the cache, even offline with the fixtures gone
+    for csv in fixture_dir.iterdir():
+        csv.unlink()
+    offline = DatasetCache(str(tmp_path / "cache"), offline=True, fixture_dir=str(fixture_dir))
+    assert list(offline.load("train")["comment_text"]) == ["you rock", "you stink, really", "meh"]
+
+def test_offline_without_cache_fails(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        DatasetCache(str(tmp_path / "cache"), offline=True).load("train")
+
+def test_cache_from_another_source_is_not_reused(tmp_path, fixture_dir):
+    DatasetCache(str(tmp_path / "cache"), fixture_dir=str(fixture_dir)).load("train")
+
+    # a normal run must not train on the fixtures
+    with pytest.raises(FileNotFoundError):
+        DatasetCache(str(tmp_path / "cache"), offline=True).load("train")
+
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "train.csv").write_text("id,comment_text," + ",".join(LABELS) + "\nc1,hello,0,0,0,0,0,0\n")
+    cache = DatasetCache(str(tmp_path / "cache"), fixture_dir=str(other))
+    assert list(cache.load("train")["id"]) == ["c1"]
+    assert cache.manifest()["train"]["source"] == str(other / "train.csv")
+
+def test_corrupted_cache_is_refetched(tmp_path, fixture_dir):
+    cache = DatasetCache(str(tmp_path / "cache"), fixture_dir=str(fixture_dir))
+    cache.load("test")
+    (tmp_path / "cache" / "test.parquet").write_bytes(b"not parquet")
+    assert list(cache.load("test")["id"]) == ["b1", "b2"]
+
+def test_load_and_prepare_data_from_fixtures(tmp_path, fixture_dir):
+    X_train, X_test, y_train, y_test, label_cols = load_and_prepare_data(
+        cache_dir=str(tmp_path / "cache"), fixture_dir=str(fixture_dir))
+
+    assert label_cols == LABELS
+    assert len(X_train) == len(y_train) == 3
+    # b1 was never scored
+    assert list(X_test) == ["the best"]
+    assert len(y_test) == 1
+    assert y_test.iloc[0]["toxic"] == 1
+    assert all(str(dtype) == "uint8" for dtype in y_test.dtypes)
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+
+from evaluation import bootstrap_counts, evaluate, label_patterns
+
+LABELS = ['toxic','severe_toxic','obscene','threat','insult','identity_hate']
+
+def random_labels(n, seed=0):
+    rng = np.random.default_rng(seed)
+    y_true = (rng.random((n, len(LABELS))) < [0.3, 0.05, 0.2, 0.01, 0.2, 0.0]).astype(int)
+    flips = rng.random(y_true.shape) < 0.1
+    y_pred = np.where(flips, 1 - y_true, y_true)
+    y_pred[:, 5] = 0  # a label that is never true nor predicted
+    return pd.DataFrame(y_true, columns=LABELS), y_pred
+
+def test_evaluate_matches_sklearn():
+    y_true, y_pred = random_labels(500)
+    out = evaluate(y_true, y_pred, LABELS, n_bootstrap=0)
+
+    for average in ("micro", "macro"):
+        assert np.isclose(out[f"{average}/f1"], f1_score(y_true, y_pred, average=average, zero_division=0))
+        assert np.isclose(out[f"{average}/precision"], precision_score(y_true, y_pred, average=average, zero_division=0))
+        assert np.isclose(out[f"{average}/recall"], recall_score(y_true, y_pred, average=average, zero_division=0))
+    assert np.isclose(out["subset_accuracy"], accuracy_score(y_true, y_pred))
+    for lbl, val in zip(LABELS, f1_score(y_true, y_pred, average=None, zero_division=0)):
+        assert np.isclose(out[f"f1/{lbl}"], val)
+    assert not any(key.endswith("/ci_low") for key in out)
+
+def test_bootstrap_intervals_bracket_the_estimate():
+    y_true, y_pred = random_labels(2000, seed=1)
+    out = evaluate(y_true, y_pred, LABELS, n_bootstrap=500, seed=3)
+
+    for key in ["micro/f1", "macro/f1", "subset_accuracy", "f1/toxic"]:
+        assert out[f"{key}/ci_low"] <= out[key] <= out[f"{key}/ci_high"]
+        assert out[f"{key}/ci_high"] - out[f"{key}/ci_low"] < 0.1
+    assert out["f1/identity_hate/ci_low"] == out["f1/identity_hate/ci_high"] == 0.0
+    assert out == evaluate(y_true, y_pred, LABELS, n_bootstrap=500, seed=3)
+
+def test_bootstrap_resamples_every_row():
+    y_true, y_pred = random_labels(300, seed=2)
+    patterns, freq = label_patterns(y_true, y_pred)
+    assert freq.sum() == 300
+    counts, exact = bootstrap_counts(patterns, freq, len(LABELS), n_bootstrap=50)
+    assert counts.shape == (50, len(LABELS), 4)
+    assert (counts.sum(axis=2) == 300).all()
+    assert ((exact >= 0) & (exact <= 300)).all()
+
+def test_evaluate_empty():
+    out = evaluate(np.zeros((0, 6)), np.zeros((0, 6)), LABELS)
+    assert out["macro/f1"] == 0.0 and out["subset_accuracy"] == 0.0
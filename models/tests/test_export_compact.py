@@ -0,0 +1,66 @@
+import json
+import os
+import numpy as np
+import pytest
+
+from model_training import export_compact_model
+from compact_model import COMPACT_META_FILE, term_hash
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+
+def reload_scores(out_dir, pipeline, texts):
+    # rebuild decision scores from the exported arrays
+    vectorizer = pipeline.steps[0][1]
+    X = vectorizer.transform(texts)
+    weights = np.load(out_dir / "weights.npy", mmap_mode="r")
+    intercept = np.load(out_dir / "intercept.npy")
+    return X @ weights + intercept
+
+def test_export_lr_matches_decision_function(tmp_path, fitted_lr_pipeline, dummy_text_test, label_cols):
+    out_dir = tmp_path / "lr_compact"
+    export_compact_model(fitted_lr_pipeline, str(out_dir), label_cols)
+
+    meta = json.loads((out_dir / COMPACT_META_FILE).read_text())
+    assert meta["labels"] == label_cols
+    assert meta["score_type"] == "log_odds"
+    assert meta["use_idf"] and meta["sublinear_tf"]
+    assert meta["ngram_range"] == [1, 2]
+
+    expected = fitted_lr_pipeline.decision_function(dummy_text_test)
+    assert np.allclose(reload_scores(out_dir, fitted_lr_pipeline, dummy_text_test), expected, atol=1e-5)
+
+def test_export_vocab_lookup(tmp_path, fitted_svm_pipeline, label_cols):
+    out_dir = tmp_path / "svm_compact"
+    export_compact_model(fitted_svm_pipeline, str(out_dir), label_cols)
+
+    hashes = np.load(out_dir / "vocab_hashes.npy")
+    columns = np.load(out_dir / "vocab_columns.npy")
+    assert np.all(hashes[1:] > hashes[:-1])
+    for term, column in fitted_svm_pipeline.steps[0][1].vocabulary_.items():
+        idx = np.searchsorted(hashes, np.uint64(term_hash(term)))
+        assert columns[idx] == column
+
+def test_export_nb_matches_predict(tmp_path, fitted_nb_pipeline, dummy_text_test, label_cols):
+    out_dir = tmp_path / "nb_compact"
+    export_compact_model(fitted_nb_pipeline, str(out_dir), label_cols)
+
+    meta = json.loads((out_dir / COMPACT_META_FILE).read_text())
+    assert meta["stop_words"] and not meta["use_idf"]
+    assert not (out_dir / "idf.npy").exists()
+
+    scores = reload_scores(out_dir, fitted_nb_pipeline, dummy_text_test)
+    assert np.array_equal((scores > 0).astype(int), fitted_nb_pipeline.predict(dummy_text_test))
+
+def test_export_rejects_non_word_analyzer(tmp_path, fitted_lr_pipeline, label_cols):
+    fitted_lr_pipeline.steps[0][1].analyzer = "char"
+    with pytest.raises(ValueError):
+        export_compact_model(fitted_lr_pipeline, str(tmp_path / "bad"), label_cols)
+
+@pytest.mark.parametrize("name", ["compact_model.py", "linear_scorer.py"])
+def test_copied_modules_match_the_api(name):
+    api_path = os.path.join(MODELS_DIR, os.pardir, "api", name)
+    if not os.path.exists(api_path):
+        pytest.skip("api/ is not checked out next to models/")
+    with open(api_path) as api_file, open(os.path.join(MODELS_DIR, name)) as models_file:
+        assert models_file.read() == api_file.read(), f"models/{name} differs from api/{name}"
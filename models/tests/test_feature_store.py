@@ -0,0 +1,40 @@
+import numpy as np
+
+from feature_store import FeatureStore
+from model_training import build_lr_pipeline, build_svm_pipeline, train_model
+
+
+def test_shared_vectorizer_config_is_fitted_once(tmp_path, dummy_text_train, dummy_text_test):
+    store = FeatureStore(str(tmp_path))
+    lr_vectorizer = build_lr_pipeline().steps[0][1]
+    svm_vectorizer = build_svm_pipeline().steps[0][1]
+    lr_vectorizer.min_df = svm_vectorizer.min_df = 1
+
+    assert store.key(lr_vectorizer, dummy_text_train, dummy_text_test) == store.key(svm_vectorizer, dummy_text_train, dummy_text_test)
+    store.warm([lr_vectorizer, svm_vectorizer], dummy_text_train, dummy_text_test)
+    assert (store.misses, store.hits) == (1, 0)
+
+    X_train, X_test, fitted = store.get_or_fit(svm_vectorizer, dummy_text_train, dummy_text_test)
+    assert (store.misses, store.hits) == (1, 1)
+    assert X_train.shape == (len(dummy_text_train), len(fitted.vocabulary_))
+    assert X_test.shape[0] == len(dummy_text_test)
+
+def test_key_changes_with_data_and_params(tmp_path, dummy_text_train, dummy_text_test):
+    store = FeatureStore(str(tmp_path))
+    vectorizer = build_lr_pipeline().steps[0][1]
+    base = store.key(vectorizer, dummy_text_train, dummy_text_test)
+    assert store.key(vectorizer, dummy_text_train[:-1], dummy_text_test) != base
+    vectorizer.min_df = 1
+    assert store.key(vectorizer, dummy_text_train, dummy_text_test) != base
+
+def test_train_model_with_feature_store_matches_pipeline(tmp_path, dummy_text_train, dummy_labels_train, dummy_text_test):
+    store = FeatureStore(str(tmp_path))
+    cached = build_svm_pipeline().set_params(tfidf__min_df=1)
+    plain = build_svm_pipeline().set_params(tfidf__min_df=1)
+
+    y_cached = train_model(cached, dummy_text_train, dummy_labels_train, dummy_text_test, "SVM", feature_store=store)
+    y_plain = train_model(plain, dummy_text_train, dummy_labels_train, dummy_text_test, "SVM")
+
+    assert np.array_equal(y_cached, y_plain)
+    # the returned pipeline is fully fitted and serves raw text
+    assert np.array_equal(cached.predict(dummy_text_test), y_plain)
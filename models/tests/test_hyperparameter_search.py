@@ -0,0 +1,65 @@
+import hyperparameter_search
+import model_training
+from benchmarks import synthetic_corpus
+from feature_store import FeatureStore
+from hyperparameter_search import n_rounds_for, search_and_publish, successive_halving
+from model_training import build_lr_pipeline
+
+
+class FakeRun:
+    def __init__(self):
+        self.logged = []
+        self.summary = {}
+        self.config = {}
+    def log(self, d):
+        self.logged.append(d)
+    def finish(self):
+        pass
+
+def test_n_rounds_for():
+    assert n_rounds_for(1, 3) == 1
+    assert n_rounds_for(2, 3) == 1
+    assert n_rounds_for(3, 3) == 1
+    # 18 -> 6 -> 2, the last round picks the winner without cross-validating it again
+    assert n_rounds_for(18, 3) == 3
+    assert n_rounds_for(4, 2) == 2
+    assert n_rounds_for(125, 5) == 3
+
+def test_successive_halving_shrinks_candidates_and_reuses_features(monkeypatch, tmp_path, label_cols):
+    runs = []
+    monkeypatch.setattr(hyperparameter_search, "init_wandb", lambda **kwargs: runs.append(FakeRun()) or runs[-1])
+    X, y = synthetic_corpus(180, seed=5)
+    store = FeatureStore(str(tmp_path))
+    space = {"C": [0.01, 0.1, 1.0, 10.0], "min_df": [1]}
+
+    params, history = successive_halving("log_reg", build_lr_pipeline, space, X, y, label_cols, cv=2, factor=2,
+                                         min_resources=90, feature_store=store, max_workers=1)
+
+    assert list(history.groupby("round").size()) == [4, 2]
+    assert list(history.groupby("round")["n_resources"].first()) == [90, 180]
+    assert params in [{"C": c, "min_df": 1} for c in space["C"]]
+    # one shared vectorizer config: fitted once per fold per round, read by every trial
+    assert store.misses == 2 * 2
+    assert store.hits == (4 + 2) * 2
+    assert len(runs) == 6
+    assert runs[0].config["params"] == {"C": 0.01, "min_df": 1}
+    assert "cv/macro_f1_mean" in runs[0].logged[0]
+
+def test_search_and_publish_trains_best_config(monkeypatch, label_cols):
+    monkeypatch.setattr(hyperparameter_search, "init_wandb", lambda **kwargs: FakeRun())
+    monkeypatch.setattr(model_training, "init_wandb", lambda **kwargs: FakeRun())
+    monkeypatch.setattr(hyperparameter_search, "SEARCH_SPACES", {"log_reg": {"C": [0.5, 2.0], "min_df": [1]}})
+    published = []
+    monkeypatch.setattr(model_training, "build_model_artifact",
+                        lambda model_name, pipeline, *args: published.append((model_name, pipeline)))
+
+    X, y = synthetic_corpus(120, seed=9)
+    best = search_and_publish(["log_reg"], X[:90], X[90:], y[:90], y[90:].reset_index(drop=True), label_cols,
+                              cv=2, factor=2, max_workers=1, cpu_budget=1)
+
+    params = best["log_reg"]["params"]
+    assert best["log_reg"]["trials"] == 2
+    assert "macro/f1" in best["log_reg"]
+    (model_name, pipeline), = published
+    assert model_name == "log_reg"
+    assert pipeline.get_params()["clf__estimator__C"] == params["C"]
@@ -22,14 +22,14 @@ def fake_dataframes():
         "comment_text": ["ok...", "the best", "awful take"],
     })
 
-    # Include -1 values to verify replacement to 1
+    # the first comment was never scored and is dropped
     test_labels_df = pd.DataFrame({
         "toxic": [-1, 0, 1],
-        "severe_toxic": [0, -1, 0],
-        "obscene": [1, 0, -1],
-        "threat": [0, 0, 0],
-        "insult": [-1, -1, 0],
-        "identity_hate": [0, 0, -1],
+        "severe_toxic": [-1, 0, 0],
+        "obscene": [-1, 0, 1],
+        "threat": [-1, 0, 0],
+        "insult": [-1, 0, 0],
+        "identity_hate": [-1, 0, 0],
     })
 
     return train_df, test_df, test_labels_df
@@ -57,8 +57,9 @@ def test_load_and_prepare_data_happy_path(patch_read_csv):
     # Labels come back as expected and in the right order
     assert label_cols == LABELS
     assert len(X_train) == len(y_train) == 3
-    assert len(X_test) == len(y_test) == 3
+    assert len(X_test) == len(y_test) == 2
     assert list(y_train.columns) == LABELS
     assert list(y_test.columns) == LABELS
     assert not (y_test.values == -1).any()
-    assert y_test.iloc[0]["toxic"] == 1
\ No newline at end of file
+    assert list(X_test) == ["the best", "awful take"]
+    assert y_test.iloc[1]["toxic"] == 1
\ No newline at end of file
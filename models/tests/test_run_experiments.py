@@ -0,0 +1,36 @@
+import model_training
+from model_training import build_lr_pipeline, plan_workers, run_experiments, set_n_jobs
+
+
+class FakeRun:
+    def __init__(self):
+        self.logged = []
+        self.summary = {}
+    def log(self, d):
+        self.logged.append(d)
+    def finish(self):
+        pass
+
+def test_plan_workers_splits_cpu_budget():
+    assert plan_workers(3, cpu_budget=12) == (3, 4)
+    assert plan_workers(3, max_workers=1, cpu_budget=12) == (1, 12)
+    assert plan_workers(3, cpu_budget=2) == (2, 1)
+    assert plan_workers(3, max_workers=8, cpu_budget=4) == (3, 1)
+
+def test_set_n_jobs():
+    pipeline = set_n_jobs(build_lr_pipeline(), 3)
+    assert pipeline.get_params()["clf__n_jobs"] == 3
+
+def test_run_experiments_in_process(monkeypatch, dummy_text_train, dummy_labels_train, dummy_text_test, label_cols):
+    monkeypatch.setattr(model_training, "init_wandb", lambda **kwargs: FakeRun())
+    published = []
+    monkeypatch.setattr(model_training, "build_model_artifact",
+                        lambda model_name, pipeline, *args: published.append((model_name, pipeline)))
+
+    y_test = dummy_labels_train.iloc[:3].reset_index(drop=True)
+    results_df = run_experiments(model_training.MODELS, dummy_text_train, dummy_text_test, dummy_labels_train, y_test,
+                                 label_cols, max_workers=1, cpu_budget=2)
+
+    assert sorted(results_df["key"]) == sorted(model_training.MODELS)
+    assert list(results_df["macro/f1"]) == sorted(results_df["macro/f1"], reverse=True)
+    assert all(pipeline.get_params().get("clf__n_jobs") == 2 for _, pipeline in published)
@@ -0,0 +1,84 @@
+import joblib
+import numpy as np
+import pandas as pd
+
+import model_training
+from model_training import (
+    STREAMING_MODELS,
+    build_nb_stream_pipeline,
+    build_sgd_stream_pipeline,
+    iter_chunks,
+    predict_streaming,
+    train_streaming_model,
+)
+
+
+class FakeRun:
+    def __init__(self):
+        self.logged = []
+        self.summary = {}
+    def log(self, d):
+        self.logged.append(d)
+    def finish(self):
+        pass
+
+def write_dataset(tmp_path, texts, labels, label_cols):
+    train = pd.DataFrame({"id": range(len(texts)), "comment_text": texts, **labels})
+    train.to_csv(tmp_path / "train.csv", index=False)
+    train.to_parquet(tmp_path / "train.parquet", index=False)
+    test_labels = labels.copy()
+    test_labels.loc[0, label_cols[0]] = -1
+    train[["id", "comment_text"]].to_parquet(tmp_path / "test.parquet", index=False)
+    test_labels.to_csv(tmp_path / "test_labels.csv", index=False)
+
+def test_iter_chunks_reads_csv_and_parquet(tmp_path, dummy_text_train, dummy_labels_train, label_cols):
+    write_dataset(tmp_path, dummy_text_train, dummy_labels_train, label_cols)
+    paths = [str(tmp_path / "train.csv"), str(tmp_path / "train.parquet")]
+    chunks = list(iter_chunks(paths, chunksize=3, columns=["comment_text", "toxic"]))
+    assert [len(c) for c in chunks] == [3, 3, 2, 3, 3, 2]
+    assert list(chunks[-1].columns) == ["comment_text", "toxic"]
+
+def test_streaming_pipelines_train_in_chunks(tmp_path, dummy_text_train, dummy_labels_train, label_cols):
+    write_dataset(tmp_path, dummy_text_train, dummy_labels_train, label_cols)
+    for builder in (build_sgd_stream_pipeline, build_nb_stream_pipeline):
+        pipeline, n_rows = train_streaming_model(builder(), iter_chunks(str(tmp_path / "train.parquet"), 3), label_cols)
+        assert n_rows == len(dummy_text_train)
+
+        # the API calls predict on raw text and scores with the vectorizer output
+        path = tmp_path / "model.joblib"
+        joblib.dump(pipeline, path)
+        loaded = joblib.load(path)
+        assert loaded.predict(["obscene words here"]).shape == (1, len(label_cols))
+        proba = loaded.steps[-1][1].predict_proba(loaded[:-1].transform(["obscene words here"]))
+        assert len(proba) == len(label_cols)
+
+def test_predict_streaming_aligns_labels(tmp_path, dummy_text_train, dummy_labels_train, label_cols):
+    write_dataset(tmp_path, dummy_text_train, dummy_labels_train, label_cols)
+    pipeline, _ = train_streaming_model(build_sgd_stream_pipeline(), iter_chunks(str(tmp_path / "train.csv"), 4),
+                                        label_cols)
+    y_true, y_pred, scores, score_type = predict_streaming(
+        pipeline, iter_chunks(str(tmp_path / "test.parquet"), 3),
+        iter_chunks(str(tmp_path / "test_labels.csv"), 3), label_cols)
+
+    # the unscored first row is dropped
+    expected = dummy_labels_train.to_numpy()[1:]
+    np.testing.assert_array_equal(y_true.to_numpy(), expected)
+    assert y_pred.shape == scores.shape == expected.shape
+    assert score_type == "probability"
+
+def test_train_and_log_streaming_model(monkeypatch, tmp_path, dummy_text_train, dummy_labels_train, label_cols):
+    write_dataset(tmp_path, dummy_text_train, dummy_labels_train, label_cols)
+    run = FakeRun()
+    monkeypatch.setattr(model_training, "init_wandb", lambda **kwargs: run)
+    published = []
+    monkeypatch.setattr(model_training, "build_model_artifact",
+                        lambda model_name, pipeline, *args: published.append(model_name))
+
+    result = model_training.train_and_log_streaming_model(
+        "sgd_stream", STREAMING_MODELS["sgd_stream"], [str(tmp_path / "train.csv")], str(tmp_path / "test.parquet"),
+        str(tmp_path / "test_labels.csv"), label_cols, chunksize=3, epochs=2)
+
+    assert published == ["sgd_stream"]
+    assert "macro/f1" in result and "tuned/macro/f1" in result
+    # eight rows are too few to hold any out for validation
+    assert {"train_size": len(dummy_text_train), "chunksize": 3, "epochs": 2} in run.logged
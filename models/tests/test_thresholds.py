@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import model_training
+from model_training import (DEFAULT_THRESHOLDS, classifier_scores, drop_unscored, split_chunks, split_validation,
+                            train_model, tune_and_log_thresholds, tune_thresholds)
+
+@pytest.mark.parametrize("pipeline_fixture, score_type", [
+    ("fitted_lr_pipeline", "probability"),
+    ("fitted_nb_pipeline", "probability"),
+    ("fitted_svm_pipeline", "decision"),
+])
+def test_default_thresholds_reproduce_predict(request, pipeline_fixture, score_type, dummy_text_test):
+    pipeline = request.getfixturevalue(pipeline_fixture)
+    scores, got_type = classifier_scores(pipeline.steps[-1][1], pipeline[:-1].transform(dummy_text_test))
+    assert got_type == score_type
+    assert scores.shape == (len(dummy_text_test), 6)
+    np.testing.assert_array_equal((scores > DEFAULT_THRESHOLDS[score_type]).astype(int), pipeline.predict(dummy_text_test))
+
+def test_train_model_returns_scores(fitted_lr_pipeline, dummy_text_train, dummy_labels_train, dummy_text_test):
+    y_pred, scores, score_type = train_model(fitted_lr_pipeline, dummy_text_train, dummy_labels_train, dummy_text_test,
+                                             "LR", return_scores=True)
+    np.testing.assert_array_equal(y_pred, (scores > 0.5).astype(int))
+
+def test_tune_thresholds_maximizes_f1():
+    scores = np.array([[0.9, 0.1], [0.4, 0.2], [0.35, 0.3], [0.1, 0.05]])
+    y_true = np.array([[1, 0], [1, 0], [0, 0], [0, 0]])
+    thresholds = tune_thresholds(scores, y_true, ["a", "b"], "probability")
+    # both positives are caught only by cutting between 0.4 and 0.35
+    assert thresholds["a"] == pytest.approx(0.375)
+    assert thresholds["b"] == 0.5
+
+def test_tune_and_log_thresholds_reports_holdout_f1(label_cols):
+    class Run:
+        logged = []
+        def log(self, d):
+            self.logged.append(d)
+
+    rng = np.random.default_rng(0)
+    y_true = (rng.random((200, 6)) < 0.2).astype(int)
+    scores = y_true * 0.3 + rng.random((200, 6)) * 0.2
+    config, metrics = tune_and_log_thresholds(scores[:100], y_true[:100], scores[100:], y_true[100:], "probability",
+                                              Run(), label_cols)
+    assert config["score_type"] == "probability"
+    assert set(config["thresholds"]) == set(label_cols)
+    # every true score is above 0.3 and every false one below 0.2, so the tuned cut separates them
+    assert metrics["tuned/macro/f1"] == pytest.approx(1.0)
+    assert all(0.2 <= t <= 0.3 for t in config["thresholds"].values())
+
+def test_split_validation_holds_out_the_same_rows_as_split_chunks(dummy_text_train, dummy_labels_train):
+    X_fit, X_val, y_fit, y_val = split_validation(dummy_text_train, dummy_labels_train, fraction=0.25)
+    assert list(X_val.index) == list(y_val.index) == [3, 7]
+    assert len(X_fit) == len(y_fit) == 6
+
+    chunks = [dummy_labels_train.iloc[i:i + 3] for i in range(0, 8, 3)]
+    held_out = pd.concat(split_chunks(chunks, validation=True, fraction=0.25))
+    trained = pd.concat(split_chunks(chunks, fraction=0.25))
+    assert list(held_out.index) == [3, 7]
+    assert list(trained.index) == list(X_fit.index)
+
+def test_thresholds_ignore_unscored_test_rows(monkeypatch, dummy_text_train, dummy_labels_train, label_cols):
+    class Run:
+        def __init__(self):
+            self.summary = {}
+        def log(self, d):
+            pass
+        def finish(self):
+            pass
+
+    monkeypatch.setattr(model_training, "init_wandb", lambda **kwargs: Run())
+    published = {}
+    monkeypatch.setattr(model_training, "build_model_artifact",
+                        lambda model_name, pipeline, registry, labels, metrics, run, config: published.update(config))
+
+    # the unscored rows come back as -1 from S3 and are dropped before training
+    test_labels = pd.DataFrame(-1, index=range(6), columns=label_cols)
+    test_labels.iloc[:3] = dummy_labels_train.iloc[:3].to_numpy()
+    X_test, y_test = drop_unscored(dummy_text_train.iloc[:6], test_labels, label_cols)
+    assert len(X_test) == len(y_test) == 3
+
+    # rows 9 and 19 are held out: one toxic comment and one clean one
+    X_train = pd.concat([dummy_text_train] * 3, ignore_index=True)
+    y_train = pd.concat([dummy_labels_train] * 3, ignore_index=True)
+    model_training.train_and_log_model("log_reg", model_training.MODELS["log_reg"], X_train, X_test, y_train, y_test,
+                                       label_cols, n_jobs=1)
+    # no threshold collapses below every probability
+    assert published["score_type"] == "probability"
+    assert all(threshold > 0 for threshold in published["thresholds"].values())
+    assert published["thresholds"]["threat"] == DEFAULT_THRESHOLDS["probability"]
@@ -3,38 +3,84 @@ import json
 # import matplotlib.pyplot as plt
 import os
 import pandas as pd
-from sklearn.metrics import accuracy_score, precision_score
 # from pathlib import Path
-import boto3
+from log_store import IncrementalLogStore
+from metrics import compute_metrics, metrics_from_rollups
+from rolling import RollingMetrics, detect_drift, parse_training_rates
+from rollup_store import fetch_rollups, rollup_timeseries, window_start
 # from decimal import Decimal
 
 # setup
 TABLE_NAME = os.getenv("DDB_TABLE", "table_01")
 AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
-LABELS = ["toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"]
-
-def _to_int_map(d: dict) -> dict:
-    if not isinstance(d, dict):
-        return {k: 0 for k in LABELS}
-    return {k: int(d.get(k, 0)) for k in LABELS}
-
-def fetch_all_logs():
-    ddb = boto3.resource("dynamodb", region_name=AWS_REGION)
-    table = ddb.Table(TABLE_NAME)
-
-    resp = table.scan()
-    items = resp.get("Items", [])
-
-    # normalize to your expected shape
-    out = []
-    for it in items:
-        out.append({
-            "timestamp": it.get("timestamp"),
-            "request_text": it.get("request_text", ""),
-            "response": _to_int_map(it.get("response", {})),
-            "true_labels": _to_int_map(it.get("true_labels", {})),
-        })
-    return out
+# local log cache: full rescan after the TTL, newest N logs kept, reruns within the interval reuse the cache
+LOG_CACHE_TTL_SECONDS = float(os.getenv("LOG_CACHE_TTL_SECONDS", "900"))
+LOG_CACHE_MAX_ITEMS = int(os.getenv("LOG_CACHE_MAX_ITEMS", "100000"))
+LOG_MIN_REFRESH_SECONDS = float(os.getenv("LOG_MIN_REFRESH_SECONDS", "5"))
+# GSI with log_date as hash and timestamp as range key; incremental refreshes query it instead of scanning
+LOG_INDEX_NAME = os.getenv("LOG_INDEX_NAME") or None
+# incremental refreshes re-read this many seconds below the newest cached log, for logs the api's sink writes late
+LOG_LATE_SECONDS = float(os.getenv("LOG_LATE_SECONDS", "30"))
+# backfill: load the whole table with a parallel segmented scan instead of one sequential scan
+MONITORING_BACKFILL = os.getenv("MONITORING_BACKFILL", "false").lower() == "true"
+BACKFILL_SEGMENTS = int(os.getenv("BACKFILL_SEGMENTS", "8"))
+BACKFILL_WORKERS = int(os.getenv("BACKFILL_WORKERS", "8"))
+# rolling-window metrics and drift alerts
+ROLLING_BUCKET_SECONDS = int(os.getenv("ROLLING_BUCKET_SECONDS", "60"))
+ROLLING_WINDOW_SECONDS = int(os.getenv("ROLLING_WINDOW_SECONDS", "3600"))
+ROLLING_RETENTION_SECONDS = int(os.getenv("ROLLING_RETENTION_SECONDS", "86400"))
+TRAINING_LABEL_RATES = parse_training_rates(os.getenv("TRAINING_LABEL_RATES"))
+DRIFT_Z_THRESHOLD = float(os.getenv("DRIFT_Z_THRESHOLD", "3.0"))
+DRIFT_MIN_SAMPLES = int(os.getenv("DRIFT_MIN_SAMPLES", "100"))
+ACCURACY_ALERT_THRESHOLD = float(os.getenv("ACCURACY_ALERT_THRESHOLD", "0.50"))
+# "logs" computes metrics from the raw prediction logs, "rollup" reads the per-minute rollups written by the api
+METRICS_SOURCE = os.getenv("METRICS_SOURCE", "logs")
+ROLLUP_TABLE_NAME = os.getenv("ROLLUP_TABLE_NAME", "table_01_rollups")
+ROLLUP_BUCKET_SECONDS = int(os.getenv("ROLLUP_BUCKET_SECONDS", "60"))
+ROLLUP_RETENTION_SECONDS = int(os.getenv("ROLLUP_RETENTION_SECONDS", "604800"))
+
+def make_backfill_table():
+    # own session per call, so each scan thread gets its own boto3 resource
+    import boto3
+    return boto3.session.Session().resource("dynamodb", region_name=AWS_REGION).Table(TABLE_NAME)
+
+@st.cache_resource
+def get_log_store():
+    """
+    One incremental log cache per dashboard process, shared across reruns and sessions
+    """
+    def make_table():
+        # boto3 is only imported when the logs are first fetched
+        import boto3
+        return boto3.resource("dynamodb", region_name=AWS_REGION).Table(TABLE_NAME)
+
+    return IncrementalLogStore(
+        make_table,
+        ttl_seconds=LOG_CACHE_TTL_SECONDS,
+        max_items=LOG_CACHE_MAX_ITEMS,
+        min_refresh_seconds=LOG_MIN_REFRESH_SECONDS,
+        index_name=LOG_INDEX_NAME,
+        late_seconds=LOG_LATE_SECONDS,
+    )
+
+@st.cache_resource
+def get_rolling_metrics():
+    """
+    Time-bucketed confusion counts, updated with only the new logs on each rerun
+    """
+    return RollingMetrics(
+        bucket_seconds=ROLLING_BUCKET_SECONDS,
+        window_seconds=ROLLING_WINDOW_SECONDS,
+        retention_seconds=ROLLING_RETENTION_SECONDS,
+    )
+
+def fetch_all_logs(backfill=False):
+    store = get_log_store()
+    if backfill:
+        store.backfill(total_segments=BACKFILL_SEGMENTS, max_workers=BACKFILL_WORKERS,
+                       table_factory=make_backfill_table)
+        return list(store.logs)
+    return list(store.refresh())
 
 
 # dummy json to test
@@ -43,54 +89,47 @@ def load_logs_from_file(path: str):
         data = json.load(f)
     return data
 
-logs = fetch_all_logs()
-# logs = load_logs_from_file('dummy_logs.json')
-
-def build_prediction_df(logs):
-    rows = []
-    for log in logs:
-        row = {}
-        for label in LABELS:
-            row[label] = log["response"].get(label)
-        rows.append(row)
-    df = pd.DataFrame(rows)
-    return df
-
-pred_df = build_prediction_df(logs)
-
-pred_dist = pred_df.mean().rename("positive_rate").reset_index()
-pred_dist.columns = ["label", "positive_rate"]
-
-def build_true_df(logs):
-    rows = []
-    for log in logs:
-        row = {}
-        for label in LABELS:
-            row[label] = log["true_labels"].get(label)
-        rows.append(row)
-    df = pd.DataFrame(rows)
-    return df
-
-true_df = build_true_df(logs)
-true_dist = true_df.mean().rename("positive_rate").reset_index()
-true_dist.columns = ["label", "positive_rate"]
-
-# for accuracy and precision display
-
-y_true = true_df[LABELS].to_numpy()
-y_pred = pred_df[LABELS].to_numpy()
-
-accuracies = {}
-for label in LABELS:
-    accuracies[label] = accuracy_score(true_df[label], pred_df[label])
-
-exact_match_acc = accuracy_score(y_true, y_pred)
-
-precisions = {}
-for label in LABELS:
-    precisions[label] = precision_score(true_df[label], pred_df[label], zero_division=0)
-    
-precision_macro = precision_score(y_true, y_pred, average="macro", zero_division=0)
+def fetch_rollup_metrics():
+    """
+    Overall and rolling-window metrics from the rollup table, without reading any raw logs
+    """
+    import boto3
+    table = boto3.resource("dynamodb", region_name=AWS_REGION).Table(ROLLUP_TABLE_NAME)
+    since = (pd.Timestamp.now().floor("s") - pd.Timedelta(seconds=ROLLUP_RETENTION_SECONDS)).isoformat()
+    rollups = fetch_rollups(table, since=since)
+    start = window_start(rollups, ROLLING_WINDOW_SECONDS, ROLLUP_BUCKET_SECONDS)
+    window_rows = [row for row in rollups if start is not None and row["bucket"] >= start]
+    return metrics_from_rollups(rollups), metrics_from_rollups(window_rows), rollup_timeseries(rollups)
+
+if METRICS_SOURCE == "rollup":
+    metrics, window, timeseries = fetch_rollup_metrics()
+    total_logs = metrics["n_predictions"]
+else:
+    run_backfill = st.sidebar.button("Backfill (parallel scan)")
+    if MONITORING_BACKFILL and "backfilled" not in st.session_state:
+        st.session_state["backfilled"] = True
+        run_backfill = True
+    logs = fetch_all_logs(backfill=run_backfill)
+    # logs = load_logs_from_file('dummy_logs.json')
+
+    rolling = get_rolling_metrics()
+    if run_backfill:
+        rolling.reset()
+    rolling.update(logs)
+    window = rolling.window_metrics()
+    timeseries = rolling.timeseries()
+
+    # decode every log once into uint8 (n, 6) label arrays; all metrics come from one confusion-count pass
+    metrics = compute_metrics(logs)
+    total_logs = len(logs)
+
+drift = detect_drift(window, TRAINING_LABEL_RATES, z_threshold=DRIFT_Z_THRESHOLD, min_samples=DRIFT_MIN_SAMPLES)
+per_label_df = pd.DataFrame.from_dict(metrics["per_label"], orient="index")
+
+pred_dist = per_label_df["pred_positive_rate"].rename("positive_rate").rename_axis("label").reset_index()
+true_dist = per_label_df["true_positive_rate"].rename("positive_rate").rename_axis("label").reset_index()
+exact_match_acc = metrics["exact_match"]
+precision_macro = metrics["precision_macro"]
 
 # show banner
 alert_placeholder = st.empty()
@@ -99,7 +138,7 @@ alert_placeholder = st.empty()
 st.title('Toxic Comment Moderation Monitoring App')
 st.markdown("This app will be used to monitor the backend FastAPI application by plotting different data to help in analysing model performance.")
 
-st.subheader(f"Total Logs: {len(logs)}")
+st.subheader(f"Total Logs: {total_logs}")
 # prediction distribution plots
 st.subheader("Distribution of 1s per label - Prediction")
 st.dataframe(pred_dist)
@@ -115,15 +154,39 @@ st.subheader("Accuracy Metrics")
 st.metric("Exact Match Accuracy:", f"{exact_match_acc:.2%}")
 # per label accuracy
 st.text("Per Label Accuracy")
-st.dataframe(pd.DataFrame.from_dict(accuracies, orient="index", columns=["accuracy"]))
+st.dataframe(per_label_df[["accuracy"]])
 
 # display precision metrics
 st.subheader("Precision Metrics")
 st.metric("Macro Average Precision:", f"{precision_macro:.2%}")
 # per label precision
 st.text("Per Label Precision")
-st.dataframe(pd.DataFrame.from_dict(precisions, orient="index", columns=["precision"]))
-
-# Implement Alerting: If the calculated accuracy drops below 80%, display a prominent warning banner at the top of the dashboard using st.error().
-if exact_match_acc < 0.50:
-    alert_placeholder.error(f"Warning: Model accuracy dropped to {exact_match_acc:.2%}!", icon="🚨")
\ No newline at end of file
+st.dataframe(per_label_df[["precision"]])
+
+# display recall, f1 and confusion counts
+st.subheader("Recall, F1 and Confusion Counts")
+st.metric("Macro Average F1:", f"{metrics['f1_macro']:.2%}")
+st.dataframe(per_label_df[["recall", "f1", "tp", "fp", "fn", "tn"]])
+
+# rolling window metrics
+st.subheader(f"Rolling Window - last {ROLLING_WINDOW_SECONDS // 60} minutes")
+st.metric("Logs in Window:", window["n_predictions"])
+st.metric("Rolling Exact Match Accuracy:", f"{window['exact_match']:.2%}")
+st.metric("Rolling Macro Average Precision:", f"{window['precision_macro']:.2%}")
+if not timeseries.empty:
+    st.line_chart(timeseries.set_index("time")[["exact_match"] + [f"{label}_rate" for label in TRAINING_LABEL_RATES]])
+
+# drift of the predicted label rates against the training split
+st.text("Predicted positive rate vs training rate")
+drift_df = pd.DataFrame.from_dict(drift, orient="index")
+st.dataframe(drift_df)
+
+# Implement Alerting: warn when the rolling accuracy drops below the threshold or a label drifts from training
+alerts = []
+if window["n"] and window["exact_match"] < ACCURACY_ALERT_THRESHOLD:
+    alerts.append(f"Warning: rolling model accuracy dropped to {window['exact_match']:.2%}!")
+drifted = [label for label, row in drift.items() if row["drift"]]
+if drifted:
+    alerts.append(f"Prediction drift vs training label rates: {', '.join(drifted)}")
+if alerts:
+    alert_placeholder.error("\n\n".join(alerts), icon="🚨")
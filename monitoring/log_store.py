@@ -0,0 +1,348 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+LABELS = ["toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"]
+# day of each log's timestamp, written by the api log sink; the hash key of the timestamp index
+LOG_DATE_ATTRIBUTE = "log_date"
+
+
+def _to_int_map(d: dict) -> dict:
+    if not isinstance(d, dict):
+        return {k: 0 for k in LABELS}
+    return {k: int(d.get(k, 0)) for k in LABELS}
+
+def normalize_item(it: dict) -> dict:
+    """
+    Normalize a raw DynamoDB item to the log shape the dashboard expects
+    """
+    return {
+        "timestamp": it.get("timestamp"),
+        "request_text": it.get("request_text", ""),
+        "response": _to_int_map(it.get("response", {})),
+        "true_labels": _to_int_map(it.get("true_labels", {})),
+    }
+
+def scan_pages(table, page_size=None, **scan_kwargs):
+    """
+    Yield every page of a table scan, following LastEvaluatedKey until the end
+    """
+    if page_size:
+        scan_kwargs["Limit"] = page_size
+    while True:
+        resp = table.scan(**scan_kwargs)
+        yield resp.get("Items", [])
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            break
+        scan_kwargs["ExclusiveStartKey"] = last_key
+
+def query_pages(table, page_size=None, **query_kwargs):
+    """
+    Yield every page of a query, following LastEvaluatedKey until the end
+    """
+    if page_size:
+        query_kwargs["Limit"] = page_size
+    while True:
+        resp = table.query(**query_kwargs)
+        yield resp.get("Items", [])
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            break
+        query_kwargs["ExclusiveStartKey"] = last_key
+
+def days_between(first: str, last: date) -> list[str]:
+    """
+    ISO dates from first (YYYY-MM-DD) through last
+    """
+    day = date.fromisoformat(first)
+    days = []
+    while day <= last:
+        days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+THROTTLE_ERRORS = {"ProvisionedThroughputExceededException", "ThrottlingException", "RequestLimitExceeded"}
+
+class LogColumns:
+    """
+    Columnar buffer for scanned logs: timestamps and texts as lists, predicted and true
+    labels as contiguous uint8 (n, 6) arrays. Pages can be appended from several threads.
+    """
+
+    def __init__(self):
+        self.timestamps = []
+        self.request_texts = []
+        self._response_chunks = []
+        self._true_chunks = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _decode(items, key):
+        out = np.zeros((len(items), len(LABELS)), dtype=np.uint8)
+        for i, it in enumerate(items):
+            d = it.get(key)
+            if isinstance(d, dict):
+                out[i] = [int(d.get(label, 0)) for label in LABELS]
+        return out
+
+    def extend(self, items):
+        if not items:
+            return
+        response = self._decode(items, "response")
+        true_labels = self._decode(items, "true_labels")
+        with self._lock:
+            self.timestamps.extend(it.get("timestamp") for it in items)
+            self.request_texts.extend(it.get("request_text", "") for it in items)
+            self._response_chunks.append(response)
+            self._true_chunks.append(true_labels)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def response(self):
+        return np.concatenate(self._response_chunks) if self._response_chunks else np.zeros((0, len(LABELS)), np.uint8)
+
+    @property
+    def true_labels(self):
+        return np.concatenate(self._true_chunks) if self._true_chunks else np.zeros((0, len(LABELS)), np.uint8)
+
+    def to_logs(self):
+        """
+        Convert back to the per-log dict shape, sorted by timestamp
+        """
+        response, true_labels = self.response, self.true_labels
+        logs = [
+            {
+                "timestamp": ts,
+                "request_text": text,
+                "response": dict(zip(LABELS, map(int, response[i]))),
+                "true_labels": dict(zip(LABELS, map(int, true_labels[i]))),
+            }
+            for i, (ts, text) in enumerate(zip(self.timestamps, self.request_texts))
+        ]
+        logs.sort(key=lambda log: log["timestamp"] or "")
+        return logs
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for scan requests: halved on every throttle, raised by one after
+    a run of successful pages, never above max_limit or below 1
+    """
+
+    def __init__(self, max_limit, increase_after=10):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.increase_after = increase_after
+        self.throttles = 0
+        self._active = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def __enter__(self):
+        with self._cond:
+            while self._active >= self.limit:
+                self._cond.wait()
+            self._active += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        with self._cond:
+            self._successes += 1
+            if self._successes >= self.increase_after and self.limit < self.max_limit:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify_all()
+
+    def on_throttle(self):
+        with self._cond:
+            self.throttles += 1
+            self._successes = 0
+            self.limit = max(1, self.limit // 2)
+
+def _scan_page(table, scan_kwargs, limiter, max_retries=8, base_delay=0.05):
+    """
+    Fetch one scan page, backing off and shrinking concurrency when DynamoDB throttles
+    """
+    from botocore.exceptions import ClientError
+
+    for attempt in range(max_retries + 1):
+        with limiter:
+            try:
+                resp = table.scan(**scan_kwargs)
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") not in THROTTLE_ERRORS or attempt == max_retries:
+                    raise
+                limiter.on_throttle()
+            else:
+                limiter.on_success()
+                return resp
+        time.sleep(base_delay * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+def parallel_scan(table_factory, total_segments=8, max_workers=8, page_size=None):
+    """
+    Read the whole table with a DynamoDB parallel scan (Segment/TotalSegments) across a
+    thread pool, streaming pages into a LogColumns buffer. table_factory is called once
+    per segment, because boto3 resources must not be shared between threads.
+    """
+    buffer = LogColumns()
+    limiter = AdaptiveLimiter(max_workers)
+
+    def scan_segment(segment):
+        table = table_factory()
+        scan_kwargs = {"Segment": segment, "TotalSegments": total_segments}
+        if page_size:
+            scan_kwargs["Limit"] = page_size
+        while True:
+            resp = _scan_page(table, scan_kwargs, limiter)
+            buffer.extend(resp.get("Items", []))
+            last_key = resp.get("LastEvaluatedKey")
+            if not last_key:
+                break
+            scan_kwargs["ExclusiveStartKey"] = last_key
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(scan_segment, range(total_segments)))
+    return buffer
+
+class IncrementalLogStore:
+    """
+    Local cache of prediction logs that only fetches what is new on each refresh.
+
+    The store keeps a high-water mark on the timestamp key and asks DynamoDB only for
+    items above it. With index_name set, that is a query on a global secondary index
+    with log_date as hash key and timestamp as range key, one day partition at a time
+    from the high-water mark to tomorrow, so DynamoDB reads and bills only the new
+    items. Without the index a filtered scan is used: it still reads, and is billed
+    read capacity for, the whole table on every refresh; only the transfer shrinks.
+    A high-water mark more than max_query_days old falls back to a full scan.
+
+    The api's log sink writes in batches, so a log can land after newer ones have been
+    read. Each incremental fetch therefore starts late_seconds below the high-water mark
+    (at least the sink's flush interval plus any clock skew between api workers) and the
+    overlap is merged on the timestamp key.
+
+    Every ttl_seconds the cache is dropped and rebuilt from a full scan to pick up late
+    or rewritten items. Only the newest max_items logs are kept. Refreshes closer
+    together than min_refresh_seconds reuse the cached logs.
+    """
+
+    def __init__(self, table_factory, ttl_seconds=900.0, max_items=100_000, min_refresh_seconds=5.0, page_size=None,
+                 index_name=None, max_query_days=7, late_seconds=30.0):
+        self.table_factory = table_factory
+        self.ttl_seconds = ttl_seconds
+        self.max_items = max_items
+        self.min_refresh_seconds = min_refresh_seconds
+        self.page_size = page_size
+        self.index_name = index_name
+        self.max_query_days = max_query_days
+        self.late_seconds = late_seconds
+
+        self.logs = []
+        self.high_water_mark = None
+        self._table = None
+        self._full_sync_at = None
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+        self.stats = {"full_scans": 0, "incremental_scans": 0, "incremental_queries": 0, "items_fetched": 0}
+
+    def backfill(self, total_segments=8, max_workers=8, table_factory=None):
+        """
+        Rebuild the cache from a parallel scan of the whole table
+        """
+        columns = parallel_scan(table_factory or self.table_factory, total_segments=total_segments,
+                                max_workers=max_workers, page_size=self.page_size)
+        with self._lock:
+            logs = columns.to_logs()
+            self.logs = logs[-self.max_items:] if self.max_items else logs
+            self.high_water_mark = self.logs[-1]["timestamp"] if self.logs else None
+            self.stats["full_scans"] += 1
+            self.stats["items_fetched"] += len(columns)
+            self._full_sync_at = self._refreshed_at = time.monotonic()
+        return columns
+
+    def _get_table(self):
+        if self._table is None:
+            self._table = self.table_factory()
+        return self._table
+
+    def _fetch(self, scan_kwargs, pages=scan_pages):
+        items = []
+        for page in pages(self._get_table(), page_size=self.page_size, **scan_kwargs):
+            items.extend(normalize_item(it) for it in page)
+        self.stats["items_fetched"] += len(items)
+        return items
+
+    def _since(self):
+        """
+        Timestamp the incremental fetch starts after: late_seconds below the high-water mark
+        """
+        try:
+            mark = datetime.fromisoformat(self.high_water_mark)
+        except ValueError:
+            return self.high_water_mark
+        return (mark - timedelta(seconds=self.late_seconds)).isoformat()
+
+    def _query_days(self, since):
+        """
+        Day partitions to query for items after since, None when the index is not
+        configured or since is too old to query day by day
+        """
+        if not self.index_name:
+            return None
+        # tomorrow too, in case the api's clock is ahead of the dashboard's
+        days = days_between(since[:10], date.today() + timedelta(days=1))
+        return days if len(days) <= self.max_query_days else None
+
+    def _fetch_new(self, since, days):
+        from boto3.dynamodb.conditions import Attr, Key
+        if days is None:
+            self.stats["incremental_scans"] += 1
+            return self._fetch({"FilterExpression": Attr("timestamp").gt(since)})
+        self.stats["incremental_queries"] += 1
+        items = []
+        for day in days:
+            condition = Key(LOG_DATE_ATTRIBUTE).eq(day) & Key("timestamp").gt(since)
+            items.extend(self._fetch({"IndexName": self.index_name, "KeyConditionExpression": condition},
+                                     pages=query_pages))
+        return items
+
+    def refresh(self, force=False):
+        """
+        Bring the cache up to date and return the logs sorted by timestamp
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._refreshed_at is not None and now - self._refreshed_at < self.min_refresh_seconds:
+                return self.logs
+
+            expired = self._full_sync_at is None or now - self._full_sync_at > self.ttl_seconds
+            since = None if self.high_water_mark is None else self._since()
+            days = None if since is None else self._query_days(since)
+            too_old = self.index_name and days is None
+            if force or expired or self.high_water_mark is None or too_old:
+                logs = self._fetch({})
+                self.stats["full_scans"] += 1
+                self._full_sync_at = now
+            else:
+                # timestamp is the table key, so a log fetched again replaces its cached copy
+                new_logs = self._fetch_new(since, days)
+                seen = {log["timestamp"] for log in new_logs}
+                logs = [log for log in self.logs if log["timestamp"] not in seen] + new_logs
+
+            logs.sort(key=lambda log: log["timestamp"] or "")
+            self.logs = logs[-self.max_items:] if self.max_items else logs
+            if self.logs:
+                self.high_water_mark = self.logs[-1]["timestamp"]
+            self._refreshed_at = now
+            return self.logs
@@ -0,0 +1,124 @@
+import numpy as np
+
+from log_store import LABELS
+
+# column order of the (n_labels, 4) confusion count array
+TN, FP, FN, TP = range(4)
+
+
+def decode_labels(logs, key: str) -> np.ndarray:
+    """
+    Decode the key ("response" or "true_labels") of every log into a uint8 (n, 6) array
+    """
+    def values():
+        for log in logs:
+            d = log.get(key)
+            if not isinstance(d, dict):
+                d = {}
+            for label in LABELS:
+                yield int(d.get(label, 0) or 0)
+
+    n = len(logs)
+    return np.fromiter(values(), dtype=np.uint8, count=n * len(LABELS)).reshape(n, len(LABELS))
+
+def label_arrays(source):
+    """
+    Return (y_true, y_pred) uint8 arrays from a LogColumns buffer or a list of logs
+    """
+    if hasattr(source, "true_labels") and hasattr(source, "response"):
+        return np.asarray(source.true_labels, dtype=np.uint8), np.asarray(source.response, dtype=np.uint8)
+    return decode_labels(source, "true_labels"), decode_labels(source, "response")
+
+def confusion_counts(y_true: np.ndarray, y_pred: np.ndarray):
+    """
+    One pass over the label matrices. Each cell is coded as 2 * true + pred and offset by
+    4 * label index, so a single bincount gives tn/fp/fn/tp for every label. Returns the
+    (n_labels, 4) counts and the number of rows where every label matched.
+    """
+    y_true = np.asarray(y_true, dtype=np.uint8)
+    y_pred = np.asarray(y_pred, dtype=np.uint8)
+    n_labels = y_true.shape[1]
+    codes = (y_true << 1) | y_pred
+    exact_matches = int(np.count_nonzero(((codes == 0) | (codes == 3)).all(axis=1)))
+    offsets = np.arange(n_labels, dtype=np.int64) * 4
+    counts = np.bincount((codes + offsets).ravel(), minlength=4 * n_labels).reshape(n_labels, 4)
+    return counts, exact_matches
+
+def _ratio(num, den):
+    num = np.asarray(num, dtype=np.float64)
+    den = np.asarray(den, dtype=np.float64)
+    return np.divide(num, den, out=np.zeros_like(num), where=den > 0)
+
+def metrics_from_counts(counts, exact_matches: int, labels=LABELS) -> dict:
+    """
+    Per-label and aggregate metrics from confusion counts. Undefined ratios are 0, like
+    sklearn's zero_division=0.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    tn, fp, fn, tp = counts[:, TN], counts[:, FP], counts[:, FN], counts[:, TP]
+    n = int(counts[0].sum()) if len(counts) else 0
+
+    accuracy = _ratio(tp + tn, np.full_like(tp, n))
+    precision = _ratio(tp, tp + fp)
+    recall = _ratio(tp, tp + fn)
+    f1 = _ratio(2 * tp, 2 * tp + fp + fn)
+    pred_rate = _ratio(tp + fp, np.full_like(tp, n))
+    true_rate = _ratio(tp + fn, np.full_like(tp, n))
+
+    per_label = {
+        label: {
+            "accuracy": float(accuracy[i]),
+            "precision": float(precision[i]),
+            "recall": float(recall[i]),
+            "f1": float(f1[i]),
+            "pred_positive_rate": float(pred_rate[i]),
+            "true_positive_rate": float(true_rate[i]),
+            "tp": int(tp[i]), "fp": int(fp[i]), "fn": int(fn[i]), "tn": int(tn[i]),
+        }
+        for i, label in enumerate(labels)
+    }
+    return {
+        "n": n,
+        "n_predictions": n,
+        "exact_match": exact_matches / n if n else 0.0,
+        "precision_macro": float(precision.mean()) if len(precision) else 0.0,
+        "recall_macro": float(recall.mean()) if len(recall) else 0.0,
+        "f1_macro": float(f1.mean()) if len(f1) else 0.0,
+        "precision_micro": float(_ratio(tp.sum(), tp.sum() + fp.sum())),
+        "recall_micro": float(_ratio(tp.sum(), tp.sum() + fn.sum())),
+        "f1_micro": float(_ratio(2 * tp.sum(), 2 * tp.sum() + fp.sum() + fn.sum())),
+        "per_label": per_label,
+    }
+
+def compute_metrics(source) -> dict:
+    """
+    All dashboard metrics for a LogColumns buffer or a list of logs
+    """
+    y_true, y_pred = label_arrays(source)
+    if len(y_true) == 0:
+        return metrics_from_counts(np.zeros((len(LABELS), 4), dtype=np.int64), 0)
+    counts, exact_matches = confusion_counts(y_true, y_pred)
+    return metrics_from_counts(counts, exact_matches)
+
+def metrics_from_rollups(rollups, labels=LABELS) -> dict:
+    """
+    Metrics from rollup rows written by api/rollups.py, over the same denominator as
+    compute_metrics: predictions logged without true labels count as all-negative truth,
+    so their positives are false positives and their empty predictions exact matches.
+    """
+    counts = np.zeros((len(labels), 4), dtype=np.int64)
+    positives = np.zeros(len(labels), dtype=np.int64)
+    exact = total = labelled = 0
+    for row in rollups:
+        total += int(row.get("count", 0))
+        labelled += int(row.get("labelled_count", 0))
+        exact += int(row.get("exact_count", 0)) + int(row.get("unlabelled_exact_count", 0))
+        for i, label in enumerate(labels):
+            positives[i] += int(row.get(f"pos_{label}", 0))
+            for j, kind in enumerate(("tn", "fp", "fn", "tp")):
+                counts[i, j] += int(row.get(f"{kind}_{label}", 0))
+
+    unlabelled_positives = positives - counts[:, TP] - counts[:, FP]
+    counts[:, FP] += unlabelled_positives
+    counts[:, TN] += total - labelled - unlabelled_positives
+    return metrics_from_counts(counts, exact, labels)
@@ -0,0 +1,172 @@
+import json
+import math
+import threading
+
+import numpy as np
+import pandas as pd
+
+from log_store import LABELS
+from metrics import FP, TP, label_arrays, metrics_from_counts
+
+# label rates of the Jigsaw training split, as logged by models/model_training.py main() (<label>_pct)
+DEFAULT_TRAINING_RATES = {
+    "toxic": 0.0958,
+    "severe_toxic": 0.0100,
+    "obscene": 0.0529,
+    "threat": 0.0030,
+    "insult": 0.0494,
+    "identity_hate": 0.0088,
+}
+
+
+def parse_training_rates(raw: str | None) -> dict:
+    """
+    Training label rates from a JSON object keyed by label or <label>_pct, so the
+    W&B run summary can be pasted as is. Falls back to the Jigsaw rates.
+    """
+    rates = dict(DEFAULT_TRAINING_RATES)
+    if raw:
+        given = json.loads(raw)
+        for label in LABELS:
+            for key in (label, f"{label}_pct"):
+                if key in given:
+                    rates[label] = float(given[key])
+    return rates
+
+def _to_epoch_seconds(timestamps) -> np.ndarray:
+    parsed = pd.to_datetime(pd.Series(timestamps, dtype="object"), utc=True, format="ISO8601", errors="coerce")
+    seconds = parsed.dt.tz_localize(None).to_numpy().astype("datetime64[s]").astype(np.int64)
+    return np.where(parsed.isna().to_numpy(), -1, seconds)
+
+class RollingMetrics:
+    """
+    Streaming per-label confusion counts in fixed time buckets.
+
+    update() folds in the logs whose timestamp, the key of the log table, it has not
+    counted yet. Logs the log store picks up late, from its overlap window or a full
+    rescan, are therefore counted once they show up, and logs it returns again are not
+    counted twice. Buckets are bucket_seconds wide and dropped, together with the
+    timestamps counted in them, once they are older than retention_seconds. Window metrics sum the buckets in the last
+    window_seconds, measured back from the newest log rather than the wall clock, so a
+    quiet API still shows its last hour of traffic.
+    """
+
+    def __init__(self, bucket_seconds=60, window_seconds=3600, retention_seconds=86400, labels=LABELS):
+        self.bucket_seconds = bucket_seconds
+        self.window_seconds = window_seconds
+        self.retention_seconds = retention_seconds
+        self.labels = list(labels)
+        # bucket start (epoch seconds) -> (counts (n_labels, 4), exact match count)
+        self.buckets = {}
+        # timestamp of every counted log -> its bucket start
+        self.counted = {}
+        self.latest_bucket = None
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.buckets = {}
+            self.counted = {}
+            self.latest_bucket = None
+
+    def update(self, logs):
+        """
+        Fold in the logs that have not been counted yet and return how many there were
+        """
+        with self._lock:
+            logs = [log for log in logs if log["timestamp"] not in self.counted]
+            if not logs:
+                return 0
+            self._add(logs)
+            self._evict()
+            return len(logs)
+
+    def _add(self, logs):
+        y_true, y_pred = label_arrays(logs)
+        seconds = _to_epoch_seconds([log["timestamp"] for log in logs])
+        keep = seconds >= 0
+        y_true, y_pred, seconds = y_true[keep], y_pred[keep], seconds[keep]
+        if not len(seconds):
+            return
+        timestamps = [log["timestamp"] for log, kept in zip(logs, keep) if kept]
+
+        n_labels = len(self.labels)
+        starts, bucket_idx = np.unique(seconds // self.bucket_seconds * self.bucket_seconds, return_inverse=True)
+        codes = (y_true << 1) | y_pred
+        flat = bucket_idx[:, None] * (4 * n_labels) + np.arange(n_labels) * 4 + codes
+        counts = np.bincount(flat.ravel(), minlength=len(starts) * 4 * n_labels).reshape(len(starts), n_labels, 4)
+        exact = np.bincount(bucket_idx, weights=((codes == 0) | (codes == 3)).all(axis=1), minlength=len(starts))
+
+        for i, bucket in enumerate(starts.tolist()):
+            old_counts, old_exact = self.buckets.get(bucket, (0, 0))
+            self.buckets[bucket] = (old_counts + counts[i], old_exact + int(exact[i]))
+        self.counted.update(zip(timestamps, starts[bucket_idx].tolist()))
+        latest = int(starts[-1])
+        self.latest_bucket = latest if self.latest_bucket is None else max(self.latest_bucket, latest)
+
+    def _evict(self):
+        if self.retention_seconds and self.latest_bucket is not None:
+            cutoff = self.latest_bucket - self.retention_seconds
+            evicted = [b for b in self.buckets if b < cutoff]
+            for bucket in evicted:
+                del self.buckets[bucket]
+            if evicted:
+                self.counted = {ts: bucket for ts, bucket in self.counted.items() if bucket >= cutoff}
+
+    def window_counts(self, window_seconds=None, now=None):
+        """
+        Summed (counts, exact matches) over the buckets inside the window
+        """
+        window_seconds = window_seconds or self.window_seconds
+        counts = np.zeros((len(self.labels), 4), dtype=np.int64)
+        exact = 0
+        with self._lock:
+            if self.latest_bucket is None:
+                return counts, exact
+            end = now if now is not None else self.latest_bucket + self.bucket_seconds
+            for bucket, (bucket_counts, bucket_exact) in self.buckets.items():
+                if end - window_seconds <= bucket < end:
+                    counts += bucket_counts
+                    exact += bucket_exact
+        return counts, exact
+
+    def window_metrics(self, window_seconds=None, now=None) -> dict:
+        counts, exact = self.window_counts(window_seconds, now)
+        return metrics_from_counts(counts, exact, self.labels)
+
+    def timeseries(self) -> pd.DataFrame:
+        """
+        One row per bucket with its log count, exact-match accuracy and predicted positive rates
+        """
+        with self._lock:
+            items = sorted(self.buckets.items())
+        rows = []
+        for bucket, (counts, exact) in items:
+            n = int(counts[0].sum())
+            row = {"time": pd.Timestamp(bucket, unit="s", tz="UTC"), "count": n, "exact_match": exact / n if n else 0.0}
+            for i, label in enumerate(self.labels):
+                row[f"{label}_rate"] = (counts[i, TP] + counts[i, FP]) / n if n else 0.0
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+def detect_drift(metrics: dict, training_rates: dict, z_threshold=3.0, min_samples=100) -> dict:
+    """
+    One-sample z-test of each label's predicted positive rate against its training rate.
+    A label is flagged when |z| exceeds z_threshold and the window holds at least min_samples logs.
+    """
+    n = metrics.get("n_predictions", metrics["n"])
+    report = {}
+    for label, row in metrics["per_label"].items():
+        expected = training_rates.get(label)
+        if expected is None:
+            continue
+        observed = row["pred_positive_rate"]
+        std_err = math.sqrt(max(expected * (1 - expected), 1e-12) / n) if n else float("inf")
+        z = (observed - expected) / std_err
+        report[label] = {
+            "observed_rate": observed,
+            "training_rate": expected,
+            "z": z,
+            "drift": bool(n >= min_samples and abs(z) > z_threshold),
+        }
+    return report
@@ -0,0 +1,45 @@
+import pandas as pd
+
+from log_store import LABELS, scan_pages
+
+
+def normalize_rollup(item: dict) -> dict:
+    """
+    Convert the Decimal counters of a rollup item to ints
+    """
+    return {key: (value if key == "bucket" else int(value)) for key, value in item.items()}
+
+def fetch_rollups(table, since: str | None = None, page_size=None) -> list[dict]:
+    """
+    Read rollup rows, optionally only buckets at or after since, sorted by bucket
+    """
+    from boto3.dynamodb.conditions import Attr
+
+    scan_kwargs = {"FilterExpression": Attr("bucket").gte(since)} if since else {}
+    rows = [normalize_rollup(item) for page in scan_pages(table, page_size=page_size, **scan_kwargs) for item in page]
+    rows.sort(key=lambda row: row["bucket"])
+    return rows
+
+def window_start(rollups: list[dict], window_seconds: int, bucket_seconds: int = 60) -> str | None:
+    """
+    First bucket inside the window that ends with the newest rollup
+    """
+    if not rollups:
+        return None
+    end = pd.Timestamp(rollups[-1]["bucket"]) + pd.Timedelta(seconds=bucket_seconds)
+    return (end - pd.Timedelta(seconds=window_seconds)).isoformat(timespec="seconds")
+
+def rollup_timeseries(rollups: list[dict], labels=LABELS) -> pd.DataFrame:
+    """
+    Same columns as RollingMetrics.timeseries, built from rollup rows
+    """
+    rows = []
+    for row in rollups:
+        n = row.get("count", 0)
+        labelled = row.get("labelled_count", 0)
+        out = {"time": pd.Timestamp(row["bucket"]), "count": n,
+               "exact_match": row.get("exact_count", 0) / labelled if labelled else 0.0}
+        for label in labels:
+            out[f"{label}_rate"] = row.get(f"pos_{label}", 0) / n if n else 0.0
+        rows.append(out)
+    return pd.DataFrame(rows)
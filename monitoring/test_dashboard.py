@@ -1,4 +1,5 @@
 from streamlit.testing.v1 import AppTest
+from datetime import datetime
 from pathlib import Path
 from unittest.mock import patch, MagicMock
 
@@ -40,4 +41,23 @@ def test_monitoring_app_runs(mock_boto_resource):
     at = AppTest.from_file(str(app_path), default_timeout=30)
     at.run(timeout=30)
 
-    assert not at.exception
\ No newline at end of file
+    assert not at.exception
+
+@patch("boto3.resource")
+def test_monitoring_app_reads_rollups(mock_boto_resource, monkeypatch):
+    monkeypatch.setenv("METRICS_SOURCE", "rollup")
+    mock_table = MagicMock()
+    bucket = datetime.now().replace(second=0, microsecond=0).isoformat()
+    mock_table.scan.return_value = {
+        "Items": [{"bucket": bucket, "count": 3, "pos_toxic": 1, "labelled_count": 1, "exact_count": 1, "tp_toxic": 1}]
+    }
+    mock_ddb = MagicMock()
+    mock_ddb.Table.return_value = mock_table
+    mock_boto_resource.return_value = mock_ddb
+
+    app_path = Path(__file__).parent / "app.py"
+    at = AppTest.from_file(str(app_path), default_timeout=30)
+    at.run(timeout=30)
+
+    assert not at.exception
+    assert any("Total Logs: 3" in header.value for header in at.subheader)
@@ -0,0 +1,207 @@
+from datetime import date
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+from log_store import IncrementalLogStore, LogColumns, days_between, normalize_item, parallel_scan
+
+REGION = "us-east-1"
+
+def make_item(i):
+    return {
+        "timestamp": f"2025-08-21T10:00:{i:02d}",
+        "request_text": f"comment {i}",
+        "response": {"toxic": i % 2},
+        "true_labels": None,
+    }
+
+@pytest.fixture
+def table(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name=REGION)
+        yield dynamodb.create_table(
+            TableName="logs",
+            KeySchema=[{"AttributeName": "timestamp", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "timestamp", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+
+@pytest.fixture
+def indexed_table(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name=REGION)
+        yield dynamodb.create_table(
+            TableName="logs",
+            KeySchema=[{"AttributeName": "timestamp", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "timestamp", "AttributeType": "S"},
+                                  {"AttributeName": "log_date", "AttributeType": "S"}],
+            GlobalSecondaryIndexes=[{
+                "IndexName": "log_date-timestamp-index",
+                "KeySchema": [{"AttributeName": "log_date", "KeyType": "HASH"},
+                              {"AttributeName": "timestamp", "KeyType": "RANGE"}],
+                "Projection": {"ProjectionType": "ALL"},
+            }],
+            BillingMode="PAY_PER_REQUEST",
+        )
+
+def test_normalize_item_fills_missing_labels():
+    log = normalize_item(make_item(3))
+    assert log["response"] == {"toxic": 1, "severe_toxic": 0, "obscene": 0, "threat": 0, "insult": 0, "identity_hate": 0}
+    assert set(log["true_labels"].values()) == {0}
+
+def test_refresh_paginates_and_fetches_only_new_items(table):
+    for i in range(5):
+        table.put_item(Item=make_item(i))
+    store = IncrementalLogStore(lambda: table, min_refresh_seconds=0, page_size=2, late_seconds=0)
+
+    logs = store.refresh()
+    assert [log["request_text"] for log in logs] == [f"comment {i}" for i in range(5)]
+    assert store.high_water_mark == "2025-08-21T10:00:04"
+
+    for i in range(5, 8):
+        table.put_item(Item=make_item(i))
+    logs = store.refresh()
+    assert len(logs) == 8
+    assert store.stats == {"full_scans": 1, "incremental_scans": 1, "incremental_queries": 0, "items_fetched": 8}
+
+def test_refresh_rereads_the_overlap_for_late_logs(table):
+    for i in range(0, 10, 2):
+        table.put_item(Item=make_item(i))
+    store = IncrementalLogStore(lambda: table, min_refresh_seconds=0, late_seconds=5)
+    store.refresh()
+
+    # written by the sink after 10:00:08 was read, with an older timestamp
+    table.put_item(Item=make_item(5))
+    table.put_item(Item=make_item(10))
+    logs = store.refresh()
+    assert [log["timestamp"][-2:] for log in logs] == ["00", "02", "04", "05", "06", "08", "10"]
+    assert store.stats["incremental_scans"] == 1
+
+    # a log older than the overlap waits for the next full scan
+    table.put_item(Item=make_item(1))
+    assert len(store.refresh()) == 7
+
+def test_size_limit_keeps_newest_logs(table):
+    for i in range(6):
+        table.put_item(Item=make_item(i))
+    store = IncrementalLogStore(lambda: table, max_items=4, min_refresh_seconds=0)
+    assert [log["timestamp"][-2:] for log in store.refresh()] == ["02", "03", "04", "05"]
+
+def test_ttl_expiry_triggers_full_rescan(table):
+    table.put_item(Item=make_item(1))
+    store = IncrementalLogStore(lambda: table, ttl_seconds=0, min_refresh_seconds=0)
+    store.refresh()
+    table.delete_item(Key={"timestamp": make_item(1)["timestamp"]})
+    assert store.refresh() == []
+    assert store.stats["full_scans"] == 2
+
+def test_refresh_within_interval_uses_cache(table):
+    table.put_item(Item=make_item(1))
+    store = IncrementalLogStore(lambda: table, min_refresh_seconds=60)
+    store.refresh()
+    table.put_item(Item=make_item(2))
+    assert len(store.refresh()) == 1
+    assert len(store.refresh(force=True)) == 2
+
+def test_parallel_scan_reads_every_segment_into_columns(table):
+    for i in range(40):
+        table.put_item(Item={**make_item(i), "true_labels": {"insult": 1}})
+    columns = parallel_scan(lambda: table, total_segments=4, max_workers=4, page_size=3)
+
+    assert len(columns) == 40
+    assert sorted(columns.request_texts) == sorted(f"comment {i}" for i in range(40))
+    assert columns.response.shape == (40, 6) and columns.response.dtype == "uint8"
+    assert columns.true_labels[:, 4].sum() == 40
+    order = sorted(range(40), key=lambda i: columns.timestamps[i])
+    assert [int(columns.response[i, 0]) for i in order] == [i % 2 for i in range(40)]
+
+def test_parallel_scan_backs_off_when_throttled():
+    class ThrottledTable:
+        def __init__(self):
+            self.calls = 0
+
+        def scan(self, **kwargs):
+            self.calls += 1
+            if self.calls <= 2:
+                raise ClientError({"Error": {"Code": "ProvisionedThroughputExceededException"}}, "Scan")
+            return {"Items": [make_item(kwargs["Segment"])]}
+
+    table = ThrottledTable()
+    columns = parallel_scan(lambda: table, total_segments=2, max_workers=2)
+    assert len(columns) == 2
+    assert table.calls == 4
+
+def test_parallel_scan_raises_other_errors():
+    class BrokenTable:
+        def scan(self, **kwargs):
+            raise ClientError({"Error": {"Code": "ResourceNotFoundException"}}, "Scan")
+
+    with pytest.raises(ClientError):
+        parallel_scan(lambda: BrokenTable(), total_segments=2, max_workers=2)
+
+def test_backfill_replaces_cache_and_sets_high_water_mark(table):
+    for i in range(10):
+        table.put_item(Item=make_item(i))
+    store = IncrementalLogStore(lambda: table, max_items=8, min_refresh_seconds=0)
+    store.backfill(total_segments=3, max_workers=3)
+    assert [log["timestamp"][-2:] for log in store.logs] == [f"{i:02d}" for i in range(2, 10)]
+    assert store.high_water_mark == "2025-08-21T10:00:09"
+
+    table.put_item(Item=make_item(10))
+    assert store.refresh()[-1]["timestamp"] == "2025-08-21T10:00:10"
+    assert store.stats["incremental_scans"] == 1
+
+def test_log_columns_empty():
+    columns = LogColumns()
+    assert columns.response.shape == (0, 6)
+    assert columns.to_logs() == []
+
+class CountingTable:
+    def __init__(self, table):
+        self.table = table
+        self.calls = []
+
+    def scan(self, **kwargs):
+        self.calls.append("scan")
+        return self.table.scan(**kwargs)
+
+    def query(self, **kwargs):
+        self.calls.append("query")
+        return self.table.query(**kwargs)
+
+def test_refresh_queries_the_timestamp_index_instead_of_scanning(indexed_table):
+    today = date.today().isoformat()
+
+    def put(i):
+        indexed_table.put_item(Item={**make_item(i), "timestamp": f"{today}T10:00:{i:02d}", "log_date": today})
+
+    for i in range(3):
+        put(i)
+    table = CountingTable(indexed_table)
+    store = IncrementalLogStore(lambda: table, min_refresh_seconds=0, index_name="log_date-timestamp-index")
+    store.refresh()
+    assert table.calls == ["scan"]
+
+    table.calls.clear()
+    for i in range(3, 5):
+        put(i)
+    logs = store.refresh()
+    assert [log["timestamp"][-2:] for log in logs] == ["00", "01", "02", "03", "04"]
+    assert set(table.calls) == {"query"}
+    assert store.stats["incremental_queries"] == 1 and store.stats["incremental_scans"] == 0
+
+def test_old_high_water_mark_falls_back_to_full_scan(indexed_table):
+    indexed_table.put_item(Item={**make_item(1), "log_date": "2025-08-21"})
+    store = IncrementalLogStore(lambda: indexed_table, min_refresh_seconds=0, index_name="log_date-timestamp-index")
+    store.refresh()
+    store.refresh()
+    assert store.stats["full_scans"] == 2 and store.stats["incremental_queries"] == 0
+
+def test_days_between_includes_both_ends():
+    assert days_between("2025-12-30", date(2026, 1, 2)) == ["2025-12-30", "2025-12-31", "2026-01-01", "2026-01-02"]
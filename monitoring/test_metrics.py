@@ -0,0 +1,55 @@
+import numpy as np
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+
+from log_store import LABELS, LogColumns
+from metrics import compute_metrics, confusion_counts, decode_labels
+
+def random_logs(n, seed=0):
+    rng = np.random.default_rng(seed)
+    y_true = (rng.random((n, 6)) < 0.3).astype(np.uint8)
+    y_pred = (rng.random((n, 6)) < 0.3).astype(np.uint8)
+    logs = [
+        {"timestamp": str(i), "request_text": "", "response": dict(zip(LABELS, map(int, y_pred[i]))),
+         "true_labels": dict(zip(LABELS, map(int, y_true[i])))}
+        for i in range(n)
+    ]
+    return logs, y_true, y_pred
+
+def test_decode_labels_handles_missing_and_partial_maps():
+    logs = [{"response": {"toxic": 1, "insult": 1}}, {"response": None}, {}]
+    decoded = decode_labels(logs, "response")
+    assert decoded.dtype == np.uint8
+    assert decoded.tolist() == [[1, 0, 0, 0, 1, 0], [0] * 6, [0] * 6]
+
+def test_metrics_match_sklearn():
+    logs, y_true, y_pred = random_logs(500)
+    metrics = compute_metrics(logs)
+
+    assert metrics["n"] == 500
+    assert np.isclose(metrics["exact_match"], accuracy_score(y_true, y_pred))
+    assert np.isclose(metrics["precision_macro"], precision_score(y_true, y_pred, average="macro", zero_division=0))
+    assert np.isclose(metrics["f1_micro"], f1_score(y_true, y_pred, average="micro", zero_division=0))
+    for i, label in enumerate(LABELS):
+        row = metrics["per_label"][label]
+        assert np.isclose(row["accuracy"], accuracy_score(y_true[:, i], y_pred[:, i]))
+        assert np.isclose(row["recall"], recall_score(y_true[:, i], y_pred[:, i], zero_division=0))
+        assert np.isclose(row["f1"], f1_score(y_true[:, i], y_pred[:, i], zero_division=0))
+        assert row["tp"] + row["fp"] + row["fn"] + row["tn"] == 500
+
+def test_confusion_counts_single_pass():
+    y_true = np.array([[1, 0], [1, 1], [0, 0]], dtype=np.uint8)
+    y_pred = np.array([[1, 1], [0, 1], [0, 0]], dtype=np.uint8)
+    counts, exact = confusion_counts(y_true, y_pred)
+    # columns are tn, fp, fn, tp
+    assert counts.tolist() == [[1, 0, 1, 1], [1, 1, 0, 1]]
+    assert exact == 1
+
+def test_log_columns_and_empty_input():
+    logs, _, _ = random_logs(50, seed=3)
+    columns = LogColumns()
+    columns.extend(logs)
+    assert compute_metrics(columns) == compute_metrics(logs)
+
+    empty = compute_metrics([])
+    assert empty["n"] == 0 and empty["exact_match"] == 0.0
+    assert empty["per_label"]["toxic"]["precision"] == 0.0
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from log_store import LABELS
+from rolling import DEFAULT_TRAINING_RATES, RollingMetrics, detect_drift, parse_training_rates
+
+def make_log(minute, second, toxic_pred, toxic_true=0):
+    return {
+        "timestamp": f"2025-08-21T10:{minute:02d}:{second:02d}.000000",
+        "request_text": "",
+        "response": {"toxic": toxic_pred},
+        "true_labels": {"toxic": toxic_true},
+    }
+
+def test_buckets_and_window_metrics():
+    rolling = RollingMetrics(bucket_seconds=60, window_seconds=120)
+    logs = [make_log(0, 1, 1, 1), make_log(0, 30, 0, 1), make_log(1, 5, 1, 0), make_log(2, 0, 1, 1)]
+    assert rolling.update(logs) == 4
+    assert len(rolling.buckets) == 3
+
+    window = rolling.window_metrics()
+    # last two minutes only: minutes 1 and 2
+    assert window["n"] == 2
+    assert window["per_label"]["toxic"]["tp"] == 1
+    assert window["per_label"]["toxic"]["fp"] == 1
+    assert rolling.window_metrics(window_seconds=600)["per_label"]["toxic"]["fn"] == 1
+
+def test_update_only_folds_in_new_logs():
+    rolling = RollingMetrics()
+    logs = [make_log(0, i, 1) for i in range(5)]
+    rolling.update(logs)
+    logs = logs + [make_log(0, 10, 0), make_log(0, 11, 0)]
+    assert rolling.update(logs) == 2
+    assert rolling.update(logs) == 0
+    assert rolling.window_metrics()["n"] == 7
+
+def test_update_counts_late_logs_once():
+    rolling = RollingMetrics(bucket_seconds=60)
+    logs = [make_log(0, 0, 1), make_log(0, 30, 1), make_log(1, 0, 1)]
+    rolling.update(logs)
+
+    # the log store merged in a log older than the newest counted one
+    logs = [logs[0], make_log(0, 10, 0, 1), *logs[1:]]
+    assert rolling.update(logs) == 1
+    assert rolling.update(logs) == 0
+    assert rolling.window_metrics()["n"] == 4
+    assert rolling.window_metrics()["per_label"]["toxic"]["fn"] == 1
+
+def test_old_buckets_are_evicted():
+    rolling = RollingMetrics(bucket_seconds=60, retention_seconds=120)
+    rolling.update([make_log(m, 0, 0) for m in range(6)])
+    assert sorted(rolling.buckets)[0] % 3600 == 3 * 60
+    assert len(rolling.timeseries()) == 3
+    assert len(rolling.counted) == 3
+
+def test_detect_drift_flags_shifted_label():
+    rolling = RollingMetrics()
+    rng = np.random.default_rng(0)
+    logs = []
+    for i in range(1000):
+        response = {label: int(rng.random() < DEFAULT_TRAINING_RATES[label]) for label in LABELS}
+        response["threat"] = int(rng.random() < 0.05)
+        logs.append({"timestamp": f"2025-08-21T10:{i // 60 % 60:02d}:{i % 60:02d}", "response": response, "true_labels": {}})
+    rolling.update(logs)
+    drift = detect_drift(rolling.window_metrics(), DEFAULT_TRAINING_RATES)
+    assert drift["threat"]["drift"]
+    assert not drift["toxic"]["drift"]
+
+def test_detect_drift_needs_min_samples():
+    rolling = RollingMetrics()
+    rolling.update([make_log(0, i, 1) for i in range(10)])
+    assert not detect_drift(rolling.window_metrics(), DEFAULT_TRAINING_RATES)["toxic"]["drift"]
+
+def test_parse_training_rates_accepts_pct_keys():
+    rates = parse_training_rates('{"toxic_pct": 0.2, "insult": 0.1}')
+    assert rates["toxic"] == pytest.approx(0.2)
+    assert rates["insult"] == pytest.approx(0.1)
+    assert rates["threat"] == DEFAULT_TRAINING_RATES["threat"]
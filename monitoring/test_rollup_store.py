@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from log_store import LABELS
+from metrics import compute_metrics, metrics_from_rollups
+from rollup_store import fetch_rollups, rollup_timeseries, window_start
+
+REGION = "us-east-1"
+
+def make_rollup(minute, count, pos_toxic, tp_toxic=0, fp_toxic=0, tn_toxic=0):
+    labelled = tp_toxic + fp_toxic + tn_toxic
+    return {
+        "bucket": f"2025-08-21T10:{minute:02d}:00",
+        "count": Decimal(count),
+        "pos_toxic": Decimal(pos_toxic),
+        "labelled_count": Decimal(labelled),
+        "exact_count": Decimal(tp_toxic + tn_toxic),
+        "tp_toxic": Decimal(tp_toxic),
+        "fp_toxic": Decimal(fp_toxic),
+        "tn_toxic": Decimal(tn_toxic),
+    }
+
+@pytest.fixture
+def table(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name=REGION)
+        yield dynamodb.create_table(
+            TableName="rollups",
+            KeySchema=[{"AttributeName": "bucket", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "bucket", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+
+def test_fetch_rollups_sorts_and_filters(table):
+    for minute in (3, 1, 2):
+        table.put_item(Item=make_rollup(minute, 10, 1))
+    rows = fetch_rollups(table)
+    assert [row["bucket"][-5:] for row in rows] == ["01:00", "02:00", "03:00"]
+    assert rows[0]["count"] == 10 and isinstance(rows[0]["count"], int)
+    assert len(fetch_rollups(table, since="2025-08-21T10:02:00")) == 2
+
+def test_metrics_from_rollups():
+    rows = [
+        {k: (v if k == "bucket" else int(v)) for k, v in make_rollup(0, 10, 4, tp_toxic=2, fp_toxic=1, tn_toxic=2).items()},
+        {k: (v if k == "bucket" else int(v)) for k, v in make_rollup(1, 10, 0).items()},
+    ]
+    metrics = metrics_from_rollups(rows)
+    # the 15 unlabelled predictions count as negatives, one of them predicted toxic
+    assert metrics["n_predictions"] == metrics["n"] == 20
+    assert metrics["per_label"]["toxic"]["fp"] == 2
+    assert metrics["per_label"]["toxic"]["tn"] == 16
+    assert metrics["per_label"]["toxic"]["precision"] == pytest.approx(2 / 4)
+    assert metrics["per_label"]["toxic"]["pred_positive_rate"] == pytest.approx(4 / 20)
+
+def test_metrics_from_rollups_match_metrics_from_logs():
+    def log(pred, true=None):
+        return {"response": {"toxic": pred}, "true_labels": None if true is None else {"toxic": true}}
+
+    logs = [log(1, 1), log(1, 0), log(0, 1), log(1), log(0), log(0)]
+    row = {"bucket": "2025-08-21T10:00:00", "count": 6, "pos_toxic": 3, "labelled_count": 3, "exact_count": 1,
+           "unlabelled_exact_count": 2, "tp_toxic": 1, "fp_toxic": 1, "fn_toxic": 1,
+           **{f"tn_{label}": 3 for label in LABELS if label != "toxic"}}
+    assert metrics_from_rollups([row]) == compute_metrics(logs)
+
+def test_window_start_and_timeseries():
+    rows = [{"bucket": f"2025-08-21T10:0{m}:00", "count": 4, "pos_toxic": m} for m in range(5)]
+    assert window_start(rows, window_seconds=120) == "2025-08-21T10:03:00"
+    assert window_start([], window_seconds=120) is None
+    ts = rollup_timeseries(rows)
+    assert ts["toxic_rate"].tolist() == [0, 0.25, 0.5, 0.75, 1.0]
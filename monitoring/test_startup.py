@@ -0,0 +1,9 @@
+import subprocess
+import sys
+
+
+def test_dashboard_modules_import_without_boto3_or_sklearn():
+    code = ("import sys, log_store, metrics, rolling, rollup_store; "
+            "print(' '.join(name for name in ('boto3', 'botocore', 'sklearn') if name in sys.modules))")
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert proc.stdout.strip() == ""